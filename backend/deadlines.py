@@ -0,0 +1,140 @@
+# backend/deadlines.py
+# Acceptance and settlement deadlines for bets, driven by a min-heap of due times.
+#
+# - expires_at: a bet still pending at this time becomes 'expired'. Pending bets have no
+#   payment yet (it is created on accept), so there is nothing to release.
+# - settle_by: a bet accepted but not settled by this time is flagged 'overdue'.
+#
+# Deadlines are absolute UTC timestamps stored on the bet itself, so nothing is lost when the
+# process restarts: load() heapifies the deadlines of whatever bets were reloaded and catches up
+# on the ones that passed while the server was down. Each firing costs O(log n); nothing scans
+# the bet list. Entries are never removed from the heap: when a bet is accepted or settled
+# before its deadline, the entry is simply skipped when it comes due.
+
+import heapq
+import threading
+import time
+from datetime import datetime, timezone
+
+from metrics import BET_DEADLINES
+
+EXPIRE = 'expire'
+SETTLE = 'settle'
+
+
+def parse_deadline(value):
+    """
+    ISO 8601 string (offset or 'Z'; naive means UTC) -> epoch seconds. None/'' -> None.
+    """
+    if value in (None, ''):
+        return None
+    if not isinstance(value, str):
+        raise ValueError('must be an ISO 8601 timestamp')
+    dt = datetime.fromisoformat(value.strip().replace('Z', '+00:00'))
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
+def format_deadline(ts):
+    # Same naive-UTC format as accepted_at/settled_at
+    return datetime.fromtimestamp(ts, timezone.utc).replace(tzinfo=None).isoformat()
+
+
+def _now_iso():
+    return datetime.utcnow().isoformat()
+
+
+class DeadlineScheduler:
+    def __init__(self, lock, on_change=None):
+        # lock guards the bets; handlers hold it while changing a bet's status.
+        # on_change([(bet, old_status), ...]) runs under the lock after each run_due() that changed bets.
+        self.lock = lock
+        self.on_change = on_change
+        self._heap = []  # (due, seq, kind, bet)
+        self._seq = 0
+        self._wakeup = threading.Condition(threading.Lock())
+        self._thread = None
+
+    def __len__(self):
+        return len(self._heap)
+
+    def _entries(self, bet):
+        for kind, field in ((EXPIRE, 'expires_at'), (SETTLE, 'settle_by')):
+            due = parse_deadline(bet.get(field))
+            if due is not None:
+                self._seq += 1
+                yield (due, self._seq, kind, bet)
+
+    def load(self, bets):
+        """
+        Rebuild the heap from existing bets (startup); deadlines already passed fire on the next run_due().
+        """
+        with self.lock:
+            self._heap = [entry for bet in bets if bet.get('status') in ('pending', 'accepted')
+                          for entry in self._entries(bet)]
+            heapq.heapify(self._heap)
+        self._notify()
+
+    def schedule(self, bet):
+        with self.lock:
+            entries = list(self._entries(bet))
+            for entry in entries:
+                heapq.heappush(self._heap, entry)
+        if entries:
+            self._notify()
+
+    def next_due(self):
+        # Lock-free peek (the timer thread calls this while holding _wakeup)
+        try:
+            return self._heap[0][0]
+        except IndexError:
+            return None
+
+    def run_due(self, now=None):
+        """
+        Apply every deadline at or before now; returns the number of bets changed.
+        """
+        now = time.time() if now is None else now
+        changed = []
+        with self.lock:
+            while self._heap and self._heap[0][0] <= now:
+                _, _, kind, bet = heapq.heappop(self._heap)
+                if kind == EXPIRE and bet.get('status') == 'pending':
+                    self._expire(bet)
+                    changed.append((bet, 'pending'))
+                elif kind == SETTLE and bet.get('status') == 'accepted' and not bet.get('overdue'):
+                    bet['overdue'] = True
+                    bet['overdue_at'] = _now_iso()
+                    BET_DEADLINES.inc(action='overdue')
+                    changed.append((bet, 'accepted'))
+            if changed and self.on_change is not None:
+                self.on_change(changed)
+        return len(changed)
+
+    def _expire(self, bet):
+        bet['status'] = 'expired'
+        bet['expired_at'] = _now_iso()
+        BET_DEADLINES.inc(action='expired')
+
+    # ---- background timer ----
+
+    def _notify(self):
+        with self._wakeup:
+            self._wakeup.notify()
+
+    def _loop(self):
+        while True:
+            self.run_due()
+            with self._wakeup:
+                # Read the head under _wakeup so a schedule() in between cannot be missed;
+                # sleep until the earliest deadline or until a new one is pushed
+                due = self.next_due()
+                timeout = None if due is None else max(0.0, due - time.time())
+                self._wakeup.wait(timeout)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name='bet-deadlines', daemon=True)
+            self._thread.start()
+        return self
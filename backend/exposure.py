@@ -0,0 +1,276 @@
+# backend/exposure.py
+# Risk exposure and settlement previews over all open bets, computed column-wise with NumPy.
+#
+# BetColumns mirrors the bet store as stdlib arrays (bet id, sender/receiver as user indexes,
+# amount in cents, state), appended on create and patched on every status change, so nothing
+# walks the bet objects at query time. exposure_report() copies the columns into NumPy and
+# answers in a handful of vectorized passes (bincount per user):
+#   - exposure: worst-case liability, the sum of a user's open (pending + accepted) bets
+#   - shortfall: exposure not covered by the user's payments balance_cents
+#   - net flows and post-settlement balances for hypothetical outcomes: senders win,
+#     receivers win, or a custom {bet_id: winner} map with a default
+#
+#   PAYMENTS_URL  payments service for POST /accounts/balances (default http://127.0.0.1:8001)
+#
+#   python backend/exposure.py --url http://localhost:5000 --top 20
+#   python backend/exposure.py --outcomes outcomes.json --default sender --no-balances
+
+import bisect
+import json
+import os
+import sys
+import time
+import urllib.request
+from array import array
+
+try:
+    import numpy as np
+except ImportError:  # optional; the analytics endpoint reports 503 without it
+    np = None
+HAVE_NUMPY = np is not None
+
+from tracing import inject_headers
+
+PAYMENTS_URL = os.getenv('PAYMENTS_URL', 'http://127.0.0.1:8001').rstrip('/')
+BALANCES_CHUNK = 50_000
+
+PENDING, ACCEPTED, CLOSED = 0, 1, 2
+_STATES = {'pending': PENDING, 'accepted': ACCEPTED}
+
+
+def _cents(amount):
+    try:
+        return int(round(float(amount) * 100))
+    except (TypeError, ValueError):
+        return 0
+
+
+class BetColumns:
+    def __init__(self):
+        self.emails = []
+        self._user_index = {}
+        self.ids = array('q')
+        self.sender = array('i')
+        self.receiver = array('i')
+        self.amount_cents = array('q')
+        self.state = array('b')
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def build(cls, bets):
+        columns = cls()
+        for bet in bets:
+            columns.add(bet)
+        return columns
+
+    def _user(self, email):
+        if email is None:
+            return -1
+        index = self._user_index.get(email)
+        if index is None:
+            index = self._user_index[email] = len(self.emails)
+            self.emails.append(email)
+        return index
+
+    def add(self, bet):
+        bet_id = bet.get('id')
+        if not isinstance(bet_id, int) or (self.ids and bet_id <= self.ids[-1]):
+            return  # rows must stay ordered by id for the bisect in _row
+        self.ids.append(bet_id)
+        self.sender.append(self._user(bet.get('sender')))
+        self.receiver.append(self._user(bet.get('receiver')))
+        self.amount_cents.append(_cents(bet.get('amount')))
+        self.state.append(_STATES.get(bet.get('status'), CLOSED))
+
+    def _row(self, bet_id):
+        # Ids are assigned as len(bets) + 1, so the row is usually id - 1
+        row = bet_id - 1
+        if 0 <= row < len(self.ids) and self.ids[row] == bet_id:
+            return row
+        row = bisect.bisect_left(self.ids, bet_id)
+        return row if row < len(self.ids) and self.ids[row] == bet_id else None
+
+    def update(self, bet):
+        row = self._row(bet.get('id'))
+        if row is not None:
+            self.state[row] = _STATES.get(bet.get('status'), CLOSED)
+
+    def snapshot(self):
+        """
+        NumPy copies of the columns (take under the bets lock; compute outside it).
+        """
+        n = len(self.ids)
+        return {
+            'ids': np.frombuffer(self.ids, dtype=np.int64, count=n).copy(),
+            'sender': np.frombuffer(self.sender, dtype=np.int32, count=n).copy(),
+            'receiver': np.frombuffer(self.receiver, dtype=np.int32, count=n).copy(),
+            'amount_cents': np.frombuffer(self.amount_cents, dtype=np.int64, count=n).copy(),
+            'state': np.frombuffer(self.state, dtype=np.int8, count=n).copy(),
+            # Append-only, so sharing them is safe: indexes in the copied columns stay valid
+            'emails': self.emails,
+            'user_index': self._user_index,
+            'users': len(self.emails),
+        }
+
+
+def fetch_balances(emails):
+    """
+    email -> balanceCents from the payments service, in POST /accounts/balances chunks.
+    """
+    balances = {}
+    for i in range(0, len(emails), BALANCES_CHUNK):
+        headers = {'Content-Type': 'application/json'}
+        inject_headers(headers)
+        req = urllib.request.Request(
+            PAYMENTS_URL + '/accounts/balances',
+            data=json.dumps({'emails': emails[i:i + BALANCES_CHUNK]}).encode(),
+            headers=headers,
+            method='POST',
+        )
+        with urllib.request.urlopen(req, timeout=30) as resp:
+            balances.update(json.load(resp)['balances'])
+    return balances
+
+
+def _per_user(users, index, values):
+    return np.bincount(index, weights=values, minlength=users).astype(np.int64)
+
+
+def _sender_wins(ids, outcomes, default_winner):
+    if default_winner not in ('sender', 'receiver'):
+        raise ValueError('default must be "sender" or "receiver"')
+    if any(w not in ('sender', 'receiver') for w in outcomes.values()):
+        raise ValueError('outcomes values must be "sender" or "receiver"')
+    sender_wins = np.full(len(ids), default_winner == 'sender')
+    if len(ids):
+        keys = np.fromiter((int(k) for k in outcomes), dtype=np.int64, count=len(outcomes))
+        wins = np.fromiter((w == 'sender' for w in outcomes.values()), dtype=bool, count=len(outcomes))
+        rows = np.minimum(np.searchsorted(ids, keys), len(ids) - 1)
+        found = ids[rows] == keys  # ids of closed or unknown bets are ignored
+        sender_wins[rows[found]] = wins[found]
+    return sender_wins
+
+
+def exposure_report(snapshot, balance_source=None, top=20, outcomes=None, default_winner='sender'):
+    """
+    balance_source(emails) -> {email: balance_cents} for users with open bets, or None to skip
+    the shortfall columns. outcomes: {bet_id: 'sender' | 'receiver'} for the 'custom' scenario;
+    other open bets resolve to default_winner.
+    """
+    started = time.perf_counter()
+    emails = snapshot['emails']
+    users = snapshot['users']
+    open_rows = (snapshot['state'] != CLOSED) & (snapshot['sender'] >= 0) & (snapshot['receiver'] >= 0)
+    ids = snapshot['ids'][open_rows]
+    sender = snapshot['sender'][open_rows]
+    receiver = snapshot['receiver'][open_rows]
+    amount = snapshot['amount_cents'][open_rows]
+    accepted = snapshot['state'][open_rows] == ACCEPTED
+    scenarios = {'senders_win': np.ones(len(ids), dtype=bool), 'receivers_win': np.zeros(len(ids), dtype=bool)}
+    if outcomes:
+        scenarios['custom'] = _sender_wins(ids, outcomes, default_winner)
+
+    exposure = _per_user(users, sender, amount) + _per_user(users, receiver, amount)
+    accepted_exposure = (_per_user(users, sender[accepted], amount[accepted])
+                         + _per_user(users, receiver[accepted], amount[accepted]))
+    involved = np.flatnonzero(exposure > 0)
+    compute_s = time.perf_counter() - started
+
+    balance = np.zeros(users, dtype=np.int64)
+    has_account = np.zeros(users, dtype=bool)
+    balances_status, fetch_s = 'skipped', 0.0
+    if balance_source is not None:
+        fetch_started = time.perf_counter()
+        try:
+            balances = balance_source([emails[u] for u in involved.tolist()])
+            balances_status = 'ok'
+        except (OSError, ValueError, KeyError) as e:
+            balances, balances_status = None, f'unavailable: {e}'
+        fetch_s = time.perf_counter() - fetch_started
+        if balances:
+            user_index = snapshot['user_index']
+            rows = np.fromiter((user_index[e] for e in balances), dtype=np.int64, count=len(balances))
+            balance[rows] = np.fromiter(balances.values(), dtype=np.int64, count=len(balances))
+            has_account[rows] = True
+    with_balances = balances_status == 'ok'
+    started = time.perf_counter()
+    shortfall = np.maximum(exposure - balance, 0)
+
+    nets, scenario_totals = {}, {}
+    for name, sender_wins in scenarios.items():
+        signed = np.where(sender_wins, amount, -amount)
+        net = _per_user(users, sender, signed) - _per_user(users, receiver, signed)
+        after = balance + net
+        nets[name] = net
+        scenario_totals[name] = {
+            'users_negative': int(np.count_nonzero(after[involved] < 0)) if with_balances else None,
+            'shortfall_cents': int(np.maximum(-after[involved], 0).sum()) if with_balances else None,
+            'largest_loss_cents': int(-net.min()) if users else 0,
+            'largest_gain_cents': int(net.max()) if users else 0,
+        }
+
+    # Top users by shortfall (by exposure when balances are unknown)
+    rank_by = shortfall if with_balances else exposure
+    top = min(top, len(involved))
+    if top:
+        candidates = involved[np.argpartition(-rank_by[involved], top - 1)[:top]]
+        candidates = candidates[np.lexsort((candidates, -rank_by[candidates]))]
+    else:
+        candidates = involved[:0]
+    top_users = [{
+        'user': emails[u],
+        'exposure_cents': int(exposure[u]),
+        'accepted_exposure_cents': int(accepted_exposure[u]),
+        'balance_cents': int(balance[u]) if has_account[u] else None,
+        'shortfall_cents': int(shortfall[u]) if with_balances else None,
+        'net_cents': {name: int(net[u]) for name, net in nets.items()},
+    } for u in candidates.tolist()]
+
+    return {
+        'open_bets': int(len(ids)),
+        'users': int(len(involved)),
+        'totals': {
+            'exposure_cents': int(amount.sum()),
+            'accepted_exposure_cents': int(amount[accepted].sum()),
+            'shortfall_cents': int(shortfall[involved].sum()) if with_balances else None,
+            'users_short': int(np.count_nonzero(shortfall[involved])) if with_balances else None,
+            'users_without_account': int(np.count_nonzero(~has_account[involved])) if with_balances else None,
+        },
+        'scenarios': scenario_totals,
+        'top': top_users,
+        'balances': balances_status,
+        'timings_ms': {
+            'compute': round((compute_s + time.perf_counter() - started) * 1000, 2),
+            'balances': round(fetch_s * 1000, 2),
+        },
+    }
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Exposure and settlement preview from the bets backend')
+    parser.add_argument('--url', default='http://localhost:5000')
+    parser.add_argument('--top', type=int, default=20)
+    parser.add_argument('--no-balances', action='store_true', help='skip the payments balance lookup')
+    parser.add_argument('--outcomes', help='JSON file with {bet_id: "sender" | "receiver"} for a custom scenario')
+    parser.add_argument('--default', default='sender', choices=('sender', 'receiver'),
+                        help='winner for open bets not listed in --outcomes')
+    args = parser.parse_args(argv)
+
+    url = f'{args.url.rstrip("/")}/api/analytics/exposure?top={args.top}&balances={0 if args.no_balances else 1}'
+    data = None
+    if args.outcomes:
+        with open(args.outcomes, encoding='utf-8') as f:
+            data = json.dumps({'outcomes': json.load(f), 'default': args.default}).encode()
+    req = urllib.request.Request(url, data=data, headers={'Content-Type': 'application/json'},
+                                 method='POST' if data else 'GET')
+    with urllib.request.urlopen(req) as resp:
+        print(json.dumps(json.load(resp), indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,55 @@
+# backend/fastjson.py
+# Drop-in replacement for flask.jsonify on large list responses.
+#
+# Uses orjson when installed and the result is guaranteed byte-identical to jsonify
+# (sorted keys, ensure_ascii, indent=2 in debug / compact otherwise, trailing newline).
+# Anything orjson would format differently (non-ASCII text, exponent floats, huge ints)
+# goes through jsonify as before.
+#
+# BetsJSONProvider lets both paths serialize objects with a to_dict() (records.BetRecord).
+
+import re
+
+from flask import current_app, jsonify
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # optional speedup
+    orjson = None
+
+# orjson writes 1e16 / 1e-7 where the stdlib writes 1e+16 / 1e-07, and 0.00005 where it
+# writes 5e-05 (every non-zero float below 1e-4 starts with "0.0000")
+_EXPONENT = re.compile(rb'\d[eE][+-]?\d|(?<![\d.])0\.0000')
+
+
+def _to_dict(obj):
+    to_dict = getattr(obj, 'to_dict', None)
+    if to_dict is None:
+        raise TypeError(f'Object of type {type(obj).__name__} is not JSON serializable')
+    return to_dict()
+
+
+class BetsJSONProvider(DefaultJSONProvider):
+    @staticmethod
+    def default(o):
+        if hasattr(o, 'to_dict'):
+            return o.to_dict()
+        return DefaultJSONProvider.default(o)
+
+
+def fast_jsonify(obj):
+    provider = current_app.json
+    if orjson is None or not getattr(provider, 'sort_keys', False) or not getattr(provider, 'ensure_ascii', False):
+        return jsonify(obj)
+
+    indent = (provider.compact is None and current_app.debug) or provider.compact is False
+    option = orjson.OPT_SORT_KEYS | (orjson.OPT_INDENT_2 if indent else 0)
+    try:
+        body = orjson.dumps(obj, default=_to_dict, option=option)
+    except TypeError:
+        return jsonify(obj)
+    if not body.isascii() or _EXPONENT.search(body):
+        return jsonify(obj)
+
+    return current_app.response_class(body + b'\n', mimetype=provider.mimetype)
@@ -0,0 +1,83 @@
+# backend/httpcache.py
+# Conditional GET and response compression for the bets API.
+#
+# - VersionedCache: serialized body per mutation counter; unchanged data is served as 304
+#   (If-None-Match) or from the cached bytes, never re-serialized. ETags include a per-process
+#   boot nonce.
+# - compress_response: after_request hook that brotli/gzip-compresses large bodies.
+
+import gzip
+import os
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # optional; gzip is always available
+    brotli = None
+
+MIN_COMPRESS_BYTES = 1024
+
+
+class VersionedCache:
+    """
+    The counter restarts at 0 in every process, so ETags carry a per-process boot nonce:
+    after a restart, or from another worker, a client's old ETag never matches.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.version = 0
+        self._boot = os.urandom(6).hex()
+        self._cached = (None, None)  # (version, body), replaced as one tuple
+
+    def bump(self):
+        self.version += 1
+
+    def _etag(self, version):
+        return f'{self.name}-{self._boot}-{version}'
+
+    @property
+    def etag(self):
+        return self._etag(self.version)
+
+    def not_modified(self):
+        return request.if_none_match.contains_weak(self.etag)
+
+    def body(self, render):
+        """
+        (etag, bytes) for the current version; render() -> bytes runs only when it changed.
+        The version is read before rendering, so a mutation during render() leaves the body
+        under the older version and the next request renders again.
+        """
+        version = self.version
+        cached_version, cached_body = self._cached
+        if cached_version != version:
+            cached_body = render()
+            self._cached = (version, cached_body)
+        return self._etag(version), cached_body
+
+
+def compress_response(response):
+    if (
+        response.status_code < 200
+        or response.status_code in (204, 304)
+        or response.direct_passthrough
+        or 'Content-Encoding' in response.headers
+    ):
+        return response
+    data = response.get_data()
+    if len(data) < MIN_COMPRESS_BYTES:
+        return response
+
+    accepted = request.accept_encodings
+    if brotli is not None and accepted['br']:
+        response.set_data(brotli.compress(data, quality=4))
+        response.headers['Content-Encoding'] = 'br'
+    elif accepted['gzip']:
+        response.set_data(gzip.compress(data, compresslevel=5))
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        return response
+    response.vary.add('Accept-Encoding')
+    return response
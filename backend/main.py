@@ -1,10 +1,27 @@
+import json
+import os
 import random
+import threading
+import time
 from flask import Flask, jsonify, request
 from flask_cors import CORS
 from datetime import datetime
+from deadlines import DeadlineScheduler, format_deadline, parse_deadline
+from exposure import HAVE_NUMPY, BetColumns, exposure_report, fetch_balances
+from fastjson import BetsJSONProvider, fast_jsonify
+from httpcache import VersionedCache, compress_response
+from metrics import init_metrics
+from records import BetRecord
+from search import BetIndex
+from stats import UserStats
+from tracing import init_tracing
 
 app = Flask(__name__)
-CORS(app)
+app.json = BetsJSONProvider(app)
+CORS(app, expose_headers=['ETag', 'X-Trace-Id'])
+app.after_request(compress_response)
+init_metrics(app)
+init_tracing(app)
 
 users = ['alice@email.com', 'bob@email.com', 'charlie@email.com', 'diana@email.com']
 
@@ -43,122 +60,224 @@ sample_descriptions = [
 
 # In-memory bets list
 bets = []
+# Bumped on every create/accept/settle; versions GET /api/bets
+bets_cache = VersionedCache('bets')
+# Held while a bet changes status, so handlers and the deadline timer never interleave
+bets_lock = threading.RLock()
 
-# Seed 30 sample bets at server startup
-for i in range(30):
+# Seed bets at server startup: from BETS_SEED_FILE (JSON lines, e.g. generated by
+# benchmarks/dataset.py) when set, otherwise 30 random sample bets
+seed_file = os.getenv('BETS_SEED_FILE')
+if seed_file:
+    with open(seed_file, encoding='utf-8') as f:
+        bets.extend(BetRecord.from_dict(json.loads(line)) for line in f if line.strip())
+
+for i in range(0 if seed_file else 30):
     sender = random.choice(users)
     receiver = random.choice([u for u in users if u != sender])
     amount = round(random.uniform(5, 100), 2)
     description = random.choice(sample_descriptions)
     
-    bet = {
+    bet = BetRecord.from_dict({
         'id': len(bets) + 1,
         'sender': sender,
         'receiver': receiver,
         'amount': amount,
         'description': description,
         'status': 'pending'
-    }
+    })
     bets.append(bet)
 
+# Per-user aggregates and leaderboard, kept current by every status change from here on
+user_stats = UserStats.rebuild(bets)
+# Inverted index over descriptions for /api/bets/search
+bet_index = BetIndex.build(bets)
+# Columnar copy of open-bet amounts and parties for /api/analytics/exposure
+bet_columns = BetColumns.build(bets)
+
+
+def find_bet(bet_id):
+    # Ids are assigned as len(bets) + 1, so the list position is the fast path
+    if 0 < bet_id <= len(bets) and bets[bet_id - 1].get('id') == bet_id:
+        return bets[bet_id - 1]
+    return next((b for b in bets if b.get('id') == bet_id), None)
+
+
+def deadlines_fired(changed):
+    for bet, old_status in changed:
+        user_stats.transition(bet, old_status)
+        bet_columns.update(bet)
+    bets_cache.bump()
+
+
+# Pick up expires_at/settle_by of reloaded bets; any that passed while down fire right away
+deadlines = DeadlineScheduler(bets_lock, on_change=deadlines_fired)
+deadlines.load(bets)
+deadlines.start()
+
+
+def read_deadlines(data):
+    # -> ({'expires_at': ..., 'settle_by': ...} for the fields given, None) or (None, error)
+    due = {}
+    for field in ('expires_at', 'settle_by'):
+        try:
+            ts = parse_deadline(data.get(field))
+        except ValueError:
+            return None, f'{field} must be an ISO 8601 timestamp'
+        if ts is not None:
+            if ts <= time.time():
+                return None, f'{field} must be in the future'
+            due[field] = ts
+    if 'expires_at' in due and 'settle_by' in due and due['settle_by'] < due['expires_at']:
+        return None, 'settle_by must not be before expires_at'
+    return {field: format_deadline(ts) for field, ts in due.items()}, None
+
 @app.route('/')
 def index():
     return 'Test'
 
 @app.route('/api/bets', methods=['GET'])
 def get_bets():
-    return jsonify({'bets': bets})
+    if bets_cache.not_modified():
+        etag = bets_cache.etag
+        response = app.response_class(status=304)
+    else:
+        etag, body = bets_cache.body(lambda: fast_jsonify({'bets': bets}).get_data())
+        response = app.response_class(body, mimetype=app.json.mimetype)
+    response.set_etag(etag, weak=True)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+@app.route('/api/bets/search', methods=['GET'])
+def search_bets():
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'error': 'q is required'}), 400
+    limit = request.args.get('limit', default=20, type=int)
+    if limit < 1 or limit > 100:
+        return jsonify({'error': 'limit must be between 1 and 100'}), 400
+    with bets_lock:
+        ids = bet_index.search(query, find_bet, limit=limit,
+                               status=request.args.get('status'), user=request.args.get('user'))
+        results = [find_bet(bet_id) for bet_id in ids]
+        return jsonify({'query': query, 'bets': results}), 200
+
+@app.route('/api/bets/search/index', methods=['GET'])
+def search_index_info():
+    with bets_lock:
+        return jsonify(bet_index.info()), 200
 
 @app.route('/api/bets/create', methods=['POST'])
 def create_bet():
     data = request.get_json()
-    
-    bet = {
-        'id': len(bets) + 1,
-        'sender': data.get('sender'),   
-        'receiver': data.get('receiver'),
-        'amount': data.get('amount'),
-        'description': data.get('description'),
-        'status': 'pending'
-    }
-    
-    bets.append(bet)  # Add to the list
+    due, error = read_deadlines(data)
+    if error:
+        return jsonify({'error': error}), 400
+
+    with bets_lock:
+        bet = BetRecord.from_dict({
+            'id': len(bets) + 1,
+            'sender': data.get('sender'),
+            'receiver': data.get('receiver'),
+            'amount': data.get('amount'),
+            'description': data.get('description'),
+            'status': 'pending'
+        })
+        bet.update(due)
+
+        bets.append(bet)  # Add to the list
+        user_stats.add(bet)
+        bet_index.add(bet)
+        bet_columns.add(bet)
+        bets_cache.bump()
+    deadlines.schedule(bet)
     
     return jsonify({'status': 'success', 'bet': bet}), 201
 
 @app.route('/api/bets/<int:bet_id>/accept', methods=['POST'])
 def accept_bet(bet_id):
-    # Finds the bet in the "bets" list 
-    bet = next((b for b in bets if b.get('id') == bet_id), None)
-    if not bet: # If the bet doesn't exist, then we return an error
-        return jsonify({'error': 'Bet not found'}), 404
+    data = request.get_json(silent=True) or {}
+    with bets_lock:
+        # Finds the bet in the "bets" list
+        bet = find_bet(bet_id)
+        if not bet: # If the bet doesn't exist, then we return an error
+            return jsonify({'error': 'Bet not found'}), 404
 
-    if bet.get('status') == 'accepted':
-        return jsonify({'status': 'already_accepted', 'bet': bet}), 200
-    if bet.get('status') == 'settled':
-        return jsonify({'error': 'Bet already settled'}), 400
+        # Apply deadlines the timer thread has not reached yet, so a late accept never wins
+        deadlines.run_due()
+        if bet.get('status') == 'accepted':
+            return jsonify({'status': 'already_accepted', 'bet': bet}), 200
+        if bet.get('status') == 'settled':
+            return jsonify({'error': 'Bet already settled'}), 400
+        if bet.get('status') == 'expired':
+            return jsonify({'error': 'Bet expired'}), 400
 
-    # Changes the status of the bet from "pending" to "accepted"
-    data = request.get_json(silent=True) or {}
-    bet['status'] = 'accepted'
-    bet['accepted_at'] = datetime.utcnow().isoformat()
-    if 'user' in data:
-        bet['accepted_by'] = data['user']
+        # Changes the status of the bet from "pending" to "accepted"
+        bet['status'] = 'accepted'
+        bet['accepted_at'] = datetime.utcnow().isoformat()
+        if 'user' in data:
+            bet['accepted_by'] = data['user']
 
-    # TODO: authorize funds (VISA) here and store auth/hold id
-    bet['payment'] = {'status': 'authorization_pending', 'auth_id': None}
+        # TODO: authorize funds (VISA) here and store auth/hold id
+        bet['payment'] = {'status': 'authorization_pending', 'auth_id': None}
+        user_stats.transition(bet, 'pending')
+        bet_columns.update(bet)
+        bets_cache.bump()
 
     return jsonify({'status': 'success', 'bet': bet}), 200
 
 @app.route('/api/bets/<int:bet_id>/settle', methods=['POST'])
 def settle_bet(bet_id):
-    # Find the bet
-    bet = next((b for b in bets if b.get('id') == bet_id), None)
-    
-    if not bet:
-        return jsonify({'error': 'Bet not found'}), 404
-    
-    # Check if bet is in correct status
-    if bet.get('status') != 'accepted':
-        return jsonify({'error': 'Bet must be accepted before settling'}), 400
-    
-    if bet.get('status') == 'settled':
-        return jsonify({'error': 'Bet already settled'}), 400
-    
-    # Get winner from request
-    data = request.get_json()
-    winner = data.get('winner')  # Should be 'sender' or 'receiver'
-    
-    # Validate winner
-    if winner not in ['sender', 'receiver']:
-        return jsonify({'error': 'Winner must be "sender" or "receiver"'}), 400
-    
-    # Update bet status
-    bet['status'] = 'settled'
-    bet['winner'] = winner
-    bet['settled_at'] = datetime.utcnow().isoformat()
-    
-    # Determine who won and who lost
-    if winner == 'sender':
-        winner_email = bet['sender']
-        loser_email = bet['receiver']
-    else:
-        winner_email = bet['receiver']
-        loser_email = bet['sender']
-    
-    # TODO: VISA Payment Integration Goes Here
-    # This is where you'll:
-    # 1. Charge the loser's account (bet['amount'])
-    # 2. Transfer money to winner's account
-    # 3. Store transaction IDs
-    
-    bet['payment'] = {
-        'status': 'completed',
-        'winner': winner_email,
-        'loser': loser_email,
-        'amount': bet['amount'],
-        'transaction_id': None  # Will be filled when VISA API is integrated
-    }
+    with bets_lock:
+        # Find the bet
+        bet = find_bet(bet_id)
+        if not bet:
+            return jsonify({'error': 'Bet not found'}), 404
+
+        # Check if bet is in correct status
+        if bet.get('status') != 'accepted':
+            return jsonify({'error': 'Bet must be accepted before settling'}), 400
+
+        if bet.get('status') == 'settled':
+            return jsonify({'error': 'Bet already settled'}), 400
+
+        # Get winner from request
+        data = request.get_json()
+        winner = data.get('winner')  # Should be 'sender' or 'receiver'
+
+        # Validate winner
+        if winner not in ['sender', 'receiver']:
+            return jsonify({'error': 'Winner must be "sender" or "receiver"'}), 400
+
+        # Update bet status
+        bet['status'] = 'settled'
+        bet['winner'] = winner
+        bet['settled_at'] = datetime.utcnow().isoformat()
+
+        # Determine who won and who lost
+        if winner == 'sender':
+            winner_email = bet['sender']
+            loser_email = bet['receiver']
+        else:
+            winner_email = bet['receiver']
+            loser_email = bet['sender']
+
+        # TODO: VISA Payment Integration Goes Here
+        # This is where you'll:
+        # 1. Charge the loser's account (bet['amount'])
+        # 2. Transfer money to winner's account
+        # 3. Store transaction IDs
+
+        bet['payment'] = {
+            'status': 'completed',
+            'winner': winner_email,
+            'loser': loser_email,
+            'amount': bet['amount'],
+            'transaction_id': None  # Will be filled when VISA API is integrated
+        }
+        user_stats.transition(bet, 'accepted')
+        bet_columns.update(bet)
+        bets_cache.bump()
     
     return jsonify({
         'status': 'success',
@@ -166,6 +285,65 @@ def settle_bet(bet_id):
         'message': f'Bet settled. ${bet["amount"]} transferred to {winner_email}'
     }), 200
 
+@app.route('/api/users/<path:email>/stats', methods=['GET'])
+def get_user_stats(email):
+    with bets_lock:
+        stats = user_stats.user(email)
+    if stats is None:
+        return jsonify({'error': 'User not found'}), 404
+    return jsonify(stats), 200
+
+@app.route('/api/leaderboard', methods=['GET'])
+def get_leaderboard():
+    top = request.args.get('top', default=10, type=int)
+    if top < 1 or top > 1000:
+        return jsonify({'error': 'top must be between 1 and 1000'}), 400
+    with bets_lock:
+        leaderboard = user_stats.top(top)
+    return jsonify({'leaderboard': leaderboard}), 200
+
+@app.route('/api/stats/verify', methods=['GET'])
+def verify_stats():
+    # Full rebuild compared against the incremental state; O(bets), for checks and tests
+    with bets_lock:
+        mismatches = user_stats.diff(UserStats.rebuild(bets))
+        users = len(user_stats)
+    return jsonify({'ok': not mismatches, 'users': users, 'bets': len(bets), 'mismatches': mismatches}), 200
+
+@app.route('/api/stats/rebuild', methods=['POST'])
+def rebuild_stats():
+    global user_stats
+    with bets_lock:
+        user_stats = UserStats.rebuild(bets)
+        users = len(user_stats)
+    return jsonify({'ok': True, 'users': users, 'bets': len(bets)}), 200
+
+@app.route('/api/analytics/exposure', methods=['GET', 'POST'])
+def get_exposure():
+    # POST {"outcomes": {bet_id: "sender" | "receiver"}, "default": "sender"} adds a custom scenario
+    if not HAVE_NUMPY:
+        return jsonify({'error': 'numpy is required for analytics'}), 503
+    top = request.args.get('top', default=20, type=int)
+    if top < 0 or top > 1000:
+        return jsonify({'error': 'top must be between 0 and 1000'}), 400
+    data = {}
+    if request.method == 'POST':
+        data = request.get_json(silent=True) or {}
+        if not isinstance(data, dict):
+            return jsonify({'error': 'body must be a JSON object'}), 400
+    outcomes = data.get('outcomes')
+    if outcomes is not None and not isinstance(outcomes, dict):
+        return jsonify({'error': 'outcomes must be an object of bet id -> winner'}), 400
+    with bets_lock:
+        snapshot = bet_columns.snapshot()
+    source = fetch_balances if request.args.get('balances', '1') != '0' else None
+    try:
+        report = exposure_report(snapshot, source, top=top, outcomes=outcomes,
+                                 default_winner=data.get('default', 'sender'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(report), 200
+
 if __name__ == '__main__':
     app.run(debug=True, port=5000)
     
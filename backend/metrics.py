@@ -0,0 +1,114 @@
+# backend/metrics.py
+# Prometheus metrics for the bets backend (text format 0.0.4, no extra dependencies).
+#
+# init_metrics(app) installs before/after_request hooks that record per-route latency
+# histograms, status counters and 400/404 outcomes, and serves them on GET /metrics.
+
+import bisect
+import threading
+import time
+
+from flask import g, request
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+def _labels(names, values, extra=None):
+    parts = ['{}="{}"'.format(n, str(v).replace('\\', '\\\\').replace('"', '\\"')) for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+
+class Counter:
+    def __init__(self, name, doc, labelnames=()):
+        self.name, self.doc, self.labelnames = name, doc, tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(n, '')) for n in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.doc}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{_labels(self.labelnames, key)} {value:g}')
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, doc, labelnames=(), buckets=BUCKETS):
+        self.name, self.doc, self.labelnames = name, doc, tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # key -> [bucket counts..., +Inf], [sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(n, '')) for n in self.labelnames)
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, totals = self._series.setdefault(key, ([0] * (len(self.buckets) + 1), [0.0, 0]))
+            counts[idx] += 1
+            totals[0] += value
+            totals[1] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.doc}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = sorted((k, (list(c), list(t))) for k, (c, t) in self._series.items())
+        for key, (counts, (total, count)) in series:
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                le = 'le="{:g}"'.format(bound)
+                lines.append(f'{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}')
+            inf = 'le="+Inf"'
+            lines.append(f'{self.name}_bucket{_labels(self.labelnames, key, inf)} {count}')
+            lines.append(f'{self.name}_sum{_labels(self.labelnames, key)} {total:.6f}')
+            lines.append(f'{self.name}_count{_labels(self.labelnames, key)} {count}')
+        return lines
+
+
+HTTP_REQUESTS = Counter('bets_http_requests_total', 'HTTP requests by route, method and status',
+                        ('method', 'route', 'status'))
+HTTP_LATENCY = Histogram('bets_http_request_duration_seconds', 'Handler latency by route', ('method', 'route'))
+HTTP_OUTCOMES = Counter('bets_http_outcomes_total', 'Rejected requests: 400 invalid, 404 not found, 409 conflict',
+                        ('route', 'outcome'))
+BET_DEADLINES = Counter('bets_deadline_actions_total', 'Deadline actions: expired, overdue',
+                        ('action',))
+METRICS = [HTTP_REQUESTS, HTTP_LATENCY, HTTP_OUTCOMES, BET_DEADLINES]
+
+OUTCOME_NAMES = {400: 'invalid', 404: 'not_found', 409: 'conflict'}
+
+
+def render():
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+def init_metrics(app):
+    @app.before_request
+    def _start_timer():
+        g.metrics_started = time.perf_counter()
+
+    @app.after_request
+    def _record(response):
+        started = g.pop('metrics_started', None)
+        # url_rule is the route template (e.g. /api/bets/<int:bet_id>/accept); None for unmatched paths
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        if started is not None:
+            HTTP_LATENCY.observe(time.perf_counter() - started, method=request.method, route=route)
+        HTTP_REQUESTS.inc(method=request.method, route=route, status=response.status_code)
+        if response.status_code in OUTCOME_NAMES:
+            HTTP_OUTCOMES.inc(route=route, outcome=OUTCOME_NAMES[response.status_code])
+        return response
+
+    @app.route('/metrics', methods=['GET'])
+    def metrics():
+        return app.response_class(render(), content_type=CONTENT_TYPE)
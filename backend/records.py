@@ -0,0 +1,141 @@
+# backend/records.py
+# Compact in-memory bet records for large working sets (millions of bets).
+#
+# A bet loaded from JSON is a dict holding its own copies of every key, email, description and
+# status string. BetRecord keeps the same data in fixed __slots__ (no per-bet dict) and shares
+# everything repetitive:
+#   - emails and descriptions are de-duplicated through an intern table, so each distinct string
+#     exists once and a bet holds an 8-byte reference to the shared copy. Users are not mapped to
+#     small-int ids: a slot holds a reference either way, and ids above 256 would each be an int
+#     object of their own, so they would save nothing over the shared email string
+#   - status is a small-int code (STATUSES index), decoded on read
+#   - payment dicts get interned keys and emails
+# Fields outside the known set go to a per-bet `_extra` dict, created only when needed.
+#
+# BetRecord answers the dict operations the handlers use (bet['x'], bet.get, item assignment,
+# `in`), and to_dict() rebuilds the original dict so GET /api/bets output is byte-identical.
+
+import sys
+
+# Status codes; unknown statuses from seed files are appended at load time
+STATUSES = ['pending', 'accepted', 'settled', 'expired']
+_STATUS_CODES = {s: i for i, s in enumerate(STATUSES)}
+
+# Output order is irrelevant (JSON keys are sorted), but keep the creation order for repr/to_dict
+FIELDS = (
+    'id', 'sender', 'receiver', 'amount', 'description', 'status',
+    'accepted_at', 'accepted_by', 'payment', 'winner', 'settled_at',
+    'expires_at', 'settle_by', 'expired_at', 'overdue', 'overdue_at',
+)
+_INTERNED = frozenset(('sender', 'receiver', 'description', 'accepted_by', 'winner'))
+_MISSING = object()
+
+
+class InternTable:
+    """
+    Canonical copy of each distinct string (emails, descriptions). Unlike sys.intern, the table
+    can be measured and lives exactly as long as the bet store.
+    """
+
+    def __init__(self):
+        self._values = {}
+
+    def __len__(self):
+        return len(self._values)
+
+    def __call__(self, value):
+        if not isinstance(value, str):
+            return value
+        return self._values.setdefault(value, value)
+
+    def memory(self):
+        return sys.getsizeof(self._values) + sum(sys.getsizeof(v) for v in self._values)
+
+
+STRINGS = InternTable()
+
+
+def _status_code(status):
+    # Only strings are encoded; anything else would later be decoded as a STATUSES index
+    if not isinstance(status, str):
+        raise TypeError(f'bet status must be a string, not {type(status).__name__}')
+    code = _STATUS_CODES.get(status)
+    if code is None:
+        code = _STATUS_CODES[status] = len(STATUSES)
+        STATUSES.append(status)
+    return code
+
+
+def _compact_payment(payment):
+    if not isinstance(payment, dict):
+        return payment
+    return {sys.intern(k): STRINGS(v) for k, v in payment.items()}
+
+
+class BetRecord:
+    __slots__ = FIELDS + ('_extra',)
+
+    def __init__(self, **fields):
+        for key, value in fields.items():
+            self[key] = value
+
+    @classmethod
+    def from_dict(cls, data):
+        bet = cls.__new__(cls)
+        for key, value in data.items():
+            bet[key] = value
+        return bet
+
+    def __setitem__(self, key, value):
+        if key in _INTERNED:
+            value = STRINGS(value)
+        elif key == 'status':
+            value = _status_code(value)
+        elif key == 'payment':
+            value = _compact_payment(value)
+        elif key not in FIELDS:
+            extra = getattr(self, '_extra', None)
+            if extra is None:
+                extra = self._extra = {}
+            extra[sys.intern(key)] = value
+            return
+        object.__setattr__(self, key, value)
+
+    def get(self, key, default=None):
+        if key in FIELDS:
+            value = getattr(self, key, _MISSING)
+            if value is _MISSING:
+                return default
+            if key == 'status':
+                return STATUSES[value]
+            return value
+        extra = getattr(self, '_extra', None)
+        return default if extra is None else extra.get(key, default)
+
+    def __getitem__(self, key):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING) is not _MISSING
+
+    def update(self, other):
+        for key, value in other.items():
+            self[key] = value
+
+    def to_dict(self):
+        out = {}
+        for key in FIELDS:
+            value = getattr(self, key, _MISSING)
+            if value is not _MISSING:
+                out[key] = STATUSES[value] if key == 'status' else value
+        extra = getattr(self, '_extra', None)
+        if extra:
+            out.update(extra)
+        return out
+
+    def __repr__(self):
+        return f'BetRecord({self.to_dict()!r})'
+
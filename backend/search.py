@@ -0,0 +1,171 @@
+# backend/search.py
+# Inverted index over bet descriptions for GET /api/bets/search.
+#
+# - Tokens: lowercase letters/digits with apostrophes dropped ("can't" -> "cant", "$100k" -> "100k"),
+#   minus a few stopwords. Every query term must match (AND); the last term also matches as a
+#   prefix, so "ches" finds "chess" while typing.
+# - Postings are array('I') of bet ids in ascending order (4 bytes per posting), which makes
+#   membership a bisect. Participants are indexed too, so a user filter is just one more list.
+# - Ranking: sum of IDF over the query terms, exact last-term matches ahead of prefix matches,
+#   newest first within a score. Candidates normally come from walking the last term's
+#   expansions newest-first in score order, stopping after `limit` hits, so broad queries stay
+#   as cheap as narrow ones; a much narrower list (user filter, rare earlier term) is scored instead.
+#
+# Descriptions never change after create, so add() is the only update; status is checked at
+# query time against the live bet.
+
+import bisect
+import math
+import re
+import sys
+from array import array
+
+TOKEN = re.compile(r'[a-z0-9]+')
+STOPWORDS = frozenset('a an and at be by i in is it of on the this to will you'.split())
+MAX_EXPANSIONS = 50
+# Score the narrowest list in full only when it is this many times smaller than the
+# expansions; otherwise the early-stopping walk is cheaper for anything with hits
+FULL_SCORE_RATIO = 8
+
+
+def tokenize(text):
+    return [t for t in TOKEN.findall((text or '').lower().replace("'", '').replace('’', ''))
+            if t not in STOPWORDS]
+
+
+def _contains(postings, bet_id):
+    i = bisect.bisect_left(postings, bet_id)
+    return i < len(postings) and postings[i] == bet_id
+
+
+def _append(postings, bet_id):
+    # Ids are appended in creation order; a seed file out of order falls back to an insert
+    if not postings or postings[-1] < bet_id:
+        postings.append(bet_id)
+    elif not _contains(postings, bet_id):
+        postings.insert(bisect.bisect_left(postings, bet_id), bet_id)
+
+
+class BetIndex:
+    def __init__(self):
+        self._terms = {}  # term -> array('I') of bet ids
+        self._users = {}  # email -> array('I') of bet ids the user is party to
+        self._vocab = []  # sorted terms, for prefix expansion
+        self.docs = 0
+
+    @classmethod
+    def build(cls, bets):
+        index = cls()
+        for bet in bets:
+            index.add(bet)
+        return index
+
+    def add(self, bet):
+        bet_id = bet.get('id')
+        if not isinstance(bet_id, int) or bet_id < 0:
+            return
+        self.docs += 1
+        for term in set(tokenize(bet.get('description'))):
+            postings = self._terms.get(term)
+            if postings is None:
+                postings = self._terms[term] = array('I')
+                bisect.insort(self._vocab, term)
+            _append(postings, bet_id)
+        for email in {bet.get('sender'), bet.get('receiver')} - {None}:
+            _append(self._users.setdefault(email, array('I')), bet_id)
+
+    def _idf(self, postings):
+        return math.log(1 + self.docs / (1 + len(postings)))
+
+    def _expand(self, prefix):
+        # (postings, score) for vocabulary terms starting with prefix: exact match first, then by IDF
+        out = []
+        i = bisect.bisect_left(self._vocab, prefix)
+        while i < len(self._vocab) and self._vocab[i].startswith(prefix):
+            term = self._vocab[i]
+            postings = self._terms[term]
+            out.append((postings, self._idf(postings) + (1.0 if term == prefix else 0.0)))
+            i += 1
+        out.sort(key=lambda e: -e[1])
+        return out[:MAX_EXPANSIONS]
+
+    def search(self, query, lookup, limit=20, status=None, user=None):
+        """
+        Ranked bet ids matching every term of query. lookup(bet_id) -> bet dict or None,
+        used for the status filter.
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+        required = []
+        base = 0.0
+        for term in terms[:-1]:
+            postings = self._terms.get(term)
+            if postings is None:
+                return []
+            required.append(postings)
+            base += self._idf(postings)
+        if user is not None:
+            postings = self._users.get(user)
+            if postings is None:
+                return []
+            required.append(postings)
+        expansions = self._expand(terms[-1])
+        if not expansions:
+            return []
+
+        def accept(bet_id):
+            if not all(_contains(p, bet_id) for p in required):
+                return False
+            if status is None:
+                return True
+            bet = lookup(bet_id)
+            return bet is not None and bet.get('status') == status
+
+        smallest = min(required, key=len) if required else None
+        if smallest is None or len(smallest) * FULL_SCORE_RATIO >= sum(len(p) for p, _ in expansions):
+            # Walk the last term's expansions in score order, newest first; stop at `limit`
+            hits, seen = [], set()
+            for postings, _ in expansions:
+                for bet_id in reversed(postings):
+                    if bet_id in seen:
+                        continue
+                    seen.add(bet_id)
+                    if accept(bet_id):
+                        hits.append(bet_id)
+                        if len(hits) >= limit:
+                            return hits
+            return hits
+
+        # A filter or earlier term is the narrowest list: score its members newest first.
+        # With a single expansion every hit scores the same, so the first `limit` win.
+        scored = []
+        for bet_id in reversed(smallest):
+            for postings, score in expansions:
+                if _contains(postings, bet_id):
+                    if accept(bet_id):
+                        scored.append((base + score, bet_id))
+                    break
+            if len(expansions) == 1 and len(scored) >= limit:
+                break
+        scored.sort(reverse=True)
+        return [bet_id for _, bet_id in scored[:limit]]
+
+    def memory(self):
+        """
+        Approximate index size in bytes (posting arrays, dicts, vocabulary strings).
+        """
+        total = sys.getsizeof(self._terms) + sys.getsizeof(self._users) + sys.getsizeof(self._vocab)
+        for table in (self._terms, self._users):
+            for key, postings in table.items():
+                total += sys.getsizeof(key) + sys.getsizeof(postings)
+        return total
+
+    def info(self):
+        return {
+            'bets': self.docs,
+            'terms': len(self._terms),
+            'users': len(self._users),
+            'postings': sum(len(p) for p in self._terms.values()) + sum(len(p) for p in self._users.values()),
+            'bytes': self.memory(),
+        }
@@ -0,0 +1,227 @@
+# backend/stats.py
+# Per-user bet statistics and a net-winnings leaderboard, updated incrementally.
+#
+# Every status change calls transition(bet, old_status), which subtracts the bet's
+# contribution in its old status and adds it in the new one. Nothing ever rescans `bets`:
+# a user's stats are a dict lookup, a leaderboard move or rank a few bisects in a bucketed
+# sorted list, and the top N a walk over its first buckets. rebuild(bets) recomputes everything from scratch; diff() compares two
+# instances, which is how GET /api/stats/verify checks the incremental state.
+#
+#   python backend/stats.py --url http://localhost:5000            # verify, exit 1 on mismatch
+#   python backend/stats.py --url http://localhost:5000 --rebuild  # replace with a fresh rebuild
+
+import bisect
+import itertools
+import json
+import sys
+import urllib.request
+
+OPEN = ('pending', 'accepted')
+
+
+def to_cents(amount):
+    try:
+        return int(round(float(amount) * 100))
+    except (TypeError, ValueError):
+        return 0
+
+
+class SortedList:
+    """
+    Sorted list split into buckets of ~LOAD items (the sortedcontainers layout): add/remove are a
+    bisect over bucket maxima plus a memmove within one bucket instead of across the whole list.
+    """
+
+    LOAD = 1000
+
+    def __init__(self, items=()):
+        items = sorted(items)
+        self._lists = [items[i:i + self.LOAD] for i in range(0, len(items), self.LOAD)]
+        self._maxes = [lst[-1] for lst in self._lists]
+        self._len = len(items)
+
+    def __len__(self):
+        return self._len
+
+    def __iter__(self):
+        return itertools.chain.from_iterable(self._lists)
+
+    def add(self, value):
+        self._len += 1
+        if not self._maxes:
+            self._lists.append([value])
+            self._maxes.append(value)
+            return
+        i = bisect.bisect_left(self._maxes, value)
+        if i == len(self._maxes):
+            i -= 1
+            self._lists[i].append(value)
+            self._maxes[i] = value
+        else:
+            bisect.insort(self._lists[i], value)
+        lst = self._lists[i]
+        if len(lst) > 2 * self.LOAD:
+            half = lst[self.LOAD:]
+            del lst[self.LOAD:]
+            self._lists.insert(i + 1, half)
+            self._maxes[i] = lst[-1]
+            self._maxes.insert(i + 1, half[-1])
+
+    def remove(self, value):
+        i = bisect.bisect_left(self._maxes, value)
+        if i == len(self._maxes) or self._maxes[i] < value:
+            raise ValueError(f'{value!r} not in list')
+        lst = self._lists[i]
+        j = bisect.bisect_left(lst, value)
+        if lst[j] != value:
+            raise ValueError(f'{value!r} not in list')
+        del lst[j]
+        self._len -= 1
+        if not lst:
+            del self._lists[i]
+            del self._maxes[i]
+        elif j == len(lst):
+            self._maxes[i] = lst[-1]
+
+    def index(self, value):
+        i = bisect.bisect_left(self._maxes, value)
+        return sum(map(len, self._lists[:i])) + bisect.bisect_left(self._lists[i], value)
+
+    def head(self, n):
+        return list(itertools.islice(self, n))
+
+
+def _new_totals():
+    return {'bets': 0, 'pending': 0, 'accepted': 0, 'settled': 0, 'expired': 0,
+            'wins': 0, 'losses': 0, 'net_cents': 0, 'exposure_cents': 0, 'wagered_cents': 0}
+
+
+class UserStats:
+    def __init__(self):
+        self._users = {}  # email -> totals
+        self._board = SortedList()  # (-net_cents, email): rank 1 first, ties by email
+
+    def __len__(self):
+        return len(self._users)
+
+    @classmethod
+    def rebuild(cls, bets):
+        stats = cls()
+        stats._board = None  # totals first, then one sort instead of a board move per bet
+        for bet in bets:
+            stats.add(bet)
+        stats._board = SortedList((-totals['net_cents'], email) for email, totals in stats._users.items())
+        return stats
+
+    def add(self, bet):
+        self._apply(bet, bet.get('status'), 1)
+
+    def transition(self, bet, old_status):
+        if old_status != bet.get('status'):
+            self._apply(bet, old_status, -1)
+            self._apply(bet, bet.get('status'), 1)
+
+    def _totals(self, email):
+        totals = self._users.get(email)
+        if totals is None:
+            totals = self._users[email] = _new_totals()
+            if self._board is not None:
+                self._board.add((0, email))
+        return totals
+
+    def _apply(self, bet, status, sign):
+        cents = to_cents(bet.get('amount'))
+        for role in ('sender', 'receiver'):
+            email = bet.get(role)
+            if email is None:
+                continue
+            totals = self._totals(email)
+            totals['bets'] += sign
+            totals[status] = totals.get(status, 0) + sign
+            if status in OPEN:
+                totals['exposure_cents'] += sign * cents
+            elif status == 'settled':
+                won = bet.get('winner') == role
+                totals['wins' if won else 'losses'] += sign
+                totals['wagered_cents'] += sign * cents
+                self._move(email, totals, sign * (cents if won else -cents))
+
+    def _move(self, email, totals, delta):
+        if not delta:
+            return
+        if self._board is None:
+            totals['net_cents'] += delta
+            return
+        self._board.remove((-totals['net_cents'], email))
+        totals['net_cents'] += delta
+        self._board.add((-totals['net_cents'], email))
+
+    # ---- queries ----
+
+    def rank(self, email):
+        totals = self._users.get(email)
+        if totals is None:
+            return None
+        return self._board.index((-totals['net_cents'], email)) + 1
+
+    def user(self, email):
+        totals = self._users.get(email)
+        if totals is None:
+            return None
+        return {
+            'user': email,
+            'rank': self.rank(email),
+            'bets': totals['bets'],
+            'pending': totals['pending'],
+            'accepted': totals['accepted'],
+            'settled': totals['settled'],
+            'expired': totals['expired'],
+            'wins': totals['wins'],
+            'losses': totals['losses'],
+            'net_winnings': totals['net_cents'] / 100,
+            'open_exposure': totals['exposure_cents'] / 100,
+            'wagered': totals['wagered_cents'] / 100,
+        }
+
+    def top(self, n):
+        out = []
+        for i, (neg_net, email) in enumerate(self._board.head(n)):
+            totals = self._users[email]
+            out.append({'rank': i + 1, 'user': email, 'net_winnings': -neg_net / 100,
+                        'wins': totals['wins'], 'losses': totals['losses']})
+        return out
+
+    def diff(self, other, limit=20):
+        """
+        Users whose totals differ between self and other (at most `limit`), plus board order.
+        """
+        mismatches = []
+        for email in sorted(set(self._users) | set(other._users)):
+            mine, theirs = self._users.get(email), other._users.get(email)
+            if mine != theirs:
+                mismatches.append({'user': email, 'incremental': mine, 'rebuilt': theirs})
+                if len(mismatches) >= limit:
+                    break
+        if not mismatches and list(self._board) != list(other._board):
+            mismatches.append({'leaderboard': 'order differs'})
+        return mismatches
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Check the bets backend stats against a rebuild from scratch')
+    parser.add_argument('--url', default='http://localhost:5000')
+    parser.add_argument('--rebuild', action='store_true', help='replace the live stats with the rebuilt ones')
+    args = parser.parse_args(argv)
+
+    path = '/api/stats/rebuild' if args.rebuild else '/api/stats/verify'
+    req = urllib.request.Request(args.url.rstrip('/') + path, method='POST' if args.rebuild else 'GET')
+    with urllib.request.urlopen(req) as resp:
+        result = json.load(resp)
+    print(json.dumps(result, indent=2))
+    return 0 if result.get('ok') else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
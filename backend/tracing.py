@@ -0,0 +1,213 @@
+# backend/tracing.py
+# Lightweight request tracing for the bets backend; same span format and W3C `traceparent`
+# propagation as payments/tracing.py so both services' spans join into one trace.
+#
+#   TRACE_SAMPLE_RATE  fraction of requests traced (0 = off, the default)
+#   TRACE_EXPORT       file:<path> (JSON lines) or an http(s) collector URL
+#
+# init_tracing(app) opens a root span per request; tracer.span(name) adds children;
+# inject_headers(headers) forwards the trace on outgoing HTTP calls (e.g. to payments).
+
+import json
+import os
+import queue
+import random
+import threading
+import time
+import urllib.request
+from contextvars import ContextVar
+
+from flask import g, request
+
+_current_span = ContextVar('bets_current_span', default=None)
+
+
+def _new_id(nbytes):
+    return f'{random.getrandbits(nbytes * 8):0{nbytes * 2}x}'
+
+
+def parse_traceparent(header):
+    parts = (header or '').strip().split('-')
+    if len(parts) < 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        flags = int(parts[3][:2], 16)
+        int(parts[1], 16)
+        int(parts[2], 16)
+    except ValueError:
+        return None
+    if parts[1] == '0' * 32 or parts[2] == '0' * 16:
+        return None
+    return parts[1], parts[2], bool(flags & 1)
+
+
+class _NoopSpan:
+    recording = False
+    trace_id = None
+
+    def set_attribute(self, key, value):
+        pass
+
+    def rename(self, name):
+        pass
+
+    def end(self, error=None):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Span:
+    __slots__ = ('tracer', 'name', 'trace_id', 'span_id', 'parent_id', 'start', '_t0', 'attributes', '_token')
+    recording = True
+
+    def __init__(self, tracer, name, trace_id, parent_id, attributes):
+        self.tracer = tracer
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = _new_id(8)
+        self.parent_id = parent_id
+        self.start = time.time()
+        self._t0 = time.perf_counter()
+        self.attributes = attributes
+        self._token = None
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def rename(self, name):
+        self.name = name
+
+    def traceparent(self):
+        return f'00-{self.trace_id}-{self.span_id}-01'
+
+    def end(self, error=None):
+        self.tracer.export({
+            'service': self.tracer.service,
+            'name': self.name,
+            'traceId': self.trace_id,
+            'spanId': self.span_id,
+            'parentId': self.parent_id,
+            'start': self.start,
+            'durationMs': round((time.perf_counter() - self._t0) * 1000, 3),
+            'attributes': self.attributes,
+            'error': f'{type(error).__name__}: {error}' if error is not None else None,
+        })
+
+    def __enter__(self):
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _current_span.reset(self._token)
+        self.end(exc)
+        return False
+
+
+class Tracer:
+    def __init__(self, service, sample_rate, export_target):
+        self.service = service
+        self.sample_rate = sample_rate
+        self.export_target = export_target
+        self.enabled = sample_rate > 0 and bool(export_target)
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=10000)
+        if self.enabled:
+            threading.Thread(target=self._run, name='trace-exporter', daemon=True).start()
+
+    def start_request(self, name, traceparent=None, **attributes):
+        if not self.enabled:
+            return NOOP_SPAN
+        parent = parse_traceparent(traceparent)
+        if parent is not None:
+            trace_id, parent_id, sampled = parent
+        else:
+            trace_id, parent_id, sampled = _new_id(16), None, random.random() < self.sample_rate
+        return Span(self, name, trace_id, parent_id, attributes) if sampled else NOOP_SPAN
+
+    def span(self, name, **attributes):
+        parent = _current_span.get()
+        if parent is None:
+            return NOOP_SPAN
+        return Span(self, name, parent.trace_id, parent.span_id, attributes)
+
+    def export(self, span):
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def _write(self, batch):
+        if self.export_target.startswith('file:'):
+            path = self.export_target[len('file:'):]
+            if os.path.dirname(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'a', encoding='utf-8') as f:
+                f.write(''.join(json.dumps(s, default=str) + '\n' for s in batch))
+        else:
+            req = urllib.request.Request(self.export_target, data=json.dumps(batch, default=str).encode(),
+                                         headers={'Content-Type': 'application/json'}, method='POST')
+            urllib.request.urlopen(req, timeout=5).close()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + 1.0
+            while len(batch) < 256:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                self._write(batch)
+            except Exception:
+                self.dropped += len(batch)
+
+
+tracer = Tracer(
+    service=os.getenv('BETS_SERVICE_NAME', 'bets'),
+    sample_rate=float(os.getenv('TRACE_SAMPLE_RATE', '0')),
+    export_target=os.getenv('TRACE_EXPORT', 'file:backend/traces.jsonl') or None,
+)
+
+
+def inject_headers(headers):
+    # Add `traceparent` for the current span to an outgoing request's headers
+    span = _current_span.get()
+    if span is not None:
+        headers['traceparent'] = span.traceparent()
+    return headers
+
+
+def init_tracing(app):
+    @app.before_request
+    def _start_span():
+        span = tracer.start_request(f'HTTP {request.method}', traceparent=request.headers.get('traceparent'),
+                                    path=request.path)
+        g.trace_span = span.__enter__()
+
+    @app.after_request
+    def _trace_headers(response):
+        span = g.get('trace_span', NOOP_SPAN)
+        if span.recording:
+            route = request.url_rule.rule if request.url_rule else 'unmatched'
+            span.rename(f'HTTP {request.method} {route}')
+            span.set_attribute('status', response.status_code)
+            response.headers['X-Trace-Id'] = span.trace_id
+        return response
+
+    @app.teardown_request
+    def _end_span(error=None):
+        span = g.pop('trace_span', None)
+        if span is not None:
+            span.__exit__(None, error, None)
@@ -0,0 +1,6 @@
+"""
+Benchmarks for the bets backend and the payments service.
+
+Run from the repo root, e.g.:
+    python -m benchmarks.sqlite_contention
+"""
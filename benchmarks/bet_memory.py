@@ -0,0 +1,113 @@
+# benchmarks/bet_memory.py
+# Bytes per bet held by the bets backend: JSON-loaded dicts (the old store) vs records.BetRecord.
+#
+# Bets are generated with the same shape and mix as benchmarks/dataset.py (pending/accepted/settled,
+# emails from a user pool), serialized to JSON lines and loaded line by line the way backend/main.py
+# loads BETS_SEED_FILE. tracemalloc measures everything retained by the store, including shared
+# strings and intern tables. Output equality of GET /api/bets is checked on a sample.
+#
+# Usage (from repo root):
+#   python -m benchmarks.bet_memory --bets 1000000 --users 100000
+#   python -m benchmarks.bet_memory --bets 200000 --json
+
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+from benchmarks.dataset import DESCRIPTIONS, email_for
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def generate_lines(bets: int, users: int, seed: int) -> List[str]:
+    rng = random.Random(seed)
+    lines = []
+    for bet_id in range(1, bets + 1):
+        sender = rng.randrange(1, users + 1)
+        receiver = sender % users + 1 if rng.random() < 0.01 else rng.randrange(1, users + 1)
+        bet = {
+            "id": bet_id,
+            "sender": email_for(sender),
+            "receiver": email_for(receiver),
+            "amount": round(rng.uniform(5, 100), 2),
+            "description": rng.choice(DESCRIPTIONS),
+            "status": "pending",
+        }
+        roll = rng.random()
+        if roll < 0.4:
+            bet["status"] = "accepted"
+            bet["accepted_at"] = "2026-01-01T12:00:00"
+            bet["payment"] = {"status": "authorization_pending", "auth_id": None}
+            if roll < 0.15:
+                bet["status"] = "settled"
+                bet["winner"] = "sender"
+                bet["settled_at"] = "2026-01-02T12:00:00"
+                bet["payment"] = {"status": "completed", "winner": bet["sender"], "loser": bet["receiver"],
+                                  "amount": bet["amount"], "transaction_id": None}
+        lines.append(json.dumps(bet))
+    return lines
+
+
+def measure(load: Callable[[List[str]], list], lines: List[str]) -> Dict[str, float]:
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    store = load(lines)
+    elapsed = time.perf_counter() - started
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del store
+    return {"bytes_per_bet": current / len(lines), "total_mb": current / 2**20, "load_s": elapsed}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Memory per bet: dict store vs compact BetRecord store")
+    parser.add_argument("--bets", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.path.join(REPO_ROOT, "backend"))
+    import records
+
+    lines = generate_lines(args.bets, args.users, args.seed)
+
+    def load_dicts(src: List[str]) -> list:
+        return [json.loads(line) for line in src]
+
+    def load_records(src: List[str]) -> list:
+        # Fresh intern table so its strings are counted against this store
+        records.STRINGS = records.InternTable()
+        return [records.BetRecord.from_dict(json.loads(line)) for line in src]
+
+    sample = lines[:1000]
+    expected = json.dumps(load_dicts(sample), sort_keys=True)
+    actual = json.dumps([r.to_dict() for r in load_records(sample)], sort_keys=True)
+    assert expected == actual, "BetRecord output differs from the dict representation"
+
+    results = {"dict": measure(load_dicts, lines), "BetRecord": measure(load_records, lines)}
+    results["ratio"] = {"dict_over_record": results["dict"]["bytes_per_bet"] / results["BetRecord"]["bytes_per_bet"]}
+    results = {name: {k: round(v, 2) for k, v in data.items()} for name, data in results.items()}
+
+    if args.json:
+        print(json.dumps({"bets": args.bets, "users": args.users, "results": results}, indent=2))
+        return
+    print(f"{args.bets} bets, {args.users} users")
+    for name, data in results.items():
+        print(f"{name}:")
+        for key, value in data.items():
+            print(f"  {key:<18} {value}")
+
+
+if __name__ == "__main__":
+    main()
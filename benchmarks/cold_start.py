@@ -0,0 +1,138 @@
+# benchmarks/cold_start.py
+# Cold-start cost of a payments worker: import time and time to first response.
+#
+#   import:          fresh interpreter running `import payments.main` (-X importtime), median of N runs,
+#                    plus the slowest modules by cumulative import time
+#   first response:  spawn uvicorn, poll GET /health until it answers 200; the first run uses a fresh
+#                    SQLite file (schema creation), later runs reuse it (schema version check only)
+#
+# Usage (from repo root):
+#   python -m benchmarks.cold_start --runs 5
+#   python -m benchmarks.cold_start --runs 5 --output cold_start.json
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from typing import Dict, List, Tuple
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _env(db_path: str) -> Dict[str, str]:
+    env = dict(os.environ)
+    env["DATABASE_URL"] = f"sqlite:///{db_path}"
+    env.setdefault("PYTHONDONTWRITEBYTECODE", "0")
+    return env
+
+
+def measure_import(db_path: str) -> Tuple[float, List[Tuple[str, float]]]:
+    """
+    Returns (wall ms for `import payments.main`, [(module, cumulative ms)] slowest first).
+    """
+    t0 = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import payments.main"],
+        cwd=REPO_ROOT,
+        env=_env(db_path),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    wall_ms = (time.perf_counter() - t0) * 1000
+
+    modules: List[Tuple[str, float]] = []
+    for line in proc.stderr.splitlines():
+        # "import time:  self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        try:
+            _, cumulative, name = line[len("import time:"):].split("|")
+            modules.append((name.strip(), int(cumulative) / 1000))
+        except ValueError:
+            continue
+    top_level = [m for m in modules if not m[0].startswith(" ")]
+    top_level.sort(key=lambda m: m[1], reverse=True)
+    return wall_ms, top_level[:10]
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def measure_first_response(db_path: str, timeout: float = 30.0) -> float:
+    """
+    Milliseconds from spawning uvicorn until GET /health returns 200.
+    """
+    port = _free_port()
+    t0 = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "payments.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=REPO_ROOT,
+        env=_env(db_path),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        url = f"http://127.0.0.1:{port}/health"
+        while time.perf_counter() - t0 < timeout:
+            if proc.poll() is not None:
+                raise RuntimeError(f"uvicorn exited with code {proc.returncode}")
+            try:
+                with urllib.request.urlopen(url, timeout=1) as resp:
+                    if resp.status == 200:
+                        return (time.perf_counter() - t0) * 1000
+            except (urllib.error.URLError, ConnectionError):
+                time.sleep(0.01)
+        raise TimeoutError("service did not answer /health in time")
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Payments service cold-start benchmark")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--output", help="Also write results as JSON to this path")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "cold_start.db")
+
+        import_runs = []
+        slowest: List[Tuple[str, float]] = []
+        for _ in range(args.runs):
+            wall_ms, slowest = measure_import(db_path)
+            import_runs.append(wall_ms)
+
+        first_fresh = measure_first_response(db_path)
+        warm_runs = [measure_first_response(db_path) for _ in range(max(1, args.runs - 1))]
+
+    results = {
+        "python": sys.version.split()[0],
+        "runs": args.runs,
+        "import_ms_median": round(statistics.median(import_runs), 1),
+        "import_ms_min": round(min(import_runs), 1),
+        "first_response_ms_fresh_db": round(first_fresh, 1),
+        "first_response_ms_median": round(statistics.median(warm_runs), 1),
+        "slowest_imports_ms": [{"module": m, "cumulative_ms": round(ms, 1)} for m, ms in slowest],
+    }
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
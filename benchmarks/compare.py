@@ -0,0 +1,85 @@
+# benchmarks/compare.py
+# Compare two benchmarks.workloads result files and flag regressions.
+#
+# A scenario regresses when throughput drops, or p99 latency rises, by more than --threshold
+# (relative), or when its error rate rises by more than --error-threshold (absolute).
+# Exits 1 if any scenario regressed, so it can gate CI.
+#
+# Usage (from repo root):
+#   python -m benchmarks.compare results/base.json results/head.json --threshold 0.1
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from typing import Dict, List, Optional
+
+
+def _change(old: Optional[float], new: Optional[float]) -> Optional[float]:
+    if old in (None, 0) or new is None:
+        return None
+    return (new - old) / old
+
+
+def compare(base: Dict[str, dict], head: Dict[str, dict], threshold: float, error_threshold: float) -> List[dict]:
+    rows = []
+    for name in sorted(set(base) & set(head)):
+        b, h = base[name], head[name]
+        rps = _change(b["throughput_rps"], h["throughput_rps"])
+        p99 = _change(b["latency_ms"]["p99"], h["latency_ms"]["p99"])
+        errors = h["error_rate"] - b["error_rate"]
+        reasons = []
+        if rps is not None and rps < -threshold:
+            reasons.append("throughput")
+        if p99 is not None and p99 > threshold:
+            reasons.append("p99")
+        if errors > error_threshold:
+            reasons.append("errors")
+        rows.append({
+            "scenario": name,
+            "throughput_rps": [b["throughput_rps"], h["throughput_rps"]],
+            "throughput_change": round(rps, 4) if rps is not None else None,
+            "p99_ms": [b["latency_ms"]["p99"], h["latency_ms"]["p99"]],
+            "p99_change": round(p99, 4) if p99 is not None else None,
+            "error_rate": [b["error_rate"], h["error_rate"]],
+            "regressed": reasons,
+        })
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare two benchmarks.workloads result files")
+    parser.add_argument("base")
+    parser.add_argument("head")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Relative throughput/p99 tolerance")
+    parser.add_argument("--error-threshold", type=float, default=0.01, help="Absolute error-rate tolerance")
+    parser.add_argument("--json", action="store_true", help="Print JSON instead of a table")
+    args = parser.parse_args()
+
+    with open(args.base, encoding="utf-8") as f:
+        base = json.load(f)
+    with open(args.head, encoding="utf-8") as f:
+        head = json.load(f)
+    rows = compare(base["scenarios"], head["scenarios"], args.threshold, args.error_threshold)
+
+    if args.json:
+        print(json.dumps({"base": base["meta"].get("git_revision"), "head": head["meta"].get("git_revision"),
+                          "scenarios": rows}, indent=2))
+    else:
+        def fmt(v: Optional[float]) -> str:
+            return f"{v:+.1%}" if v is not None else "n/a"
+
+        print(f"{'scenario':<22}{'rps':>26}{'p99 ms':>26}{'errors':>16}  status")
+        for r in rows:
+            rps = f"{r['throughput_rps'][0]}->{r['throughput_rps'][1]} ({fmt(r['throughput_change'])})"
+            p99 = f"{r['p99_ms'][0]}->{r['p99_ms'][1]} ({fmt(r['p99_change'])})"
+            err = f"{r['error_rate'][0]:.2%}->{r['error_rate'][1]:.2%}"
+            status = "REGRESSED: " + ", ".join(r["regressed"]) if r["regressed"] else "ok"
+            print(f"{r['scenario']:<22}{rps:>26}{p99:>26}{err:>16}  {status}")
+
+    sys.exit(1 if any(r["regressed"] for r in rows) else 0)
+
+
+if __name__ == "__main__":
+    main()
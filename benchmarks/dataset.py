@@ -0,0 +1,227 @@
+# benchmarks/dataset.py
+# Reproducible dataset generator for the load-testing suite (benchmarks/workloads.py).
+#
+# Writes, from a fixed --seed:
+#   - a payments SQLite database (users, accounts, ledger rows with consistent balances),
+#     created from payments.db models so it matches the service schema
+#   - a JSON-lines bets file the bets backend loads at startup via BETS_SEED_FILE
+#   - a manifest (manifest.json) with counts, hot account ids and sample emails,
+#     read by benchmarks.workloads to pick targets
+#
+# A skewed share (--hot-share) of ledger rows lands on --hot-accounts accounts, so history
+# reads and transfer contention have realistic "celebrity" accounts to hit.
+#
+# Usage (from repo root):
+#   python -m benchmarks.dataset --users 1000000 --ledger-rows 5000000 --bets 1000000 --out bench-data
+#   DATABASE_URL=sqlite:///bench-data/payments.db uvicorn payments.main:app --port 8001
+#   BETS_SEED_FILE=bench-data/bets.jsonl python backend/main.py
+
+from __future__ import annotations
+
+import argparse
+import datetime as dt
+import json
+import os
+import random
+import sqlite3
+import time
+import uuid
+from typing import Dict, List
+
+from sqlalchemy import create_engine
+
+from payments.db import SCHEMA_VERSION, Base
+
+CHUNK = 50_000
+START = dt.datetime(2025, 1, 1)
+
+DESCRIPTIONS = [
+    "I bet the Seahawks win this Sunday",
+    "You can't finish this project in 2 hours",
+    "It will rain tomorrow",
+    "Lakers will beat the Warriors",
+    "Bitcoin will hit $100k by year end",
+    "Our team wins first place at DubHacks",
+    "Library will be full by 2pm",
+    "I can solve this coding problem in 10 minutes",
+    "Tesla stock hits $300 this quarter",
+    "I can beat you at chess",
+    "It snows this weekend",
+    "I can run a 5k in under 25 minutes",
+    "The game goes into overtime",
+    "I can learn Python in 24 hours",
+]
+
+
+def email_for(user_id: int) -> str:
+    return f"user{user_id}@example.com"
+
+
+def _timestamp(i: int, total: int) -> str:
+    # Spread rows over ~180 days in insertion order so created_at ordering matches id ordering
+    return (START + dt.timedelta(seconds=int(i * (180 * 86400 / max(total, 1))))).isoformat(sep=" ")
+
+
+def build_payments_db(path: str, users: int, ledger_rows: int, hot_accounts: int, hot_share: float,
+                      rng: random.Random) -> Dict[str, object]:
+    if os.path.exists(path):
+        os.remove(path)
+    Base.metadata.create_all(create_engine(f"sqlite:///{path}"))
+
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=OFF")
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.execute("BEGIN")
+    created = START.isoformat(sep=" ")
+
+    # One user and one USD account per user; account id == user id
+    for lo in range(1, users + 1, CHUNK):
+        hi = min(users, lo + CHUNK - 1)
+        conn.executemany(
+            "INSERT INTO users (id, email, name, created_at) VALUES (?, ?, ?, ?)",
+            ((i, email_for(i), f"User {i}", created) for i in range(lo, hi + 1)),
+        )
+
+    # Ledger: an opening deposit per account (until the row budget runs out), then transfer pairs.
+    # Balances are tracked here so the stored balance_cents equals the ledger sum.
+    balances = [0] * (users + 1)
+    hot = list(range(1, min(hot_accounts, users) + 1))
+    entry_id = 0
+    batch: List[tuple] = []
+
+    def flush() -> None:
+        conn.executemany(
+            "INSERT INTO ledger_entries (id, account_id, type, status, amount_cents, currency,"
+            " transfer_group_id, related_entry_id, created_at) VALUES (?, ?, ?, 'posted', ?, 'USD', ?, ?, ?)",
+            batch,
+        )
+        batch.clear()
+
+    deposits = min(users, ledger_rows)
+    for account_id in range(1, deposits + 1):
+        amount = rng.randrange(10_000, 500_000)
+        entry_id += 1
+        balances[account_id] += amount
+        batch.append((entry_id, account_id, "deposit", amount, None, None, _timestamp(entry_id, ledger_rows)))
+        if len(batch) >= CHUNK:
+            flush()
+
+    def pick() -> int:
+        if hot and rng.random() < hot_share:
+            return rng.choice(hot)
+        return rng.randrange(1, deposits + 1)
+
+    while users > 1 and entry_id + 2 <= ledger_rows:
+        src, dst = pick(), pick()
+        if src == dst or balances[src] < 100:
+            continue
+        amount = rng.randrange(100, min(balances[src], 20_000) + 1)
+        group = str(uuid.UUID(int=rng.getrandbits(128)))
+        ts = _timestamp(entry_id + 1, ledger_rows)
+        balances[src] -= amount
+        balances[dst] += amount
+        batch.append((entry_id + 1, src, "transfer_out", amount, group, None, ts))
+        batch.append((entry_id + 2, dst, "transfer_in", amount, group, entry_id + 1, ts))
+        entry_id += 2
+        if len(batch) >= CHUNK:
+            flush()
+    if batch:
+        flush()
+
+    for lo in range(1, users + 1, CHUNK):
+        hi = min(users, lo + CHUNK - 1)
+        conn.executemany(
+            "INSERT INTO accounts (id, user_id, balance_cents, currency, created_at) VALUES (?, ?, ?, 'USD', ?)",
+            ((i, i, balances[i], created) for i in range(lo, hi + 1)),
+        )
+
+    conn.execute("INSERT INTO schema_meta (id, version) VALUES (1, ?)", (SCHEMA_VERSION,))
+    conn.execute("COMMIT")
+    conn.execute("ANALYZE")
+    conn.close()
+    return {"users": users, "accounts": users, "ledger_rows": entry_id, "hot_accounts": hot}
+
+
+def build_bets_file(path: str, bets: int, users: int, rng: random.Random) -> Dict[str, int]:
+    # Same record shape as backend/main.py produces for pending/accepted/settled bets
+    counts = {"pending": 0, "accepted": 0, "settled": 0}
+    with open(path, "w", encoding="utf-8") as f:
+        for bet_id in range(1, bets + 1):
+            sender = rng.randrange(1, users + 1)
+            receiver = rng.randrange(1, users + 1)
+            if receiver == sender:
+                receiver = sender % users + 1
+            bet = {
+                "id": bet_id,
+                "sender": email_for(sender),
+                "receiver": email_for(receiver),
+                "amount": round(rng.uniform(5, 100), 2),
+                "description": rng.choice(DESCRIPTIONS),
+                "status": "pending",
+            }
+            roll = rng.random()
+            if roll < 0.4:
+                ts = _timestamp(bet_id, bets).replace(" ", "T")
+                bet["status"] = "accepted"
+                bet["accepted_at"] = ts
+                bet["payment"] = {"status": "authorization_pending", "auth_id": None}
+                if roll < 0.15:
+                    winner = rng.choice(["sender", "receiver"])
+                    winner_email, loser_email = (bet["sender"], bet["receiver"]) if winner == "sender" else (
+                        bet["receiver"], bet["sender"])
+                    bet["status"] = "settled"
+                    bet["winner"] = winner
+                    bet["settled_at"] = ts
+                    bet["payment"] = {
+                        "status": "completed",
+                        "winner": winner_email,
+                        "loser": loser_email,
+                        "amount": bet["amount"],
+                        "transaction_id": None,
+                    }
+            counts[bet["status"]] += 1
+            f.write(json.dumps(bet) + "\n")
+    return counts
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Generate a reproducible payments + bets dataset")
+    parser.add_argument("--out", default="bench-data", help="Output directory")
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--ledger-rows", type=int, default=500_000)
+    parser.add_argument("--bets", type=int, default=100_000)
+    parser.add_argument("--hot-accounts", type=int, default=10)
+    parser.add_argument("--hot-share", type=float, default=0.2, help="Fraction of transfers touching hot accounts")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    os.makedirs(args.out, exist_ok=True)
+    db_path = os.path.join(args.out, "payments.db")
+    bets_path = os.path.join(args.out, "bets.jsonl")
+
+    t0 = time.perf_counter()
+    payments = build_payments_db(db_path, args.users, args.ledger_rows, args.hot_accounts, args.hot_share,
+                                 random.Random(args.seed))
+    bet_counts = build_bets_file(bets_path, args.bets, args.users, random.Random(args.seed + 1))
+
+    manifest = {
+        "seed": args.seed,
+        "database": db_path,
+        "bets_file": bets_path,
+        "users": payments["users"],
+        "accounts": payments["accounts"],
+        "account_id_range": [1, payments["accounts"]],
+        "ledger_rows": payments["ledger_rows"],
+        "hot_accounts": payments["hot_accounts"],
+        "bets": args.bets,
+        "bet_statuses": bet_counts,
+        "sample_emails": [email_for(i) for i in range(1, min(args.users, 20) + 1)],
+        "generated_seconds": round(time.perf_counter() - t0, 1),
+    }
+    with open(os.path.join(args.out, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    print(json.dumps(manifest, indent=2))
+
+
+if __name__ == "__main__":
+    main()
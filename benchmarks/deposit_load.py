@@ -0,0 +1,99 @@
+# benchmarks/deposit_load.py
+# End-to-end deposit throughput against the payments service while the payment provider is slow.
+#
+# --mode stripe: POST /accounts/{id}/deposit/stripe against the local Stripe stub
+#   python -m benchmarks.stripe_stub --port 12111 --latency-ms 500
+#   STRIPE_API_BASE=http://127.0.0.1:12111 STRIPE_SECRET_KEY=sk_test_stub uvicorn payments.main:app --port 8001
+#   python -m benchmarks.deposit_load --mode stripe --requests 500 --concurrency 100
+#   (each deposit uses a synthesized PaymentIntent id, pi_stub_<amount>_<n>, so no create call is needed)
+#
+# --mode card: POST /accounts/{id}/deposit (simulate=false) through the simulator processor
+#   PAYMENTS_PROCESSOR=simulator SIMULATOR_LATENCY_MS=300 uvicorn payments.main:app --port 8001
+#   python -m benchmarks.deposit_load --mode card --requests 500 --concurrency 100
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+import uuid
+from typing import List
+
+import httpx
+
+
+async def run(base_url: str, mode: str, total: int, concurrency: int, accounts: int, amount_cents: int) -> dict:
+    async with httpx.AsyncClient(
+        base_url=base_url,
+        timeout=60.0,
+        limits=httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency),
+    ) as client:
+        account_ids: List[int] = []
+        for i in range(accounts):
+            resp = await client.post("/accounts", json={"email": f"deposit-load-{i}@example.com"})
+            resp.raise_for_status()
+            account_ids.append(resp.json()["accountId"])
+
+        sem = asyncio.Semaphore(concurrency)
+        latencies: List[float] = []
+        statuses: dict = {}
+
+        async def one(n: int) -> None:
+            account_id = account_ids[n % len(account_ids)]
+            if mode == "stripe":
+                path = f"/accounts/{account_id}/deposit/stripe"
+                body = {"paymentIntentId": f"pi_stub_{amount_cents}_{uuid.uuid4().hex}", "amountCents": amount_cents}
+            else:
+                path = f"/accounts/{account_id}/deposit"
+                body = {"amountCents": amount_cents, "simulate": False, "flexToken": "tok_sim_visa"}
+            async with sem:
+                t0 = time.perf_counter()
+                try:
+                    resp = await client.post(
+                        path,
+                        json=body,
+                        headers={"Idempotency-Key": uuid.uuid4().hex},
+                    )
+                    code = resp.status_code
+                except httpx.HTTPError:
+                    code = "transport_error"
+                latencies.append((time.perf_counter() - t0) * 1000)
+                statuses[code] = statuses.get(code, 0) + 1
+
+        t_start = time.perf_counter()
+        await asyncio.gather(*(one(n) for n in range(total)))
+        elapsed = time.perf_counter() - t_start
+
+    lat = sorted(latencies)
+    ok = statuses.get(200, 0)
+    return {
+        "mode": mode,
+        "requests": total,
+        "concurrency": concurrency,
+        "seconds": round(elapsed, 3),
+        "deposits_per_sec": round(ok / elapsed, 1),
+        "error_rate": round(1 - ok / total, 4) if total else 0.0,
+        "p50_ms": round(statistics.median(lat), 1) if lat else None,
+        "p99_ms": round(lat[max(0, int(len(lat) * 0.99) - 1)], 1) if lat else None,
+        "statuses": {str(k): v for k, v in statuses.items()},
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Deposit load test against the payments service")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8001")
+    parser.add_argument("--mode", choices=["stripe", "card"], default="stripe")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--accounts", type=int, default=20)
+    parser.add_argument("--amount-cents", type=int, default=1000)
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args.base_url, args.mode, args.requests, args.concurrency, args.accounts, args.amount_cents))
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+# benchmarks/serialization.py
+# Per-row serialization cost of the list endpoints, before and after the fast response path.
+#
+#   payments GET /transactions: Pydantic Transaction objects + FastAPI JSONResponse
+#                               vs column tuples -> payments.responses.transaction_items -> dumps
+#   bets GET /api/bets:         flask.jsonify vs backend/fastjson.fast_jsonify
+#
+# Usage (from repo root):
+#   python -m benchmarks.serialization --rows 100 --repeat 2000
+#   python -m benchmarks.serialization --json
+
+from __future__ import annotations
+
+import argparse
+import datetime as dt
+import json
+import os
+import random
+import sys
+import timeit
+from typing import Callable, Dict
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _per_row_us(fn: Callable[[], object], rows: int, repeat: int) -> float:
+    best = min(timeit.repeat(fn, number=repeat, repeat=3))
+    return best / repeat / rows * 1e6
+
+
+def bench_transactions(rows: int, repeat: int) -> Dict[str, float]:
+    from fastapi.responses import JSONResponse
+
+    from payments.responses import dumps, transaction_items
+    from payments.schemas import Transaction, TransactionsResponse
+
+    now = dt.datetime.utcnow()
+    tuples = [
+        (i, 1, random.choice(["deposit", "transfer_in", "transfer_out"]), "posted", random.randint(1, 50_000), "USD",
+         f"{i:032x}", None, now - dt.timedelta(seconds=i))
+        for i in range(rows)
+    ]
+
+    def before() -> bytes:
+        items = [
+            Transaction(
+                id=r[0], accountId=r[1], type=r[2], status=r[3], amountCents=r[4], currency=r[5],
+                transferGroupId=r[6], relatedEntryId=r[7],
+                createdAt=r[8].replace(tzinfo=dt.timezone.utc).isoformat().replace("+00:00", "Z"),
+            )
+            for r in tuples
+        ]
+        model = TransactionsResponse(accountId=1, items=items)
+        return JSONResponse(model.model_dump()).body
+
+    def after() -> bytes:
+        return dumps({"accountId": 1, "items": transaction_items(tuples)})
+
+    assert before() == after(), "transactions payload is not byte-compatible"
+    return {"before_us_per_row": _per_row_us(before, rows, repeat), "after_us_per_row": _per_row_us(after, rows, repeat)}
+
+
+def bench_bets(rows: int, repeat: int) -> Dict[str, float]:
+    sys.path.insert(0, os.path.join(REPO_ROOT, "backend"))
+    from flask import Flask, jsonify
+
+    from fastjson import fast_jsonify
+
+    app = Flask(__name__)
+    bets = [
+        {"id": i + 1, "sender": "alice@email.com", "receiver": "bob@email.com",
+         "amount": round(random.uniform(5, 100), 2), "description": "I bet the Seahawks win this Sunday",
+         "status": "pending"}
+        for i in range(rows)
+    ]
+    payload = {"bets": bets}
+
+    results: Dict[str, float] = {}
+    for debug in (False, True):
+        app.debug = debug
+        with app.app_context():
+            assert jsonify(payload).get_data() == fast_jsonify(payload).get_data(), "bets payload differs"
+            suffix = "_debug" if debug else ""
+            results[f"before_us_per_row{suffix}"] = _per_row_us(lambda: jsonify(payload).get_data(), rows, repeat)
+            results[f"after_us_per_row{suffix}"] = _per_row_us(lambda: fast_jsonify(payload).get_data(), rows, repeat)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serialization micro-benchmark for list endpoints")
+    parser.add_argument("--rows", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=500)
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+    args = parser.parse_args()
+
+    results: Dict[str, Dict[str, float]] = {}
+    for name, fn in (("transactions", bench_transactions), ("bets", bench_bets)):
+        try:
+            results[name] = {k: round(v, 3) for k, v in fn(args.rows, args.repeat).items()}
+        except ImportError as e:
+            results[name] = {"skipped": str(e)}
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    for name, data in results.items():
+        print(f"{name}:")
+        for key, value in data.items():
+            print(f"  {key:<24} {value}")
+
+
+if __name__ == "__main__":
+    main()
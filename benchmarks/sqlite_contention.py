@@ -0,0 +1,238 @@
+# benchmarks/sqlite_contention.py
+# Contention benchmark for the payments SQLite storage profiles.
+#
+# Replays the service's write pattern (BEGIN IMMEDIATE, re-read balances, two ledger
+# rows, two balance updates, COMMIT) from several writer threads against a small set
+# of hot accounts, while reader threads run balance and history queries.
+# Each profile from payments.config.STORAGE_PROFILES runs on a fresh temporary database.
+#
+# Usage (from repo root):
+#   python -m benchmarks.sqlite_contention --writers 8 --readers 4 --seconds 5
+#   python -m benchmarks.sqlite_contention --profiles legacy,balanced --no-retry --json
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+from dataclasses import dataclass, field, asdict
+from typing import Dict, List
+
+from payments.config import STORAGE_PROFILES, StorageProfile
+
+SCHEMA = """
+CREATE TABLE accounts (
+    id INTEGER PRIMARY KEY,
+    balance_cents INTEGER NOT NULL
+);
+CREATE TABLE ledger_entries (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    account_id INTEGER NOT NULL REFERENCES accounts(id),
+    type VARCHAR(32) NOT NULL,
+    amount_cents INTEGER NOT NULL,
+    transfer_group_id VARCHAR(64),
+    created_at DATETIME NOT NULL
+);
+CREATE INDEX ix_ledger_account_created ON ledger_entries (account_id, created_at);
+"""
+
+
+@dataclass
+class ProfileResult:
+    profile: str
+    seconds: float
+    writes_ok: int = 0
+    write_errors: int = 0
+    write_retries: int = 0
+    reads_ok: int = 0
+    read_errors: int = 0
+    write_latencies_ms: List[float] = field(default_factory=list, repr=False)
+
+    def summary(self) -> Dict[str, object]:
+        data = asdict(self)
+        lat = sorted(data.pop("write_latencies_ms"))
+        attempts = self.writes_ok + self.write_errors
+        data.update(
+            writes_per_sec=round(self.writes_ok / self.seconds, 1),
+            reads_per_sec=round(self.reads_ok / self.seconds, 1),
+            write_error_rate=round(self.write_errors / attempts, 4) if attempts else 0.0,
+            write_p50_ms=round(statistics.median(lat), 2) if lat else None,
+            write_p99_ms=round(lat[int(len(lat) * 0.99) - 1], 2) if len(lat) >= 100 else None,
+        )
+        return data
+
+
+def _connect(path: str, profile: StorageProfile) -> sqlite3.Connection:
+    # isolation_level=None: we issue BEGIN IMMEDIATE ourselves, like payments.db.begin_immediate
+    conn = sqlite3.connect(path, timeout=profile.busy_timeout_ms / 1000, isolation_level=None, check_same_thread=False)
+    for pragma in profile.pragmas():
+        conn.execute(pragma)
+    return conn
+
+
+def _is_lock_error(exc: sqlite3.OperationalError) -> bool:
+    message = str(exc).lower()
+    return "database is locked" in message or "database is busy" in message
+
+
+def _transfer(conn: sqlite3.Connection, from_id: int, to_id: int, amount: int) -> None:
+    now = time.strftime("%Y-%m-%d %H:%M:%S")
+    group = f"{from_id}-{to_id}-{random.getrandbits(48):x}"
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        (balance,) = conn.execute("SELECT balance_cents FROM accounts WHERE id = ?", (from_id,)).fetchone()
+        conn.execute("SELECT balance_cents FROM accounts WHERE id = ?", (to_id,)).fetchone()
+        if balance >= amount:
+            conn.executemany(
+                "INSERT INTO ledger_entries (account_id, type, amount_cents, transfer_group_id, created_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                [(from_id, "transfer_out", amount, group, now), (to_id, "transfer_in", amount, group, now)],
+            )
+            conn.execute("UPDATE accounts SET balance_cents = balance_cents - ? WHERE id = ?", (amount, from_id))
+            conn.execute("UPDATE accounts SET balance_cents = balance_cents + ? WHERE id = ?", (amount, to_id))
+        conn.execute("COMMIT")
+    except BaseException:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+
+
+def run_profile(
+    profile: StorageProfile,
+    writers: int,
+    readers: int,
+    seconds: float,
+    hot_accounts: int,
+    retry_attempts: int,
+    retry_base_ms: int,
+) -> ProfileResult:
+    result = ProfileResult(profile=profile.name, seconds=seconds)
+    lock = threading.Lock()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "contention.db")
+        setup = _connect(path, profile)
+        setup.executescript(SCHEMA)
+        setup.executemany(
+            "INSERT INTO accounts (id, balance_cents) VALUES (?, ?)",
+            [(i, 10_000_000) for i in range(1, hot_accounts + 1)],
+        )
+        setup.close()
+
+        deadline = time.perf_counter() + seconds
+        start = threading.Barrier(writers + readers)
+
+        def writer() -> None:
+            conn = _connect(path, profile)
+            rng = random.Random()
+            ok = errors = retries = 0
+            latencies: List[float] = []
+            start.wait()
+            while time.perf_counter() < deadline:
+                from_id, to_id = rng.sample(range(1, hot_accounts + 1), 2)
+                t0 = time.perf_counter()
+                for attempt in range(max(1, retry_attempts)):
+                    try:
+                        _transfer(conn, from_id, to_id, rng.randint(1, 500))
+                        ok += 1
+                        latencies.append((time.perf_counter() - t0) * 1000)
+                        break
+                    except sqlite3.OperationalError as e:
+                        if not _is_lock_error(e):
+                            raise
+                        if attempt == max(1, retry_attempts) - 1:
+                            errors += 1
+                            break
+                        retries += 1
+                        delay_ms = retry_base_ms * (2 ** attempt)
+                        time.sleep(rng.uniform(delay_ms / 2, delay_ms) / 1000)
+            conn.close()
+            with lock:
+                result.writes_ok += ok
+                result.write_errors += errors
+                result.write_retries += retries
+                result.write_latencies_ms.extend(latencies)
+
+        def reader() -> None:
+            conn = _connect(path, profile)
+            rng = random.Random()
+            ok = errors = 0
+            start.wait()
+            while time.perf_counter() < deadline:
+                account_id = rng.randint(1, hot_accounts)
+                try:
+                    conn.execute("SELECT balance_cents FROM accounts WHERE id = ?", (account_id,)).fetchone()
+                    conn.execute(
+                        "SELECT id, type, amount_cents, created_at FROM ledger_entries"
+                        " WHERE account_id = ? ORDER BY created_at DESC LIMIT 20",
+                        (account_id,),
+                    ).fetchall()
+                    ok += 1
+                except sqlite3.OperationalError as e:
+                    if not _is_lock_error(e):
+                        raise
+                    errors += 1
+            conn.close()
+            with lock:
+                result.reads_ok += ok
+                result.read_errors += errors
+
+        threads = [threading.Thread(target=writer) for _ in range(writers)]
+        threads += [threading.Thread(target=reader) for _ in range(readers)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="SQLite write-contention benchmark per storage profile")
+    parser.add_argument("--profiles", default=",".join(STORAGE_PROFILES), help="Comma-separated profile names")
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--hot-accounts", type=int, default=4, help="Number of accounts all transfers hit")
+    parser.add_argument("--retry-attempts", type=int, default=5)
+    parser.add_argument("--retry-base-ms", type=int, default=20)
+    parser.add_argument("--no-retry", action="store_true", help="Fail on the first lock error (attempts=1)")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+    args = parser.parse_args()
+
+    summaries = []
+    for name in [p.strip() for p in args.profiles.split(",") if p.strip()]:
+        profile = STORAGE_PROFILES[name]
+        result = run_profile(
+            profile,
+            writers=args.writers,
+            readers=args.readers,
+            seconds=args.seconds,
+            hot_accounts=args.hot_accounts,
+            retry_attempts=1 if args.no_retry else args.retry_attempts,
+            retry_base_ms=args.retry_base_ms,
+        )
+        summaries.append(result.summary())
+
+    if args.json:
+        print(json.dumps(summaries, indent=2))
+        return
+
+    print(f"{'profile':<12}{'writes/s':>10}{'reads/s':>10}{'w-err%':>9}{'retries':>9}{'p50 ms':>9}{'p99 ms':>9}")
+    for s in summaries:
+        print(
+            f"{s['profile']:<12}{s['writes_per_sec']:>10}{s['reads_per_sec']:>10}"
+            f"{s['write_error_rate'] * 100:>8.2f}%{s['write_retries']:>9}"
+            f"{s['write_p50_ms'] if s['write_p50_ms'] is not None else '-':>9}"
+            f"{s['write_p99_ms'] if s['write_p99_ms'] is not None else '-':>9}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+# benchmarks/stripe_stub.py
+# Local stand-in for the Stripe PaymentIntents API with configurable latency.
+#
+# Point the payments service at it with:
+#   STRIPE_API_BASE=http://127.0.0.1:12111 STRIPE_SECRET_KEY=sk_test_stub uvicorn payments.main:app --port 8001
+#
+# Run standalone (from repo root):
+#   python -m benchmarks.stripe_stub --port 12111 --latency-ms 500
+#
+# Behaviour:
+# - POST /v1/payment_intents creates a PI that is immediately "succeeded"
+# - GET /v1/payment_intents/<id> returns the stored PI; ids of the form pi_stub_<amount>_<anything>
+#   are synthesized as succeeded USD intents so load tests can skip the create step
+
+from __future__ import annotations
+
+import argparse
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qsl
+
+
+class StubStripeServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], latency_ms: float = 0.0):
+        super().__init__(address, _Handler)
+        self.latency_ms = latency_ms
+        self.intents: Dict[str, dict] = {}
+        self.lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+def _synthesize(pi_id: str) -> Optional[dict]:
+    parts = pi_id.split("_")
+    if len(parts) >= 3 and parts[0] == "pi" and parts[1] == "stub" and parts[2].isdigit():
+        amount = int(parts[2])
+        return {"id": pi_id, "object": "payment_intent", "amount": amount, "amount_received": amount,
+                "currency": "usd", "status": "succeeded", "client_secret": f"{pi_id}_secret"}
+    return None
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: StubStripeServer
+
+    def log_message(self, format, *args):  # noqa: A002 - silence per-request logging
+        pass
+
+    def _send(self, status: int, body: dict) -> None:
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _delay(self) -> None:
+        if self.server.latency_ms:
+            time.sleep(self.server.latency_ms / 1000)
+
+    def do_POST(self):
+        self._delay()
+        if self.path != "/v1/payment_intents":
+            return self._send(404, {"error": {"message": f"Unrecognized request URL ({self.path})"}})
+        length = int(self.headers.get("Content-Length") or 0)
+        form = dict(parse_qsl(self.rfile.read(length).decode()))
+        amount = int(form.get("amount", "0"))
+        pi_id = f"pi_stub_{amount}_{uuid.uuid4().hex[:16]}"
+        pi = {"id": pi_id, "object": "payment_intent", "amount": amount, "amount_received": amount,
+              "currency": form.get("currency", "usd"), "status": "succeeded", "client_secret": f"{pi_id}_secret"}
+        with self.server.lock:
+            self.server.intents[pi_id] = pi
+        self._send(200, pi)
+
+    def do_GET(self):
+        self._delay()
+        prefix = "/v1/payment_intents/"
+        if not self.path.startswith(prefix):
+            return self._send(404, {"error": {"message": f"Unrecognized request URL ({self.path})"}})
+        pi_id = self.path[len(prefix):]
+        with self.server.lock:
+            pi = self.server.intents.get(pi_id)
+        pi = pi or _synthesize(pi_id)
+        if pi is None:
+            return self._send(404, {"error": {"message": f"No such payment_intent: '{pi_id}'"}})
+        self._send(200, pi)
+
+
+def start_stub(host: str = "127.0.0.1", port: int = 0, latency_ms: float = 0.0) -> StubStripeServer:
+    """
+    Start the stub on a background thread and return the server (call .shutdown() to stop).
+    """
+    server = StubStripeServer((host, port), latency_ms=latency_ms)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Local stub of the Stripe PaymentIntents API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=12111)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Delay added to every response")
+    args = parser.parse_args()
+
+    server = StubStripeServer((args.host, args.port), latency_ms=args.latency_ms)
+    print(f"Stripe stub listening on {server.base_url} (latency {args.latency_ms} ms)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,305 @@
+# benchmarks/workloads.py
+# Concurrent workload runner for the payments service and the bets backend.
+#
+# Scenarios (pick with --scenarios, comma separated):
+#   transfer-contention  closed-loop POST /transfers among the dataset's hot accounts (single-writer contention)
+#   deposit-burst        --burst simulated deposits released at the same instant
+#   history-reads        GET /transactions (limit 100) and GET /accounts/{id}, skewed toward hot accounts
+#   polling              clients re-fetching GET /api/bets and GET /accounts/{id} every --poll-interval with ETags
+#   bets-create          closed-loop POST /api/bets/create on the bets backend
+#
+# Every scenario reports throughput, latency percentiles, error rate and status counts as JSON;
+# compare two result files with benchmarks.compare to catch regressions between versions.
+#
+# Usage (from repo root, against a dataset from benchmarks.dataset):
+#   DATABASE_URL=sqlite:///bench-data/payments.db uvicorn payments.main:app --port 8001
+#   BETS_SEED_FILE=bench-data/bets.jsonl python backend/main.py
+#   python -m benchmarks.workloads --manifest bench-data/manifest.json --seconds 20 --concurrency 64 \
+#       --output results/$(git rev-parse --short HEAD).json
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import datetime as dt
+import json
+import platform
+import random
+import subprocess
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+
+import httpx
+
+SCENARIOS = ["transfer-contention", "deposit-burst", "history-reads", "polling", "bets-create"]
+
+
+@dataclass
+class Recorder:
+    scenario: str
+    ok_statuses: Set[int]
+    latencies_ms: List[float] = field(default_factory=list)
+    statuses: Dict[str, int] = field(default_factory=dict)
+    ok: int = 0
+    seconds: float = 0.0
+
+    async def call(self, request: Awaitable[httpx.Response]) -> Optional[httpx.Response]:
+        t0 = time.perf_counter()
+        resp: Optional[httpx.Response] = None
+        try:
+            resp = await request
+            code = str(resp.status_code)
+            if resp.status_code in self.ok_statuses:
+                self.ok += 1
+        except httpx.HTTPError as exc:
+            code = type(exc).__name__
+        self.latencies_ms.append((time.perf_counter() - t0) * 1000)
+        self.statuses[code] = self.statuses.get(code, 0) + 1
+        return resp
+
+    def summary(self) -> Dict[str, object]:
+        lat = sorted(self.latencies_ms)
+        total = len(lat)
+
+        def pct(p: float) -> Optional[float]:
+            return round(lat[min(total - 1, max(0, int(total * p) - 1))], 2) if lat else None
+
+        return {
+            "requests": total,
+            "ok": self.ok,
+            "errors": total - self.ok,
+            "error_rate": round(1 - self.ok / total, 4) if total else 0.0,
+            "seconds": round(self.seconds, 3),
+            "throughput_rps": round(total / self.seconds, 1) if self.seconds else 0.0,
+            "latency_ms": {
+                "mean": round(sum(lat) / total, 2) if lat else None,
+                "p50": pct(0.50),
+                "p90": pct(0.90),
+                "p95": pct(0.95),
+                "p99": pct(0.99),
+                "max": round(lat[-1], 2) if lat else None,
+            },
+            "statuses": dict(sorted(self.statuses.items())),
+        }
+
+
+class Targets:
+    """
+    Account ids and emails to hit, taken from a benchmarks.dataset manifest or, without one,
+    from accounts created on the fly.
+    """
+
+    def __init__(self, account_ids: List[int], hot_accounts: List[int], emails: List[str], rng: random.Random):
+        self.account_ids = account_ids
+        self.hot_accounts = hot_accounts or account_ids[:10]
+        self.emails = emails
+        self.rng = rng
+
+    def account(self, hot_share: float = 0.5) -> int:
+        if self.rng.random() < hot_share:
+            return self.rng.choice(self.hot_accounts)
+        return self.rng.choice(self.account_ids)
+
+    def hot_pair(self) -> tuple:
+        return tuple(self.rng.sample(self.hot_accounts, 2))
+
+
+async def closed_loop(rec: Recorder, concurrency: int, seconds: float, op: Callable[[], Awaitable[None]]) -> None:
+    deadline = time.perf_counter() + seconds
+
+    async def worker() -> None:
+        while time.perf_counter() < deadline:
+            await op()
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    rec.seconds = time.perf_counter() - t0
+
+
+async def transfer_contention(pay: httpx.AsyncClient, targets: Targets, args) -> Recorder:
+    # 402 (insufficient funds) is an expected business outcome when hot balances drain
+    rec = Recorder("transfer-contention", {200, 402})
+
+    async def op() -> None:
+        src, dst = targets.hot_pair()
+        await rec.call(pay.post(
+            "/transfers",
+            json={"fromAccountId": src, "toAccountId": dst, "amountCents": targets.rng.randrange(1, 100)},
+            headers={"Idempotency-Key": uuid.uuid4().hex},
+        ))
+
+    await closed_loop(rec, args.concurrency, args.seconds, op)
+    return rec
+
+
+async def deposit_burst(pay: httpx.AsyncClient, targets: Targets, args) -> Recorder:
+    rec = Recorder("deposit-burst", {200})
+    start = asyncio.Event()
+
+    async def one() -> None:
+        body = {"amountCents": targets.rng.randrange(100, 10_000), "simulate": True}
+        path = f"/accounts/{targets.account(hot_share=0.2)}/deposit"
+        await start.wait()
+        await rec.call(pay.post(path, json=body, headers={"Idempotency-Key": uuid.uuid4().hex}))
+
+    tasks = [asyncio.create_task(one()) for _ in range(args.burst)]
+    await asyncio.sleep(0)
+    t0 = time.perf_counter()
+    start.set()
+    await asyncio.gather(*tasks)
+    rec.seconds = time.perf_counter() - t0
+    return rec
+
+
+async def history_reads(pay: httpx.AsyncClient, targets: Targets, args) -> Recorder:
+    rec = Recorder("history-reads", {200})
+
+    async def op() -> None:
+        account_id = targets.account()
+        if targets.rng.random() < 0.7:
+            await rec.call(pay.get("/transactions", params={"accountId": account_id, "limit": 100}))
+        else:
+            await rec.call(pay.get(f"/accounts/{account_id}"))
+
+    await closed_loop(rec, args.concurrency, args.seconds, op)
+    return rec
+
+
+async def polling(pay: httpx.AsyncClient, bets: httpx.AsyncClient, targets: Targets, args) -> Recorder:
+    # Each client polls like the UI does: its own account plus the bets list, revalidating with ETags
+    rec = Recorder("polling", {200, 304})
+    deadline = time.perf_counter() + args.seconds
+
+    async def client() -> None:
+        account_id = targets.account(hot_share=0.1)
+        etags: Dict[str, str] = {}
+        while time.perf_counter() < deadline:
+            for c, path in ((bets, "/api/bets"), (pay, f"/accounts/{account_id}")):
+                headers = {"If-None-Match": etags[path]} if path in etags else {}
+                resp = await rec.call(c.get(path, headers=headers))
+                if resp is not None and resp.headers.get("ETag"):
+                    etags[path] = resp.headers["ETag"]
+            await asyncio.sleep(args.poll_interval * targets.rng.uniform(0.8, 1.2))
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(args.pollers)))
+    rec.seconds = time.perf_counter() - t0
+    return rec
+
+
+async def bets_create(bets: httpx.AsyncClient, targets: Targets, args) -> Recorder:
+    rec = Recorder("bets-create", {201})
+
+    async def op() -> None:
+        sender, receiver = targets.rng.sample(targets.emails, 2)
+        await rec.call(bets.post("/api/bets/create", json={
+            "sender": sender,
+            "receiver": receiver,
+            "amount": round(targets.rng.uniform(5, 100), 2),
+            "description": "Load test bet",
+        }))
+
+    await closed_loop(rec, args.concurrency, args.seconds, op)
+    return rec
+
+
+async def load_targets(pay: httpx.AsyncClient, args, rng: random.Random) -> Targets:
+    if args.manifest:
+        with open(args.manifest, encoding="utf-8") as f:
+            manifest = json.load(f)
+        lo, hi = manifest["account_id_range"]
+        return Targets(list(range(lo, hi + 1)), manifest["hot_accounts"], manifest["sample_emails"], rng)
+
+    # No dataset: create a small set of funded accounts
+    ids: List[int] = []
+    emails = [f"workload-{i}@example.com" for i in range(args.accounts)]
+    for email in emails:
+        resp = await pay.post("/accounts", json={"email": email})
+        resp.raise_for_status()
+        account_id = resp.json()["accountId"]
+        await pay.post(f"/accounts/{account_id}/deposit", json={"amountCents": 40_000, "simulate": True})
+        ids.append(account_id)
+    return Targets(ids, ids[: max(2, args.accounts // 10)], emails, rng)
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run(args) -> Dict[str, object]:
+    rng = random.Random(args.seed)
+    limits = httpx.Limits(max_connections=args.max_connections, max_keepalive_connections=args.max_connections)
+    async with httpx.AsyncClient(base_url=args.payments_url, timeout=args.timeout, limits=limits) as pay, \
+            httpx.AsyncClient(base_url=args.bets_url, timeout=args.timeout, limits=limits) as bets:
+        targets = await load_targets(pay, args, rng)
+        runners = {
+            "transfer-contention": lambda: transfer_contention(pay, targets, args),
+            "deposit-burst": lambda: deposit_burst(pay, targets, args),
+            "history-reads": lambda: history_reads(pay, targets, args),
+            "polling": lambda: polling(pay, bets, targets, args),
+            "bets-create": lambda: bets_create(bets, targets, args),
+        }
+        results: Dict[str, object] = {}
+        for name in args.scenarios:
+            rec = await runners[name]()
+            results[name] = rec.summary()
+
+    return {
+        "meta": {
+            "started_at": dt.datetime.utcnow().isoformat() + "Z",
+            "git_revision": _git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "manifest": args.manifest,
+            "params": {
+                "seconds": args.seconds,
+                "concurrency": args.concurrency,
+                "burst": args.burst,
+                "pollers": args.pollers,
+                "poll_interval": args.poll_interval,
+                "seed": args.seed,
+            },
+        },
+        "scenarios": results,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Concurrent workloads against the payments and bets services")
+    parser.add_argument("--payments-url", default="http://127.0.0.1:8001")
+    parser.add_argument("--bets-url", default="http://127.0.0.1:5000")
+    parser.add_argument("--manifest", help="manifest.json written by benchmarks.dataset")
+    parser.add_argument("--accounts", type=int, default=50, help="Accounts to create when no --manifest is given")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--seconds", type=float, default=10.0, help="Duration of each closed-loop scenario")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--burst", type=int, default=500, help="Simultaneous requests in deposit-burst")
+    parser.add_argument("--pollers", type=int, default=200, help="Clients in the polling scenario")
+    parser.add_argument("--poll-interval", type=float, default=2.0)
+    parser.add_argument("--max-connections", type=int, default=256)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write results JSON here as well as to stdout")
+    args = parser.parse_args()
+
+    args.scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    result = asyncio.run(run(args))
+    text = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
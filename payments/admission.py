@@ -0,0 +1,252 @@
+# payments/admission.py
+# Admission control for write endpoints (/transfers, deposits).
+#
+# Every write passes two gates before it may touch the single SQLite writer:
+#   1. token buckets: one per account (an abusive account gets 429) and one global (503).
+#      A request rejected by either bucket is charged to neither; a batch is admitted item by
+#      item up to the tokens available, and only admitted items are charged
+#   2. a bounded FIFO of waiters in front of a fixed number of writer slots; when the queue is
+#      full, or the projected wait exceeds the queue timeout, the request is rejected with 503
+#      instead of piling up until clients time out
+# Rejections carry Retry-After. Admitted requests wait at most ADMISSION_QUEUE_TIMEOUT_MS for a slot.
+#
+# State lives on the event loop of one worker process; each uvicorn worker limits independently.
+
+from __future__ import annotations
+
+import asyncio
+import math
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Deque, Dict, List, Optional, Sequence
+
+from payments.config import SETTINGS
+from payments.metrics import ADMISSION_QUEUE_WAIT, ADMISSION_REJECTIONS
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, status_code: int, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.status_code = status_code
+        self.reason = reason
+        # Whole seconds for the Retry-After header; never 0
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+class TokenBucket:
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate: float, burst: float, now: Optional[float] = None):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic() if now is None else now
+
+    def available(self, now: Optional[float] = None) -> float:
+        """
+        Tokens in the bucket after refilling up to `now`.
+        """
+        now = time.monotonic() if now is None else now
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        return self.tokens
+
+    def take(self, n: int = 1, now: Optional[float] = None) -> float:
+        """
+        Take n tokens, all or nothing. Returns 0.0 on success; otherwise takes none and returns
+        the seconds until n tokens are available.
+        """
+        if self.available(now) >= n:
+            self.tokens -= n
+            return 0.0
+        return (n - self.tokens) / self.rate
+
+    def refund(self, n: int = 1) -> None:
+        self.tokens = min(self.burst, self.tokens + n)
+
+
+class WriteAdmission:
+    def __init__(
+        self,
+        concurrency: int,
+        queue_size: int,
+        queue_timeout_ms: int,
+        account_rate: float,
+        account_burst: int,
+        global_rate: float,
+        global_burst: int,
+        max_tracked_accounts: int = 100_000,
+    ):
+        self.concurrency = max(1, concurrency)
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout_ms / 1000.0
+        self.account_rate = account_rate
+        self.account_burst = account_burst
+        self.max_tracked_accounts = max_tracked_accounts
+        self._global = TokenBucket(global_rate, global_burst) if global_rate > 0 else None
+        # LRU of per-account buckets; an evicted account simply starts again with a full bucket
+        self._accounts: "OrderedDict[int, TokenBucket]" = OrderedDict()
+        self._in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        # EWMA of slot hold time, used to predict queue wait and Retry-After
+        self._service_time = 0.01
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    def _account_bucket(self, account_id: int, now: float) -> Optional[TokenBucket]:
+        if self.account_rate <= 0:
+            return None
+        bucket = self._accounts.get(account_id)
+        if bucket is None:
+            bucket = self._accounts[account_id] = TokenBucket(self.account_rate, self.account_burst, now)
+            if len(self._accounts) > self.max_tracked_accounts:
+                self._accounts.popitem(last=False)
+        else:
+            self._accounts.move_to_end(account_id)
+        return bucket
+
+    def check_rate(self, account_id: int) -> None:
+        """
+        Charge one token to the account and global buckets; raises AdmissionRejected when either
+        is empty, in which case neither is charged.
+        """
+        now = time.monotonic()
+        bucket = self._account_bucket(account_id, now)
+        if bucket is not None:
+            wait = bucket.take(1, now)
+            if wait:
+                self._reject(429, "account_rate", wait)
+        if self._global is not None:
+            wait = self._global.take(1, now)
+            if wait:
+                if bucket is not None:
+                    bucket.refund(1)
+                self._reject(503, "global_rate", wait)
+
+    def check_batch_rate(self, account_ids: Sequence[int]) -> List[Optional[AdmissionRejected]]:
+        """
+        Rate-limit a batch with one write per entry of account_ids. Each account is granted as many
+        of its writes as its bucket holds (in request order), then the global bucket as many of the
+        granted writes as it holds. Returns, per entry, None if admitted or the AdmissionRejected
+        for that write; tokens are only charged for admitted writes.
+        """
+        now = time.monotonic()
+        verdicts: List[Optional[AdmissionRejected]] = [None] * len(account_ids)
+        rows: Dict[int, List[int]] = {}
+        for row, account_id in enumerate(account_ids):
+            rows.setdefault(account_id, []).append(row)
+
+        buckets: Dict[int, TokenBucket] = {}
+        for account_id, account_rows in rows.items():
+            bucket = self._account_bucket(account_id, now)
+            if bucket is None:
+                continue
+            buckets[account_id] = bucket
+            granted = min(len(account_rows), int(bucket.available(now)))
+            bucket.take(granted, now)
+            denied = account_rows[granted:]
+            if denied:
+                rejected = self._rejection(429, "account_rate", len(denied), (1.0 - bucket.tokens) / bucket.rate)
+                for row in denied:
+                    verdicts[row] = rejected
+
+        if self._global is not None:
+            admitted = [row for row, verdict in enumerate(verdicts) if verdict is None]
+            granted = min(len(admitted), int(self._global.available(now)))
+            self._global.take(granted, now)
+            denied = admitted[granted:]
+            if denied:
+                rejected = self._rejection(
+                    503, "global_rate", len(denied), (1.0 - self._global.tokens) / self._global.rate
+                )
+                for row in denied:
+                    verdicts[row] = rejected
+                    bucket = buckets.get(account_ids[row])
+                    if bucket is not None:
+                        bucket.refund(1)
+        return verdicts
+
+    def _projected_wait(self) -> float:
+        return (len(self._waiters) + 1) * self._service_time / self.concurrency
+
+    def _rejection(self, status_code: int, reason: str, count: int, retry_after: float) -> AdmissionRejected:
+        ADMISSION_REJECTIONS.inc(count, reason=reason)
+        return AdmissionRejected(status_code, reason, retry_after)
+
+    def _reject(self, status_code: int, reason: str, retry_after: float) -> None:
+        raise self._rejection(status_code, reason, 1, retry_after)
+
+    async def _acquire(self, shed: bool) -> None:
+        if self._in_flight < self.concurrency and not self._waiters:
+            self._in_flight += 1
+            ADMISSION_QUEUE_WAIT.observe(0.0)
+            return
+        if shed:
+            if len(self._waiters) >= self.queue_size:
+                self._reject(503, "queue_full", self._projected_wait())
+            if self._projected_wait() > self.queue_timeout:
+                self._reject(503, "queue_latency", self._projected_wait())
+
+        started = time.monotonic()
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            if shed:
+                await asyncio.wait_for(asyncio.shield(waiter), self.queue_timeout)
+            else:
+                await waiter
+        except asyncio.TimeoutError:
+            if not waiter.done():
+                self._waiters.remove(waiter)
+                self._reject(503, "queue_timeout", self._projected_wait())
+            # The slot was handed over as the timeout fired; keep it
+        except asyncio.CancelledError:
+            if waiter.done():
+                self._release()
+            else:
+                self._waiters.remove(waiter)
+            raise
+        ADMISSION_QUEUE_WAIT.observe(time.monotonic() - started)
+
+    def _release(self) -> None:
+        # Hand the slot straight to the oldest waiter so in_flight never drops below a waiting queue
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self._in_flight -= 1
+
+    @asynccontextmanager
+    async def writer(self, shed: bool = True) -> AsyncIterator[None]:
+        """
+        Hold a writer slot for the block. shed=False waits without queue limits (for work that must
+        not be dropped, e.g. crediting a card that was already captured).
+        """
+        await self._acquire(shed)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self._service_time = 0.8 * self._service_time + 0.2 * (time.monotonic() - started)
+            self._release()
+
+    @asynccontextmanager
+    async def admit(self, account_id: int) -> AsyncIterator[None]:
+        self.check_rate(account_id)
+        async with self.writer():
+            yield
+
+
+WRITE_ADMISSION = WriteAdmission(
+    concurrency=SETTINGS.admission_write_concurrency,
+    queue_size=SETTINGS.admission_queue_size,
+    queue_timeout_ms=SETTINGS.admission_queue_timeout_ms,
+    account_rate=SETTINGS.admission_account_rate,
+    account_burst=SETTINGS.admission_account_burst,
+    global_rate=SETTINGS.admission_global_rate,
+    global_burst=SETTINGS.admission_global_burst,
+)
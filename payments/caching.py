@@ -0,0 +1,69 @@
+# payments/caching.py
+# Conditional GET helpers: version-based weak ETags and 304 responses.
+#
+# Ledger rows are append-only, so "latest ledger id" (plus balance / limit where relevant)
+# is a complete version for account and history views. Handlers compute the version with
+# one cheap query and return 304 before loading or serializing the body.
+#
+# SkipCompression wraps the gzip/brotli middleware so streaming routes bypass it.
+
+from __future__ import annotations
+
+from typing import Any, Collection, Optional
+
+from fastapi import Response
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+# Let browsers keep the body but revalidate every time (the frontend polls)
+CACHE_CONTROL = "no-cache"
+
+
+def make_etag(*parts: object) -> str:
+    return 'W/"' + "-".join(str(p) for p in parts) + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Weak comparison per RFC 9110: W/ prefixes are ignored, "*" matches anything.
+    """
+    if not if_none_match:
+        return False
+    target = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == target:
+            return True
+    return False
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
+
+
+def set_cache_headers(response: Response, etag: str) -> Response:
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
+    return response
+
+
+class SkipCompression:
+    """
+    Compression middleware that leaves `paths` alone. Compressors buffer a streamed body until
+    enough output accumulates (and not every version excludes text/event-stream), which would
+    hold SSE frames back; those routes go straight to the app, uncompressed.
+    """
+
+    def __init__(self, app: ASGIApp, compressor: Any, paths: Collection[str], **options: Any):
+        self.app = app
+        self.compressed = compressor(app, **options)
+        self.paths = frozenset(paths)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http" and scope["path"] in self.paths:
+            await self.app(scope, receive, send)
+        else:
+            await self.compressed(scope, receive, send)
@@ -3,14 +3,64 @@
 # Loads environment variables from payments/.env if present.
 
 import os
-from dataclasses import dataclass
-from typing import Optional, List
-
-from dotenv import load_dotenv
+from dataclasses import dataclass, field, replace
+from typing import Dict, Optional, List
 
 # Try to load a local .env file sitting in the payments directory
 # Note: The app runs from repo root, so this relative path works.
-load_dotenv(dotenv_path=os.path.join("payments", ".env"), override=False)
+# Deployed workers get their config from the environment, so python-dotenv is only
+# imported when the file actually exists.
+ENV_FILE = os.path.join("payments", ".env")
+if os.path.exists(ENV_FILE):
+    from dotenv import load_dotenv
+
+    load_dotenv(dotenv_path=ENV_FILE, override=False)
+
+
+@dataclass(frozen=True)
+class StorageProfile:
+    """
+    SQLite tuning knobs applied to every connection (ignored on server databases).
+    cache_size follows SQLite semantics: negative values are KiB, positive are pages.
+    """
+    name: str
+    journal_mode: str = "WAL"
+    synchronous: str = "NORMAL"
+    mmap_size: int = 0
+    cache_size: int = -2000
+    busy_timeout_ms: int = 5000
+
+    def pragmas(self) -> List[str]:
+        return [
+            f"PRAGMA journal_mode={self.journal_mode}",
+            f"PRAGMA synchronous={self.synchronous}",
+            f"PRAGMA mmap_size={self.mmap_size}",
+            f"PRAGMA cache_size={self.cache_size}",
+            f"PRAGMA busy_timeout={self.busy_timeout_ms}",
+        ]
+
+
+# Named presets selectable with PAYMENTS_STORAGE_PROFILE
+STORAGE_PROFILES: Dict[str, StorageProfile] = {
+    # SQLite defaults: rollback journal, no busy wait (what the service used originally)
+    "legacy": StorageProfile(
+        name="legacy", journal_mode="DELETE", synchronous="FULL", mmap_size=0, cache_size=-2000, busy_timeout_ms=0
+    ),
+    # WAL + NORMAL sync: durable across app crashes, readers never block writers
+    "balanced": StorageProfile(
+        name="balanced", journal_mode="WAL", synchronous="NORMAL", mmap_size=256 * 1024 * 1024, cache_size=-65536,
+        busy_timeout_ms=5000,
+    ),
+    # WAL + FULL sync: also durable across power loss, at the cost of an fsync per commit
+    "durable": StorageProfile(
+        name="durable", journal_mode="WAL", synchronous="FULL", mmap_size=0, cache_size=-16384, busy_timeout_ms=10000
+    ),
+    # Benchmarks/demos only: no fsync at all
+    "throughput": StorageProfile(
+        name="throughput", journal_mode="WAL", synchronous="OFF", mmap_size=1024 * 1024 * 1024, cache_size=-262144,
+        busy_timeout_ms=5000,
+    ),
+}
 
 
 @dataclass(frozen=True)
@@ -33,8 +83,66 @@ class Settings:
     cybersource_jwt_key_password: Optional[str] = None
     cybersource_jwt_key_file: Optional[str] = None
 
+    # Card processor for POST /accounts/{id}/deposit (simulate=false): simulator | cybersource
+    payments_processor: str = "simulator"
+    processor_timeout_seconds: float = 15.0
+    processor_max_connections: int = 64
+    simulator_latency_ms: float = 200.0
+    simulator_jitter_ms: float = 50.0
+    simulator_decline_rate: float = 0.0
+
     # Stripe
     stripe_secret_key: Optional[str] = None
+    stripe_api_base: str = "https://api.stripe.com"
+    stripe_timeout_seconds: float = 10.0
+    stripe_max_concurrency: int = 32
+    # Webhooks: signing secret (whsec_...), replay tolerance and batch crediting worker
+    stripe_webhook_secret: Optional[str] = None
+    stripe_webhook_tolerance_seconds: int = 300
+    webhook_batch_size: int = 500
+    webhook_batch_window_ms: int = 50
+    webhook_poll_interval_seconds: float = 1.0
+
+    # Read path: optional replica URL for GET endpoints (defaults to a read-only
+    # connection to database_url) and the size of its connection pool.
+    database_read_url: Optional[str] = None
+    read_pool_size: int = 10
+
+    # Email -> account id cache entries, and max users per POST /accounts/bulk
+    account_directory_size: int = 200_000
+    accounts_bulk_max: int = 10_000
+    # Max emails per POST /accounts/balances (read-only, so larger than the write limit)
+    balances_lookup_max: int = 100_000
+
+    # Max transfers per POST /transfers/batch
+    transfer_batch_max: int = 500
+
+    # Change feed: how often waiting /events consumers re-read the outbox, which bounds
+    # delivery latency for postings made by other worker processes
+    outbox_poll_interval_seconds: float = 1.0
+
+    # Tracing: fraction of root requests sampled (0 disables) and export target
+    # ("file:<path>" for JSON lines, or an http(s) collector URL)
+    trace_sample_rate: float = 0.0
+    trace_export: Optional[str] = "file:payments/traces.jsonl"
+
+    # Responses larger than this are gzip/brotli compressed
+    compression_min_bytes: int = 1024
+
+    # Admission control for write endpoints: writer slots, bounded wait queue, and
+    # per-account / global token buckets (requests per second; a rate of 0 disables the bucket)
+    admission_write_concurrency: int = 4
+    admission_queue_size: int = 64
+    admission_queue_timeout_ms: int = 2000
+    admission_account_rate: float = 20.0
+    admission_account_burst: int = 40
+    admission_global_rate: float = 0.0
+    admission_global_burst: int = 500
+
+    # SQLite storage profile and retry policy for lock errors on write endpoints
+    storage: StorageProfile = field(default_factory=lambda: STORAGE_PROFILES["balanced"])
+    write_retry_attempts: int = 5
+    write_retry_base_ms: int = 20
 
 
 def _parse_origins(value: Optional[str]) -> Optional[List[str]]:
@@ -43,6 +151,28 @@ def _parse_origins(value: Optional[str]) -> Optional[List[str]]:
     return [v.strip() for v in value.split(",") if v.strip()]
 
 
+def _load_storage_profile() -> StorageProfile:
+    name = os.getenv("PAYMENTS_STORAGE_PROFILE", "balanced").strip().lower()
+    if name not in STORAGE_PROFILES:
+        raise ValueError(f"Unknown PAYMENTS_STORAGE_PROFILE: {name} (expected one of {sorted(STORAGE_PROFILES)})")
+    profile = STORAGE_PROFILES[name]
+
+    # Individual overrides on top of the preset
+    overrides = {}
+    if os.getenv("SQLITE_JOURNAL_MODE"):
+        overrides["journal_mode"] = os.environ["SQLITE_JOURNAL_MODE"].upper()
+    if os.getenv("SQLITE_SYNCHRONOUS"):
+        overrides["synchronous"] = os.environ["SQLITE_SYNCHRONOUS"].upper()
+    for env_name, attr in (
+        ("SQLITE_MMAP_SIZE", "mmap_size"),
+        ("SQLITE_CACHE_SIZE", "cache_size"),
+        ("SQLITE_BUSY_TIMEOUT_MS", "busy_timeout_ms"),
+    ):
+        if os.getenv(env_name):
+            overrides[attr] = int(os.environ[env_name])
+    return replace(profile, **overrides) if overrides else profile
+
+
 def load_settings() -> Settings:
     return Settings(
         service_name=os.getenv("PAYMENTS_SERVICE_NAME", "payments"),
@@ -60,7 +190,41 @@ def load_settings() -> Settings:
         cybersource_jwt_key_alias=os.getenv("CYBERSOURCE_JWT_KEY_ALIAS"),
         cybersource_jwt_key_password=os.getenv("CYBERSOURCE_JWT_KEY_PASSWORD"),
         cybersource_jwt_key_file=os.getenv("CYBERSOURCE_JWT_KEY_FILE"),
+        payments_processor=os.getenv("PAYMENTS_PROCESSOR", "simulator").strip().lower(),
+        processor_timeout_seconds=float(os.getenv("PROCESSOR_TIMEOUT_SECONDS", "15")),
+        processor_max_connections=int(os.getenv("PROCESSOR_MAX_CONNECTIONS", "64")),
+        simulator_latency_ms=float(os.getenv("SIMULATOR_LATENCY_MS", "200")),
+        simulator_jitter_ms=float(os.getenv("SIMULATOR_JITTER_MS", "50")),
+        simulator_decline_rate=float(os.getenv("SIMULATOR_DECLINE_RATE", "0")),
         stripe_secret_key=os.getenv("STRIPE_SECRET_KEY"),
+        stripe_api_base=os.getenv("STRIPE_API_BASE", "https://api.stripe.com"),
+        stripe_timeout_seconds=float(os.getenv("STRIPE_TIMEOUT_SECONDS", "10")),
+        stripe_max_concurrency=int(os.getenv("STRIPE_MAX_CONCURRENCY", "32")),
+        stripe_webhook_secret=os.getenv("STRIPE_WEBHOOK_SECRET") or None,
+        stripe_webhook_tolerance_seconds=int(os.getenv("STRIPE_WEBHOOK_TOLERANCE_SECONDS", "300")),
+        webhook_batch_size=int(os.getenv("WEBHOOK_BATCH_SIZE", "500")),
+        webhook_batch_window_ms=int(os.getenv("WEBHOOK_BATCH_WINDOW_MS", "50")),
+        webhook_poll_interval_seconds=float(os.getenv("WEBHOOK_POLL_INTERVAL_SECONDS", "1.0")),
+        database_read_url=os.getenv("DATABASE_READ_URL") or None,
+        read_pool_size=int(os.getenv("DATABASE_READ_POOL_SIZE", "10")),
+        account_directory_size=int(os.getenv("ACCOUNT_DIRECTORY_SIZE", "200000")),
+        accounts_bulk_max=int(os.getenv("ACCOUNTS_BULK_MAX", "10000")),
+        balances_lookup_max=int(os.getenv("BALANCES_LOOKUP_MAX", "100000")),
+        transfer_batch_max=int(os.getenv("TRANSFER_BATCH_MAX", "500")),
+        outbox_poll_interval_seconds=float(os.getenv("OUTBOX_POLL_INTERVAL_SECONDS", "1.0")),
+        trace_sample_rate=float(os.getenv("TRACE_SAMPLE_RATE", "0")),
+        trace_export=os.getenv("TRACE_EXPORT", "file:payments/traces.jsonl") or None,
+        compression_min_bytes=int(os.getenv("PAYMENTS_COMPRESSION_MIN_BYTES", "1024")),
+        admission_write_concurrency=int(os.getenv("ADMISSION_WRITE_CONCURRENCY", "4")),
+        admission_queue_size=int(os.getenv("ADMISSION_QUEUE_SIZE", "64")),
+        admission_queue_timeout_ms=int(os.getenv("ADMISSION_QUEUE_TIMEOUT_MS", "2000")),
+        admission_account_rate=float(os.getenv("ADMISSION_ACCOUNT_RATE", "20")),
+        admission_account_burst=int(os.getenv("ADMISSION_ACCOUNT_BURST", "40")),
+        admission_global_rate=float(os.getenv("ADMISSION_GLOBAL_RATE", "0")),
+        admission_global_burst=int(os.getenv("ADMISSION_GLOBAL_BURST", "500")),
+        storage=_load_storage_profile(),
+        write_retry_attempts=int(os.getenv("WRITE_RETRY_ATTEMPTS", "5")),
+        write_retry_base_ms=int(os.getenv("WRITE_RETRY_BASE_MS", "20")),
     )
 
 
@@ -4,7 +4,11 @@
 from __future__ import annotations
 
 import datetime as dt
-from typing import Generator, Optional
+import functools
+from contextlib import contextmanager
+import random
+import time
+from typing import Callable, Generator, Optional, TypeVar
 
 from sqlalchemy import (
     create_engine,
@@ -15,32 +19,126 @@ from sqlalchemy import (
     ForeignKey,
     BigInteger,
     Index,
+    Text,
     UniqueConstraint,
     event,
     text,
 )
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import IntegrityError, OperationalError, ProgrammingError
 from sqlalchemy.orm import declarative_base, relationship, sessionmaker, Session
 
 from payments.config import SETTINGS
+from payments.metrics import DB_LOCK_WAIT, DB_STATEMENTS, statement_class
+from payments.tracing import TRACER
 
 # Determine if we are using SQLite; needed for thread options and pragmas
 IS_SQLITE = SETTINGS.database_url.startswith("sqlite")
 
+STORAGE = SETTINGS.storage
+
 engine = create_engine(
     SETTINGS.database_url,
-    connect_args={"check_same_thread": False} if IS_SQLITE else {},
+    # pysqlite's own busy handler; PRAGMA busy_timeout below keeps them in sync
+    connect_args={"check_same_thread": False, "timeout": STORAGE.busy_timeout_ms / 1000} if IS_SQLITE else {},
     pool_pre_ping=True,
 )
 
-# Ensure SQLite enforces foreign key constraints
+# Journal mode only applies to file-backed SQLite databases (WAL lets the read pool skip writer locks)
+_sqlite_path = make_url(SETTINGS.database_url).database if IS_SQLITE else None
+IS_SQLITE_FILE = bool(_sqlite_path) and _sqlite_path != ":memory:"
+
+# Ensure SQLite enforces foreign key constraints and apply the storage profile
 if IS_SQLITE:
     @event.listens_for(engine, "connect")
     def set_sqlite_pragma(dbapi_connection, connection_record):
         cursor = dbapi_connection.cursor()
         cursor.execute("PRAGMA foreign_keys=ON")
+        for pragma in STORAGE.pragmas():
+            if pragma.startswith("PRAGMA journal_mode") and not IS_SQLITE_FILE:
+                continue
+            cursor.execute(pragma)
         cursor.close()
 
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, expire_on_commit=False)
+
+
+def _make_read_engine():
+    """
+    Engine for the read path (GET endpoints).
+    - DATABASE_READ_URL set: pooled connections to that replica.
+    - File-backed SQLite: pooled `mode=ro` URI connections to the same file.
+    - Anything else (e.g. in-memory SQLite): share the write engine.
+    """
+    if SETTINGS.database_read_url:
+        read_is_sqlite = SETTINGS.database_read_url.startswith("sqlite")
+        return create_engine(
+            SETTINGS.database_read_url,
+            connect_args={"check_same_thread": False} if read_is_sqlite else {},
+            pool_size=SETTINGS.read_pool_size,
+            pool_pre_ping=True,
+        )
+    if not IS_SQLITE_FILE:
+        return engine
+
+    ro_url = make_url(SETTINGS.database_url).set(
+        database=f"file:{_sqlite_path}",
+        query={"mode": "ro", "uri": "true"},
+    )
+    ro_engine = create_engine(
+        ro_url,
+        connect_args={"check_same_thread": False, "timeout": STORAGE.busy_timeout_ms / 1000},
+        pool_size=SETTINGS.read_pool_size,
+        pool_pre_ping=True,
+    )
+
+    @event.listens_for(ro_engine, "connect")
+    def set_sqlite_read_pragma(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA query_only=ON")
+        # journal_mode/synchronous belong to the writer; read connections only take the cache knobs
+        cursor.execute(f"PRAGMA mmap_size={STORAGE.mmap_size}")
+        cursor.execute(f"PRAGMA cache_size={STORAGE.cache_size}")
+        cursor.execute(f"PRAGMA busy_timeout={STORAGE.busy_timeout_ms}")
+        cursor.close()
+
+    return ro_engine
+
+
+read_engine = _make_read_engine()
+
+
+def _instrument(target_engine, label: str) -> None:
+    # Time every cursor execution, keyed by statement class (payments_db_statement_duration_seconds),
+    # and record a db.<CLASS> span when the request is being traced
+    @event.listens_for(target_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        kind = statement_class(statement)
+        conn.info.setdefault("query_start", []).append(
+            (time.perf_counter(), kind, TRACER.span(f"db.{kind}", engine=label))
+        )
+
+    @event.listens_for(target_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started, kind, span = conn.info["query_start"].pop()
+        DB_STATEMENTS.observe(time.perf_counter() - started, engine=label, statement=kind)
+        span.end()
+
+    @event.listens_for(target_engine, "handle_error")
+    def _on_error(exception_context):
+        # after_cursor_execute is skipped for failed statements; keep the stack balanced
+        conn = exception_context.connection
+        pending = conn.info.get("query_start") if conn is not None else None
+        if pending:
+            started, kind, span = pending.pop()
+            DB_STATEMENTS.observe(time.perf_counter() - started, engine=label, statement=kind)
+            span.end(exception_context.original_exception)
+
+
+_instrument(engine, "write")
+if read_engine is not engine:
+    _instrument(read_engine, "read")
+ReadSessionLocal = sessionmaker(bind=read_engine, autoflush=False, autocommit=False, expire_on_commit=False)
 Base = declarative_base()
 
 
@@ -128,19 +226,118 @@ class IdempotencyKey(Base):
     )
 
 
+class WebhookEvent(Base):
+    """
+    Durable queue of verified Stripe webhook events, drained in batches by payments.webhooks.WebhookWorker.
+    """
+    __tablename__ = "webhook_events"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    # Stripe event id (evt_...); unique so Stripe's redeliveries are dropped on insert
+    event_id = Column(String(128), nullable=False, unique=True)
+    type = Column(String(64), nullable=False)
+    payment_intent_id = Column(String(128), nullable=True, index=True)
+    account_id = Column(Integer, nullable=True)
+    amount_cents = Column(BigInteger, nullable=True)
+    currency = Column(String(8), nullable=True)
+
+    # Status: pending, processed, failed
+    status = Column(String(16), nullable=False, default="pending")
+    error = Column(String(255), nullable=True)
+
+    received_at = Column(DateTime, nullable=False, default=dt.datetime.utcnow)
+    processed_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_webhook_events_status_id", "status", "id"),
+    )
+
+
+class StripeCredit(Base):
+    """
+    One row per credited PaymentIntent; shared by the webhook worker and
+    POST /accounts/{id}/deposit/stripe so a PaymentIntent is never credited twice.
+    """
+    __tablename__ = "stripe_credits"
+
+    payment_intent_id = Column(String(128), primary_key=True)
+    ledger_entry_id = Column(Integer, ForeignKey("ledger_entries.id", ondelete="CASCADE"), nullable=False)
+    created_at = Column(DateTime, nullable=False, default=dt.datetime.utcnow)
+
+
+class OutboxEvent(Base):
+    """
+    Transactional outbox: one row per ledger posting, inserted in the posting's own transaction.
+    Every writer holds the SQLite write lock (BEGIN IMMEDIATE) before inserting, so ids appear in
+    commit order and `id` works as the change-feed cursor. AUTOINCREMENT keeps ids from being reused after pruning.
+    """
+    __tablename__ = "outbox_events"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    # transfer.posted, deposit.posted
+    type = Column(String(64), nullable=False)
+    account_id = Column(Integer, nullable=True)
+    # JSON document; schema per type is documented in payments/outbox.py
+    payload = Column(Text, nullable=False)
+    created_at = Column(DateTime, nullable=False, default=dt.datetime.utcnow)
+
+    __table_args__ = (
+        {"sqlite_autoincrement": True},
+    )
+
+
+class SchemaMeta(Base):
+    """
+    Single-row table recording which SCHEMA_VERSION the database was created with.
+    """
+    __tablename__ = "schema_meta"
+
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False)
+
+
+# Bump whenever a table or index is added so init_db() runs create_all once on existing databases
+SCHEMA_VERSION = 3
+
+
 # ============ Utilities ============
 
+def _stored_schema_version() -> int:
+    try:
+        with engine.connect() as conn:
+            return conn.execute(text("SELECT version FROM schema_meta WHERE id = 1")).scalar() or 0
+    except (OperationalError, ProgrammingError):
+        # schema_meta missing: fresh database or one created before versioning
+        return 0
+
+
 def init_db() -> None:
     """
     Create tables if they do not exist.
+    Workers start with a single version lookup; create_all (one reflection query per table)
+    only runs when the stored version is older than SCHEMA_VERSION.
     This is sufficient for a hackathon; for production, use migrations.
     """
+    if _stored_schema_version() >= SCHEMA_VERSION:
+        return
     Base.metadata.create_all(bind=engine)
-
-
-def get_db() -> Generator[Session, None, None]:
+    try:
+        with session_scope() as db:
+            meta = db.get(SchemaMeta, 1)
+            if meta:
+                meta.version = max(meta.version, SCHEMA_VERSION)
+            else:
+                db.add(SchemaMeta(id=1, version=SCHEMA_VERSION))
+    except IntegrityError:
+        # Another worker recorded the version first
+        pass
+
+
+@contextmanager
+def session_scope() -> Generator[Session, None, None]:
     """
-    FastAPI dependency to provide a SQLAlchemy session.
+    Write session outside of FastAPI dependency injection (e.g. from async endpoints
+    that hand DB work to the threadpool). Same commit/rollback semantics as get_db.
     """
     db: Session = SessionLocal()
     try:
@@ -153,6 +350,34 @@ def get_db() -> Generator[Session, None, None]:
         db.close()
 
 
+def get_db() -> Generator[Session, None, None]:
+    """
+    FastAPI dependency to provide a SQLAlchemy session.
+    """
+    with session_scope() as db:
+        yield db
+
+
+@contextmanager
+def read_session_scope() -> Generator[Session, None, None]:
+    """
+    Read-pool session that never commits; the session is simply closed.
+    """
+    db: Session = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def get_read_db() -> Generator[Session, None, None]:
+    """
+    FastAPI dependency for read-only endpoints.
+    """
+    with read_session_scope() as db:
+        yield db
+
+
 def now_utc() -> dt.datetime:
     return dt.datetime.utcnow()
 
@@ -163,7 +388,49 @@ def begin_immediate(db: Session) -> None:
     Safe to call on other DBs (no-op), but we wrap with dialect check.
     """
     if IS_SQLITE:
-        db.execute(text("BEGIN IMMEDIATE"))
+        started = time.perf_counter()
+        with TRACER.span("db.lock_wait"):
+            db.execute(text("BEGIN IMMEDIATE"))
+        DB_LOCK_WAIT.observe(time.perf_counter() - started)
+
+
+def is_lock_error(exc: BaseException) -> bool:
+    """
+    True for SQLite "database is locked" / "database is busy" errors.
+    """
+    if not isinstance(exc, OperationalError):
+        return False
+    message = str(exc.orig if exc.orig is not None else exc).lower()
+    return "database is locked" in message or "database is busy" in message
+
+
+F = TypeVar("F", bound=Callable)
+
+
+def retry_on_lock(func: F) -> F:
+    """
+    Retry a write endpoint when SQLite reports a lock error.
+    The endpoint's `db` session is rolled back and the handler re-runs from the top,
+    with exponential backoff plus jitter (WRITE_RETRY_ATTEMPTS / WRITE_RETRY_BASE_MS).
+    HTTPExceptions and other errors are raised immediately.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        attempts = max(1, SETTINGS.write_retry_attempts)
+        for attempt in range(attempts):
+            try:
+                return func(*args, **kwargs)
+            except OperationalError as e:
+                if not is_lock_error(e) or attempt == attempts - 1:
+                    raise
+                db = kwargs.get("db")
+                if db is not None:
+                    db.rollback()
+                delay_ms = SETTINGS.write_retry_base_ms * (2 ** attempt)
+                time.sleep(random.uniform(delay_ms / 2, delay_ms) / 1000)
+        raise AssertionError("unreachable")
+
+    return wrapper  # type: ignore[return-value]
 
 
 def enforce_currency_and_limits(amount_cents: int, currency: str) -> None:
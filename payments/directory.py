@@ -0,0 +1,84 @@
+# payments/directory.py
+# Email -> (userId, accountId) resolution for callers that identify users by email (the bets backend).
+#
+# A user's service-currency account never changes once created, so resolved ids are cached
+# without expiry in a bounded LRU. Misses are resolved in chunked IN (...) queries, one per
+# 500 emails, and unknown emails are not cached (they may be provisioned later).
+
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from payments.config import SETTINGS
+from payments.db import Account, User
+from payments.metrics import DIRECTORY_LOOKUPS
+
+# Stays under SQLite's bound-parameter limit with room for the currency filter
+LOOKUP_CHUNK = 500
+
+Ids = Tuple[int, int]
+
+
+def chunked(items: List[str], size: int = LOOKUP_CHUNK) -> Iterable[List[str]]:
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+class AccountDirectory:
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Ids]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, email: str) -> Optional[Ids]:
+        with self._lock:
+            ids = self._entries.get(email)
+            if ids is not None:
+                self._entries.move_to_end(email)
+            return ids
+
+    def remember(self, email: str, user_id: int, account_id: int) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[email] = (user_id, account_id)
+            self._entries.move_to_end(email)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def resolve(self, db: Session, emails: Iterable[str]) -> Dict[str, Ids]:
+        """
+        Map each known email to (user_id, account_id); unknown emails are absent from the result.
+        """
+        found: Dict[str, Ids] = {}
+        misses: List[str] = []
+        for email in dict.fromkeys(emails):
+            ids = self.get(email)
+            if ids is None:
+                misses.append(email)
+            else:
+                found[email] = ids
+        DIRECTORY_LOOKUPS.inc(len(found), result="hit")
+        DIRECTORY_LOOKUPS.inc(len(misses), result="miss")
+
+        for chunk in chunked(misses):
+            rows = db.execute(
+                select(User.email, User.id, Account.id)
+                .join(Account, Account.user_id == User.id)
+                .where(User.email.in_(chunk), Account.currency == SETTINGS.currency)
+            ).all()
+            for email, user_id, account_id in rows:
+                found[email] = (user_id, account_id)
+                self.remember(email, user_id, account_id)
+        return found
+
+
+ACCOUNT_DIRECTORY = AccountDirectory(SETTINGS.account_directory_size)
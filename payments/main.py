@@ -5,42 +5,86 @@
 # Notes:
 # - This service is isolated from the rest of the codebase.
 # - Currency defaults to USD; max transaction defaults to $500 (50_000 cents).
-# - DB schema is initialized on startup. CyberSource deposit wiring will be added next.
+# - DB schema is initialized on startup. Card deposits go through payments.processors (simulator or CyberSource).
 
 from __future__ import annotations
 
+import asyncio
 import datetime as dt
+import json
+import logging
+import time
 import uuid
-from typing import List, Optional
+from typing import List, Optional, Tuple
 
-from fastapi import FastAPI, Depends, HTTPException, Header, Query
+from fastapi import FastAPI, Depends, HTTPException, Header, Query, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import select
+from sqlalchemy import func, insert, select, update
 from sqlalchemy.exc import IntegrityError
 
-import stripe
 from pydantic import BaseModel
 
 from payments.config import SETTINGS
 from payments.db import (
     init_db,
     get_db,
+    get_read_db,
     User,
     Account,
     LedgerEntry,
     IdempotencyKey,
+    StripeCredit,
     begin_immediate,
+    retry_on_lock,
+    session_scope,
+    read_session_scope,
     enforce_currency_and_limits,
     now_utc,
 )
+from payments.metrics import (
+    CAPTURE_REVERSALS,
+    CONTENT_TYPE as METRICS_CONTENT_TYPE,
+    HTTP_LATENCY,
+    HTTP_OUTCOMES,
+    HTTP_REQUESTS,
+    IDEMPOTENCY_LOOKUPS,
+    OUTBOUND_LATENCY,
+    OUTCOME_NAMES,
+    REGISTRY,
+)
+from payments.tracing import TRACER
+from payments.admission import WRITE_ADMISSION, AdmissionRejected
+from payments.directory import ACCOUNT_DIRECTORY, chunked
+from payments.outbox import DEPOSIT_POSTED, FEED_NOTIFIER, TRANSFER_POSTED, fetch_events, record_event
+from payments.caching import SkipCompression, etag_matches, make_etag, not_modified, set_cache_headers
+from payments.responses import FastJSONResponse, TRANSACTION_COLUMNS, dumps, transaction_items
+from payments.processors import ProcessorError, get_processor, close_processor
+from payments.stripe_client import StripeError, get_stripe_client, close_stripe_client
+from payments.webhooks import (
+    SUCCEEDED_EVENT,
+    WEBHOOK_WORKER,
+    WebhookSignatureError,
+    enqueue_event,
+    verify_signature,
+)
 from payments.schemas import (
     AccountCreateRequest,
     AccountCreateResponse,
     AccountResponse,
+    AccountsBulkRequest,
+    AccountsBulkResponse,
+    AccountsByEmailResponse,
+    BalancesRequest,
+    BalancesResponse,
+    TransferBatchItem,
+    TransferBatchRequest,
+    TransferBatchResponse,
     TransferRequest,
     TransferResponse,
-    Transaction,
     TransactionsResponse,
     DepositRequest,
     DepositResponse,
@@ -56,6 +100,8 @@ DEFAULT_ORIGINS: List[str] = [
     "http://127.0.0.1:8000",
 ]
 
+logger = logging.getLogger(__name__)
+
 effective_origins: List[str] = (
     SETTINGS.cors_allowed_origins if SETTINGS.cors_allowed_origins else DEFAULT_ORIGINS
 )
@@ -72,16 +118,76 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Trace-Id"],
 )
 
+# Compress large bodies: brotli (with gzip fallback) when brotli-asgi is installed, gzip otherwise.
+# The SSE stream is never compressed, so each event reaches the client as soon as it is sent.
+UNCOMPRESSED_PATHS = ("/events/stream",)
+try:
+    from brotli_asgi import BrotliMiddleware
+except ImportError:
+    app.add_middleware(
+        SkipCompression, compressor=GZipMiddleware, paths=UNCOMPRESSED_PATHS,
+        minimum_size=SETTINGS.compression_min_bytes,
+    )
+else:
+    app.add_middleware(
+        SkipCompression, compressor=BrotliMiddleware, paths=UNCOMPRESSED_PATHS,
+        minimum_size=SETTINGS.compression_min_bytes, gzip_fallback=True,
+    )
+
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    started = time.perf_counter()
+    status = 500
+    with TRACER.start_request(
+        f"HTTP {request.method}", traceparent=request.headers.get("traceparent"), path=request.url.path
+    ) as span:
+        try:
+            response = await call_next(request)
+            status = response.status_code
+            if span.recording:
+                response.headers["X-Trace-Id"] = span.trace_id
+            return response
+        finally:
+            # Route template (e.g. /accounts/{account_id}) keeps label cardinality bounded
+            route = request.scope.get("route")
+            template = getattr(route, "path", None) or "unmatched"
+            span.rename(f"HTTP {request.method} {template}")
+            span.set_attribute("status", status)
+            HTTP_LATENCY.observe(time.perf_counter() - started, method=request.method, route=template)
+            HTTP_REQUESTS.inc(method=request.method, route=template, status=str(status))
+            if status in OUTCOME_NAMES:
+                HTTP_OUTCOMES.inc(route=template, outcome=OUTCOME_NAMES[status])
+
+
+@app.exception_handler(AdmissionRejected)
+async def admission_rejected(request: Request, exc: AdmissionRejected):
+    # 429 when the caller's account is over its rate, 503 when the service is saturated
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"detail": f"Write rejected by admission control ({exc.reason})"},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
 
 @app.on_event("startup")
 def on_startup() -> None:
-    # Initialize SQLite schema (hackathon-friendly; no migrations)
+    # Initialize SQLite schema (hackathon-friendly; no migrations); a version lookup when already current
     init_db()
-    # Configure Stripe if a secret is provided
-    if SETTINGS.stripe_secret_key:
-        stripe.api_key = SETTINGS.stripe_secret_key
+    # Drain queued payment_intent.succeeded webhooks into the ledger in batches
+    if SETTINGS.stripe_webhook_secret:
+        WEBHOOK_WORKER.start()
+
+
+@app.on_event("shutdown")
+async def on_shutdown() -> None:
+    WEBHOOK_WORKER.stop()
+    # Release pooled Stripe/processor connections (both clients are created lazily on first use)
+    await close_stripe_client()
+    await close_processor()
 
 
 @app.get("/health")
@@ -99,6 +205,9 @@ def config():
         "currency": SETTINGS.currency,
         "maxTransactionCents": SETTINGS.max_tx_cents,
         "corsAllowedOrigins": effective_origins,
+        "processor": SETTINGS.payments_processor,
+        # Capabilities for clients (payments_client coalesces transfers when batching is available)
+        "features": {"transferBatch": True, "maxTransferBatch": SETTINGS.transfer_batch_max},
         "cybersource": {
             "environment": SETTINGS.cybersource_environment,
             "authType": SETTINGS.cybersource_auth_type,
@@ -110,6 +219,11 @@ def config():
     }
 
 
+@app.get("/metrics")
+def metrics():
+    return PlainTextResponse(REGISTRY.render(), media_type=METRICS_CONTENT_TYPE)
+
+
 @app.get("/")
 def root():
     return {
@@ -124,7 +238,20 @@ def root():
 # ===== Accounts =====
 
 @app.post("/accounts", response_model=AccountCreateResponse)
+@retry_on_lock
 def create_account(req: AccountCreateRequest, db: Session = Depends(get_db)):
+    # Known email: one primary-key read for the balance instead of the user + account lookups
+    cached = ACCOUNT_DIRECTORY.get(req.email)
+    if cached:
+        account = db.get(Account, cached[1])
+        if account:
+            return AccountCreateResponse(
+                userId=cached[0],
+                accountId=account.id,
+                currency=account.currency,
+                balanceCents=account.balance_cents,
+            )
+
     # Create or reuse user by email
     user = db.execute(select(User).where(User.email == req.email)).scalar_one_or_none()
     if not user:
@@ -143,6 +270,10 @@ def create_account(req: AccountCreateRequest, db: Session = Depends(get_db)):
         db.add(account)
         db.flush()
 
+    # Only cache ids that are committed
+    db.commit()
+    ACCOUNT_DIRECTORY.remember(req.email, user.id, account.id)
+
     return AccountCreateResponse(
         userId=user.id,
         accountId=account.id,
@@ -151,17 +282,143 @@ def create_account(req: AccountCreateRequest, db: Session = Depends(get_db)):
     )
 
 
+@app.post("/accounts/bulk", response_model=AccountsBulkResponse)
+@retry_on_lock
+def create_accounts_bulk(req: AccountsBulkRequest, db: Session = Depends(get_db)):
+    """
+    Create or update users (by email) and their service-currency accounts in one transaction.
+    A non-empty name replaces the stored one. Queries are chunked IN (...) lookups and executemany
+    inserts, so cost grows with the number of chunks rather than one round of SELECT/flush per user.
+    """
+    if len(req.users) > SETTINGS.accounts_bulk_max:
+        raise HTTPException(status_code=413, detail=f"At most {SETTINGS.accounts_bulk_max} users per request")
+
+    names = {}
+    for u in req.users:
+        if u.email not in names or u.name:
+            names[u.email] = u.name
+    emails = list(names)
+
+    begin_immediate(db)
+
+    user_ids = {}
+    renames = []
+    for chunk in chunked(emails):
+        for email, user_id, name in db.execute(
+            select(User.email, User.id, User.name).where(User.email.in_(chunk))
+        ):
+            user_ids[email] = user_id
+            if names[email] and names[email] != name:
+                renames.append({"id": user_id, "name": names[email]})
+
+    new_emails = [e for e in emails if e not in user_ids]
+    if new_emails:
+        db.execute(insert(User), [{"email": e, "name": names[e]} for e in new_emails])
+        for chunk in chunked(new_emails):
+            user_ids.update(db.execute(select(User.email, User.id).where(User.email.in_(chunk))).all())
+    if renames:
+        db.execute(update(User), renames)
+
+    accounts = {}
+    all_user_ids = list(user_ids.values())
+
+    def load_accounts(ids):
+        for chunk in chunked(ids):
+            for user_id, account_id, balance_cents in db.execute(
+                select(Account.user_id, Account.id, Account.balance_cents)
+                .where(Account.user_id.in_(chunk), Account.currency == SETTINGS.currency)
+            ):
+                accounts[user_id] = (account_id, balance_cents)
+
+    load_accounts(all_user_ids)
+    missing = [uid for uid in all_user_ids if uid not in accounts]
+    if missing:
+        db.execute(insert(Account), [{"user_id": uid, "currency": SETTINGS.currency, "balance_cents": 0} for uid in missing])
+        load_accounts(missing)
+
+    db.commit()
+
+    created = set(missing)
+    items = []
+    for email in emails:
+        user_id = user_ids[email]
+        account_id, balance_cents = accounts[user_id]
+        ACCOUNT_DIRECTORY.remember(email, user_id, account_id)
+        items.append({
+            "email": email,
+            "userId": user_id,
+            "accountId": account_id,
+            "currency": SETTINGS.currency,
+            "balanceCents": balance_cents,
+            "created": user_id in created,
+        })
+    return FastJSONResponse({"accounts": items, "createdUsers": len(new_emails), "createdAccounts": len(missing)})
+
+
+@app.get("/accounts/by-email", response_model=AccountsByEmailResponse)
+def get_accounts_by_email(
+    email: List[str] = Query(..., description="Repeat for batch lookup: ?email=a@x.com&email=b@x.com"),
+    db: Session = Depends(get_read_db),
+):
+    if len(email) > SETTINGS.accounts_bulk_max:
+        raise HTTPException(status_code=413, detail=f"At most {SETTINGS.accounts_bulk_max} emails per request")
+    found = ACCOUNT_DIRECTORY.resolve(db, email)
+    return FastJSONResponse({
+        "accounts": {e: {"userId": ids[0], "accountId": ids[1]} for e, ids in found.items()},
+        "missing": [e for e in dict.fromkeys(email) if e not in found],
+    })
+
+
+@app.post("/accounts/balances", response_model=BalancesResponse)
+def get_balances(req: BalancesRequest, db: Session = Depends(get_read_db)):
+    """
+    Current balance of many users' service-currency accounts, keyed by email, in chunked
+    IN (...) reads. A POST only because the email list does not fit in a query string.
+    """
+    if len(req.emails) > SETTINGS.balances_lookup_max:
+        raise HTTPException(status_code=413, detail=f"At most {SETTINGS.balances_lookup_max} emails per request")
+    emails = list(dict.fromkeys(req.emails))
+    balances = {}
+    for chunk in chunked(emails):
+        balances.update(db.execute(
+            select(User.email, Account.balance_cents)
+            .join(Account, Account.user_id == User.id)
+            .where(User.email.in_(chunk), Account.currency == SETTINGS.currency)
+        ).all())
+    return FastJSONResponse({"balances": balances, "missing": [e for e in emails if e not in balances]})
+
+
+def _latest_ledger_id(account_id_column):
+    # Ledger rows are append-only, so the newest id versions an account's balance and history
+    return (
+        select(func.max(LedgerEntry.id))
+        .where(LedgerEntry.account_id == account_id_column)
+        .scalar_subquery()
+    )
+
+
 @app.get("/accounts/{account_id}", response_model=AccountResponse)
-def get_account(account_id: int, db: Session = Depends(get_db)):
-    account = db.get(Account, account_id)
-    if not account:
+def get_account(
+    account_id: int,
+    db: Session = Depends(get_read_db),
+    if_none_match: Optional[str] = Header(default=None, alias="If-None-Match"),
+):
+    row = db.execute(
+        select(Account.user_id, Account.currency, Account.balance_cents, _latest_ledger_id(Account.id))
+        .where(Account.id == account_id)
+    ).first()
+    if row is None:
         raise HTTPException(status_code=404, detail="Account not found")
-    return AccountResponse(
-        userId=account.user_id,
-        accountId=account.id,
-        currency=account.currency,
-        balanceCents=account.balance_cents,
+    user_id, currency, balance_cents, latest_ledger_id = row
+
+    etag = make_etag("acct", account_id, latest_ledger_id or 0, balance_cents)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+
+    response = FastJSONResponse(
+        {"userId": user_id, "accountId": account_id, "currency": currency, "balanceCents": balance_cents}
     )
+    return set_cache_headers(response, etag)
 
 
 # ===== Transactions =====
@@ -170,47 +427,33 @@ def get_account(account_id: int, db: Session = Depends(get_db)):
 def get_transactions(
     accountId: int = Query(..., description="Account ID"),
     limit: int = Query(20, ge=1, le=100, description="Max number of transactions to return"),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
+    if_none_match: Optional[str] = Header(default=None, alias="If-None-Match"),
 ):
-    account = db.get(Account, accountId)
-    if not account:
+    # Existence check and version in one query, without loading an ORM object
+    row = db.execute(select(Account.id, _latest_ledger_id(Account.id)).where(Account.id == accountId)).first()
+    if row is None:
         raise HTTPException(status_code=404, detail="Account not found")
 
-    rows = (
-        db.query(LedgerEntry)
-        .filter(LedgerEntry.account_id == accountId)
+    etag = make_etag("txns", accountId, limit, row[1] or 0)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+
+    # Select only the needed columns as tuples; no ORM or Pydantic objects per row
+    columns = [getattr(LedgerEntry, name) for name in TRANSACTION_COLUMNS]
+    rows = db.execute(
+        select(*columns)
+        .where(LedgerEntry.account_id == accountId)
         .order_by(LedgerEntry.created_at.desc())
         .limit(limit)
-        .all()
-    )
+    ).all()
 
-    items: List[Transaction] = []
-    for r in rows:
-        items.append(
-            Transaction(
-                id=r.id,
-                accountId=r.account_id,
-                type=r.type,
-                status=r.status,
-                amountCents=r.amount_cents,
-                currency=r.currency,
-                transferGroupId=r.transfer_group_id,
-                relatedEntryId=r.related_entry_id,
-                createdAt=r.created_at.replace(tzinfo=dt.timezone.utc).isoformat().replace("+00:00", "Z"),
-            )
-        )
-    return TransactionsResponse(accountId=accountId, items=items)
+    response = FastJSONResponse({"accountId": accountId, "items": transaction_items(rows)})
+    return set_cache_headers(response, etag)
 
 
 # ===== Transfers (internal, double-entry) =====
 
-def _load_account_or_404(db: Session, account_id: int) -> Account:
-    acct = db.get(Account, account_id)
-    if not acct:
-        raise HTTPException(status_code=404, detail=f"Account {account_id} not found")
-    return acct
-
-
 def _upsert_idempotency(
     db: Session,
     route: str,
@@ -255,161 +498,325 @@ def _upsert_idempotency(
         return existing
 
 
-@app.post("/transfers", response_model=TransferResponse)
-def create_transfer(
-    req: TransferRequest,
-    db: Session = Depends(get_db),
-    idempotency_key: Optional[str] = Header(default=None, alias="Idempotency-Key"),
-):
-    # Validate inputs
-    enforce_currency_and_limits(req.amountCents, req.currency)
-
-    from_acct = _load_account_or_404(db, req.fromAccountId)
-    to_acct = _load_account_or_404(db, req.toAccountId)
-
-    if from_acct.currency != SETTINGS.currency or to_acct.currency != SETTINGS.currency:
-        raise HTTPException(status_code=400, detail="Accounts must be in service currency")
+def _lookup_idempotency(db: Session, route_name: str, key: str, metric_route: str) -> Optional[IdempotencyKey]:
+    """
+    Fetch a stored Idempotency-Key for this route and count the hit/miss.
+    metric_route is the route template, so per-account routes share one series.
+    """
+    existing = (
+        db.execute(
+            select(IdempotencyKey).where(
+                IdempotencyKey.key == key,
+                IdempotencyKey.route == route_name,
+            )
+        ).scalar_one_or_none()
+    )
+    hit = bool(existing and existing.result_ref)
+    IDEMPOTENCY_LOOKUPS.inc(route=metric_route, result="hit" if hit else "miss")
+    return existing
 
-    if from_acct.id == to_acct.id:
-        raise HTTPException(status_code=400, detail="Cannot transfer to the same account")
 
-    route_name = "POST /transfers"
+TRANSFER_ROUTE = "POST /transfers"
 
-    # Idempotency: if key exists and has a result_ref (group id), return the prior result
-    if idempotency_key:
-        existing = (
-            db.execute(
-                select(IdempotencyKey).where(
-                    IdempotencyKey.key == idempotency_key,
-                    IdempotencyKey.route == route_name,
-                )
-            ).scalar_one_or_none()
-        )
-        if existing and existing.result_ref:
-            # Compute current balances (should already reflect prior transfer)
-            return TransferResponse(
-                transferGroupId=existing.result_ref,
-                fromBalanceCents=from_acct.balance_cents,
-                toBalanceCents=to_acct.balance_cents,
-            )
 
-    # Perform atomic double-entry
+def _post_transfers(db: Session, items: List[TransferBatchItem]) -> List[dict]:
+    """
+    Apply transfers in order inside one BEGIN IMMEDIATE transaction (the caller commits).
+    Each item gets its own result, {"status": 200, transferGroupId, fromBalanceCents, toBalanceCents}
+    or {"status": 4xx, "detail": ...}; a failed item never affects the others.
+    Accounts and Idempotency-Keys are loaded with one query each, and keys are shared with
+    single POST /transfers calls, so a retry may switch between the two.
+    """
     begin_immediate(db)
 
-    # Re-check funds under transaction
-    db.refresh(from_acct)
-    db.refresh(to_acct)
+    account_ids = {i.fromAccountId for i in items} | {i.toAccountId for i in items}
+    accounts = {a.id: a for a in db.execute(select(Account).where(Account.id.in_(account_ids))).scalars()}
+    keys = {i.idempotencyKey for i in items if i.idempotencyKey}
+    replays = {
+        k.key: k.result_ref
+        for k in db.execute(
+            select(IdempotencyKey).where(IdempotencyKey.route == TRANSFER_ROUTE, IdempotencyKey.key.in_(keys))
+        ).scalars()
+        if k.result_ref
+    } if keys else {}
+
+    results: List[dict] = []
+    posted = []
+    for item in items:
+        from_acct = accounts.get(item.fromAccountId)
+        to_acct = accounts.get(item.toAccountId)
+        try:
+            enforce_currency_and_limits(item.amountCents, item.currency)
+        except ValueError as e:
+            results.append({"status": 400, "detail": str(e)})
+            continue
+        if from_acct is None or to_acct is None:
+            missing = item.fromAccountId if from_acct is None else item.toAccountId
+            results.append({"status": 404, "detail": f"Account {missing} not found"})
+            continue
+        if from_acct.currency != SETTINGS.currency or to_acct.currency != SETTINGS.currency:
+            results.append({"status": 400, "detail": "Accounts must be in service currency"})
+            continue
+        if from_acct.id == to_acct.id:
+            results.append({"status": 400, "detail": "Cannot transfer to the same account"})
+            continue
+
+        # Idempotency: a known key (stored, or earlier in this batch) returns the prior group id
+        if item.idempotencyKey:
+            prior = replays.get(item.idempotencyKey)
+            IDEMPOTENCY_LOOKUPS.inc(route=TRANSFER_ROUTE, result="hit" if prior else "miss")
+            if prior:
+                results.append({
+                    "status": 200,
+                    "transferGroupId": prior,
+                    "fromBalanceCents": from_acct.balance_cents,
+                    "toBalanceCents": to_acct.balance_cents,
+                })
+                continue
+
+        if from_acct.balance_cents < item.amountCents:
+            results.append({"status": 402, "detail": "Insufficient funds"})
+            continue
+
+        group_id = str(uuid.uuid4())
+
+        # Debit source
+        debit = LedgerEntry(
+            account_id=from_acct.id,
+            type="transfer_out",
+            status="posted",
+            amount_cents=item.amountCents,
+            currency=SETTINGS.currency,
+            transfer_group_id=group_id,
+        )
+        from_acct.balance_cents = from_acct.balance_cents - item.amountCents
+
+        # Credit destination
+        credit = LedgerEntry(
+            account_id=to_acct.id,
+            type="transfer_in",
+            status="posted",
+            amount_cents=item.amountCents,
+            currency=SETTINGS.currency,
+            transfer_group_id=group_id,
+        )
+        to_acct.balance_cents = to_acct.balance_cents + item.amountCents
 
-    if from_acct.balance_cents < req.amountCents:
-        raise HTTPException(status_code=402, detail="Insufficient funds")
+        result = {
+            "status": 200,
+            "transferGroupId": group_id,
+            "fromBalanceCents": from_acct.balance_cents,
+            "toBalanceCents": to_acct.balance_cents,
+        }
+        results.append(result)
+        posted.append((item, from_acct, to_acct, debit, credit, result))
+        if item.idempotencyKey:
+            replays[item.idempotencyKey] = group_id
 
-    group_id = str(uuid.uuid4())
+    if not posted:
+        return results
 
-    # Debit source
-    debit = LedgerEntry(
-        account_id=from_acct.id,
-        type="transfer_out",
-        status="posted",
-        amount_cents=req.amountCents,
-        currency=SETTINGS.currency,
-        transfer_group_id=group_id,
-    )
-    from_acct.balance_cents = from_acct.balance_cents - req.amountCents
+    db.add_all([entry for p in posted for entry in (p[3], p[4])])
+    db.flush()  # entry ids for the outbox events
 
-    # Credit destination
-    credit = LedgerEntry(
-        account_id=to_acct.id,
-        type="transfer_in",
-        status="posted",
-        amount_cents=req.amountCents,
-        currency=SETTINGS.currency,
-        transfer_group_id=group_id,
-    )
-    to_acct.balance_cents = to_acct.balance_cents + req.amountCents
-
-    db.add_all([debit, credit])
-
-    # Record idempotency (after creating group id)
-    if idempotency_key:
-        _upsert_idempotency(
-            db=db,
-            route=route_name,
-            key=idempotency_key,
-            user_id=from_acct.user_id,
-            result_ref=group_id,
+    now = now_utc()
+    ttl = SETTINGS.idempotency_ttl_seconds
+    expires = now + dt.timedelta(seconds=ttl) if ttl and ttl > 0 else None
+    keyed = []
+    for item, from_acct, to_acct, debit, credit, result in posted:
+        # Change feed event, committed atomically with the postings
+        record_event(
+            db,
+            TRANSFER_POSTED,
+            {
+                "transferGroupId": result["transferGroupId"],
+                "fromAccountId": from_acct.id,
+                "toAccountId": to_acct.id,
+                "amountCents": item.amountCents,
+                "currency": SETTINGS.currency,
+                "fromBalanceCents": result["fromBalanceCents"],
+                "toBalanceCents": result["toBalanceCents"],
+                "debitEntryId": debit.id,
+                "creditEntryId": credit.id,
+            },
+            account_id=from_acct.id,
         )
-
-    # Commit transaction
+        if item.idempotencyKey:
+            keyed.append({
+                "key": item.idempotencyKey,
+                "route": TRANSFER_ROUTE,
+                "user_id": from_acct.user_id,
+                "result_ref": result["transferGroupId"],
+                "created_at": now,
+                "last_seen_at": now,
+                "expires_at": expires,
+            })
+    if keyed:
+        db.flush()  # postings and events first, so a conflict below can only come from a key
+        try:
+            db.execute(insert(IdempotencyKey), keyed)
+        except IntegrityError:
+            # Another writer stored one of these keys after the lookup above (SQLite's write lock
+            # rules this out; other databases may not): undo the batch and redo it, which now
+            # replays the stored key instead of posting the transfer twice
+            db.rollback()
+            return _post_transfers(db, items)
+    return results
+
+
+@retry_on_lock
+def _transfer(db: Session, req: TransferRequest, idempotency_key: Optional[str]) -> TransferResponse:
+    item = TransferBatchItem(**req.model_dump(), idempotencyKey=idempotency_key)
+    result = _post_transfers(db, [item])[0]
     db.commit()
-
-    # Return new balances
+    if result["status"] != 200:
+        raise HTTPException(status_code=result["status"], detail=result["detail"])
     return TransferResponse(
-        transferGroupId=group_id,
-        fromBalanceCents=from_acct.balance_cents,
-        toBalanceCents=to_acct.balance_cents,
+        transferGroupId=result["transferGroupId"],
+        fromBalanceCents=result["fromBalanceCents"],
+        toBalanceCents=result["toBalanceCents"],
     )
 
-# ===== Deposits =====
 
-@app.post("/accounts/{account_id}/deposit", response_model=DepositResponse)
-def deposit(
-    account_id: int,
-    req: DepositRequest,
-    db: Session = Depends(get_db),
+def _run_transfer(req: TransferRequest, idempotency_key: Optional[str]) -> TransferResponse:
+    with session_scope() as db:
+        return _transfer(db=db, req=req, idempotency_key=idempotency_key)
+
+
+@app.post("/transfers", response_model=TransferResponse)
+async def create_transfer(
+    req: TransferRequest,
     idempotency_key: Optional[str] = Header(default=None, alias="Idempotency-Key"),
 ):
-    # Validate amount and currency against service settings
+    # Validate inputs
     enforce_currency_and_limits(req.amountCents, req.currency)
 
+    # Rate-limit the paying account and queue for a writer slot before opening a session
+    async with WRITE_ADMISSION.admit(req.fromAccountId):
+        return await run_in_threadpool(_run_transfer, req, idempotency_key)
+
+
+@retry_on_lock
+def _transfer_batch(db: Session, items: List[TransferBatchItem]) -> List[dict]:
+    results = _post_transfers(db, items)
+    db.commit()
+    return results
+
+
+def _run_transfer_batch(items: List[TransferBatchItem]) -> List[dict]:
+    with session_scope() as db:
+        return _transfer_batch(db=db, items=items)
+
+
+@app.post("/transfers/batch", response_model=TransferBatchResponse)
+async def create_transfer_batch(req: TransferBatchRequest):
+    """
+    Up to TRANSFER_BATCH_MAX transfers applied in order in one write transaction: one lock
+    acquisition and one commit instead of one per transfer. Results are per item, in request order.
+    """
+    if len(req.transfers) > SETTINGS.transfer_batch_max:
+        raise HTTPException(status_code=413, detail=f"At most {SETTINGS.transfer_batch_max} transfers per batch")
+    if not req.transfers:
+        return FastJSONResponse({"results": []})
+
+    # Every item is charged to its paying account's rate limit. Items over the limit get their own
+    # 429/503 result instead of failing the batch; the admitted rest takes one writer slot.
+    verdicts = WRITE_ADMISSION.check_batch_rate([item.fromAccountId for item in req.transfers])
+    results: List[Optional[dict]] = [
+        None if rejected is None else {
+            "status": rejected.status_code,
+            "detail": f"Write rejected by admission control ({rejected.reason})",
+            "retryAfter": rejected.retry_after,
+        }
+        for rejected in verdicts
+    ]
+    admitted = [item for item, rejected in zip(req.transfers, verdicts) if rejected is None]
+    if admitted:
+        async with WRITE_ADMISSION.writer():
+            posted = iter(await run_in_threadpool(_run_transfer_batch, admitted))
+        results = [next(posted) if result is None else result for result in results]
+    return FastJSONResponse({"results": results})
+
+# ===== Deposits =====
+
+def _deposit_replay(
+    db: Session, account: Account, route_name: str, idempotency_key: Optional[str]
+) -> Optional[DepositResponse]:
+    # Idempotency check: return previous result if exists
+    if not idempotency_key:
+        return None
+    existing = _lookup_idempotency(
+        db, route_name, idempotency_key, metric_route="POST /accounts/{account_id}/deposit"
+    )
+    if not (existing and existing.result_ref):
+        return None
+    try:
+        txn_id = int(existing.result_ref)
+    except ValueError:
+        txn_id = 0
+    return DepositResponse(transactionId=txn_id, newBalanceCents=account.balance_cents)
+
+
+def _load_deposit_account(db: Session, account_id: int) -> Account:
     account = db.get(Account, account_id)
     if not account:
         raise HTTPException(status_code=404, detail="Account not found")
     if account.currency != SETTINGS.currency:
         raise HTTPException(status_code=400, detail="Account currency mismatch")
+    return account
+
+
+def _record_deposit_event(db: Session, account: Account, entry: LedgerEntry, source: str) -> None:
+    record_event(
+        db,
+        DEPOSIT_POSTED,
+        {
+            "accountId": account.id,
+            "transactionId": entry.id,
+            "amountCents": entry.amount_cents,
+            "currency": entry.currency,
+            "balanceCents": account.balance_cents,
+            "source": source,
+        },
+        account_id=account.id,
+    )
 
-    # Use account-specific route value to scope idempotency safely
-    route_name = f"POST /accounts/{account_id}/deposit"
 
-    # Idempotency check: return previous result if exists
-    if idempotency_key:
-        existing = (
-            db.execute(
-                select(IdempotencyKey).where(
-                    IdempotencyKey.key == idempotency_key,
-                    IdempotencyKey.route == route_name,
-                )
-            ).scalar_one_or_none()
-        )
-        if existing and existing.result_ref:
-            try:
-                txn_id = int(existing.result_ref)
-            except ValueError:
-                txn_id = 0
-            return DepositResponse(
-                transactionId=txn_id,
-                newBalanceCents=account.balance_cents,
-            )
+@retry_on_lock
+def _credit_deposit(
+    db: Session,
+    account_id: int,
+    amount_cents: int,
+    idempotency_key: Optional[str],
+    source: str = "simulated",
+) -> Tuple[DepositResponse, bool]:
+    """
+    Post a deposit to the ledger. Returns (response, created); created is False on an idempotent replay.
+    """
+    account = _load_deposit_account(db, account_id)
 
-    # For now, simulate deposit unless CyberSource is wired
-    if not req.simulate:
-        # Future path: use req.flexToken with CyberSource Payments API (auth+capture)
-        # and only credit on decision == "ACCEPT"
-        raise HTTPException(status_code=501, detail="CyberSource deposit not implemented yet; set simulate=true")
+    # Use account-specific route value to scope idempotency safely
+    route_name = f"POST /accounts/{account_id}/deposit"
 
-    # Atomic update for SQLite
+    # Atomic update for SQLite; the replay check runs under the write lock so concurrent retries post once
     begin_immediate(db)
     db.refresh(account)
 
+    replay = _deposit_replay(db, account, route_name, idempotency_key)
+    if replay:
+        return replay, False
+
     entry = LedgerEntry(
         account_id=account.id,
         type="deposit",
         status="posted",
-        amount_cents=req.amountCents,
+        amount_cents=amount_cents,
         currency=SETTINGS.currency,
     )
-    account.balance_cents = account.balance_cents + req.amountCents
+    account.balance_cents = account.balance_cents + amount_cents
     db.add(entry)
     db.flush()  # get entry.id
+    _record_deposit_event(db, account, entry, source)
 
     if idempotency_key:
         _upsert_idempotency(
@@ -422,12 +829,142 @@ def deposit(
 
     db.commit()
 
-    return DepositResponse(transactionId=entry.id, newBalanceCents=account.balance_cents)
+    return DepositResponse(transactionId=entry.id, newBalanceCents=account.balance_cents), True
+
+
+def _run_credit_deposit(
+    account_id: int, amount_cents: int, idempotency_key: Optional[str], source: str = "simulated"
+) -> Tuple[DepositResponse, bool]:
+    with session_scope() as db:
+        return _credit_deposit(
+            db=db, account_id=account_id, amount_cents=amount_cents, idempotency_key=idempotency_key, source=source
+        )
+
+
+def _run_check_deposit(account_id: int, idempotency_key: Optional[str]) -> Optional[DepositResponse]:
+    # Read-only pre-check before charging the card: 404/400 early and replay without a second charge
+    with read_session_scope() as db:
+        account = _load_deposit_account(db, account_id)
+        return _deposit_replay(db, account, f"POST /accounts/{account_id}/deposit", idempotency_key)
+
+
+async def _processor_call(processor, operation: str, call):
+    # Await a processor coroutine and record its latency, decision and trace span
+    started = time.perf_counter()
+    outcome = "error"
+    with TRACER.span(f"processor.{operation}", processor=processor.name) as span:
+        try:
+            result = await call
+            outcome = result.decision.lower()
+            return result
+        finally:
+            span.set_attribute("outcome", outcome)
+            OUTBOUND_LATENCY.observe(
+                time.perf_counter() - started, service=processor.name, operation=operation, outcome=outcome
+            )
+
+
+async def _void_quietly(processor, transaction_id: Optional[str], reference: str) -> None:
+    if not transaction_id:
+        return
+    try:
+        await _processor_call(processor, "void", processor.void(transaction_id, reference))
+    except ProcessorError:
+        pass
+
+
+async def _reverse_capture(processor, capture_id: Optional[str], account_id: int, reference: str) -> bool:
+    """
+    Give back captured funds that never reached the ledger. A failure is logged and counted
+    (payments_capture_reversals_total{outcome="failed"}) for manual follow-up.
+    """
+    reason = "no capture id"
+    if capture_id:
+        try:
+            result = await _processor_call(processor, "void_capture", processor.void_capture(capture_id, reference))
+            if result.accepted:
+                CAPTURE_REVERSALS.inc(outcome="reversed")
+                return True
+            reason = f"{result.decision} (status={result.status}, reason={result.reason})"
+        except ProcessorError as e:
+            reason = str(e)
+    CAPTURE_REVERSALS.inc(outcome="failed")
+    logger.error(
+        "Capture %s for account %s (reference %s) was not posted and could not be reversed: %s",
+        capture_id, account_id, reference, reason,
+    )
+    return False
+
+
+@app.post("/accounts/{account_id}/deposit", response_model=DepositResponse)
+async def deposit(
+    account_id: int,
+    req: DepositRequest,
+    idempotency_key: Optional[str] = Header(default=None, alias="Idempotency-Key"),
+):
+    # Validate amount and currency against service settings
+    enforce_currency_and_limits(req.amountCents, req.currency)
+
+    if req.simulate:
+        async with WRITE_ADMISSION.admit(account_id):
+            response, _ = await run_in_threadpool(_run_credit_deposit, account_id, req.amountCents, idempotency_key)
+        return response
+
+    # Card path: authorize + capture on the processor (PAYMENTS_PROCESSOR) with no DB session or lock held,
+    # then credit the ledger only on ACCEPT.
+    if not req.flexToken:
+        raise HTTPException(status_code=400, detail="flexToken is required when simulate=false")
+
+    # Rate limits apply before the card is charged; the writer slot is only taken for the ledger credit
+    WRITE_ADMISSION.check_rate(account_id)
+
+    replay = await run_in_threadpool(_run_check_deposit, account_id, idempotency_key)
+    if replay:
+        return replay
+
+    reference = idempotency_key or f"deposit-{account_id}-{uuid.uuid4().hex}"
+    try:
+        processor = get_processor()
+        auth = await _processor_call(
+            processor, "authorize", processor.authorize(req.amountCents, req.currency, req.flexToken, reference)
+        )
+        if not auth.accepted:
+            raise HTTPException(
+                status_code=402, detail=f"Payment {auth.decision.lower()} (status={auth.status}, reason={auth.reason})"
+            )
+        capture = await _processor_call(
+            processor, "capture", processor.capture(auth.transaction_id, req.amountCents, req.currency, reference)
+        )
+        if not capture.accepted:
+            await _void_quietly(processor, auth.transaction_id, reference)
+            raise HTTPException(
+                status_code=402,
+                detail=f"Capture {capture.decision.lower()} (status={capture.status}, reason={capture.reason})",
+            )
+    except ProcessorError as e:
+        raise HTTPException(status_code=502, detail=f"Processor error: {str(e)}")
+
+    try:
+        # Captured money must be posted, so this wait is never shed
+        async with WRITE_ADMISSION.writer(shed=False):
+            response, created = await run_in_threadpool(
+                _run_credit_deposit, account_id, req.amountCents, idempotency_key, "card"
+            )
+    except Exception:
+        # Money was captured but never posted; give it back
+        await _reverse_capture(processor, capture.transaction_id, account_id, reference)
+        raise
+    if not created:
+        # A concurrent request with the same Idempotency-Key already credited this deposit
+        await _reverse_capture(processor, capture.transaction_id, account_id, reference)
+    return response
 
 # ===== Stripe (test mode) Integration =====
 class CreatePIRequest(BaseModel):
     amountCents: int
     currency: str = "USD"
+    # Stored as PaymentIntent metadata so the payment_intent.succeeded webhook knows which account to credit
+    accountId: Optional[int] = None
 
 
 class CreatePIResponse(BaseModel):
@@ -442,7 +979,7 @@ class StripeDepositRequest(BaseModel):
 
 
 @app.post("/stripe/create-payment-intent", response_model=CreatePIResponse)
-def stripe_create_payment_intent(
+async def stripe_create_payment_intent(
     req: CreatePIRequest,
     idempotency_key: Optional[str] = Header(default=None, alias="Idempotency-Key"),
 ):
@@ -452,40 +989,35 @@ def stripe_create_payment_intent(
     # Validate inputs
     enforce_currency_and_limits(req.amountCents, req.currency)
 
-    # Create PaymentIntent in Stripe (test mode)
+    # Create PaymentIntent in Stripe (test mode) on the pooled async client
     try:
-        kwargs = {
-            "amount": int(req.amountCents),
-            "currency": req.currency.lower(),
-            "automatic_payment_methods": {"enabled": True},
-        }
-        if idempotency_key:
-            pi = stripe.PaymentIntent.create(**kwargs, idempotency_key=idempotency_key)
-        else:
-            pi = stripe.PaymentIntent.create(**kwargs)
-    except Exception as e:
+        pi = await get_stripe_client().create_payment_intent(
+            req.amountCents,
+            req.currency,
+            idempotency_key=idempotency_key,
+            metadata={"account_id": req.accountId} if req.accountId is not None else None,
+        )
+    except StripeError as e:
         raise HTTPException(status_code=400, detail=f"Stripe PI create error: {str(e)}")
 
-    client_secret = getattr(pi, "client_secret", None)
+    client_secret = pi.get("client_secret")
     if not client_secret:
         raise HTTPException(status_code=400, detail="Stripe did not return a client_secret")
 
     return CreatePIResponse(clientSecret=client_secret, paymentIntentId=pi["id"])
 
 
-@app.post("/accounts/{account_id}/deposit/stripe", response_model=DepositResponse)
-def stripe_deposit_credit(
+@retry_on_lock
+def _credit_stripe_deposit(
+    db: Session,
     account_id: int,
-    req: StripeDepositRequest,
-    db: Session = Depends(get_db),
-    idempotency_key: Optional[str] = Header(default=None, alias="Idempotency-Key"),
-):
-    if not SETTINGS.stripe_secret_key:
-        raise HTTPException(status_code=501, detail="Stripe not configured on server")
-
-    # Validate currency/amount against service limits
-    enforce_currency_and_limits(req.amountCents, req.currency)
-
+    payment_intent_id: str,
+    amount_cents: int,
+    idempotency_key: Optional[str],
+) -> DepositResponse:
+    """
+    Ledger half of the Stripe deposit, run in the threadpool after Stripe has been verified.
+    """
     # Load account
     account = db.get(Account, account_id)
     if not account:
@@ -497,13 +1029,8 @@ def stripe_deposit_credit(
 
     # Idempotency: return previous result if exists
     if idempotency_key:
-        existing = (
-            db.execute(
-                select(IdempotencyKey).where(
-                    IdempotencyKey.key == idempotency_key,
-                    IdempotencyKey.route == route_name,
-                )
-            ).scalar_one_or_none()
+        existing = _lookup_idempotency(
+            db, route_name, idempotency_key, metric_route="POST /accounts/{account_id}/deposit/stripe"
         )
         if existing and existing.result_ref:
             try:
@@ -512,44 +1039,27 @@ def stripe_deposit_credit(
                 txn_id = 0
             return DepositResponse(transactionId=txn_id, newBalanceCents=account.balance_cents)
 
-    # Retrieve the PaymentIntent from Stripe and verify it succeeded and matches amount/currency
-    try:
-        pi = stripe.PaymentIntent.retrieve(req.paymentIntentId)
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Stripe PI retrieve error: {str(e)}")
-
-    status = getattr(pi, "status", None)
-    amount_received = getattr(pi, "amount_received", None)
-    currency = getattr(pi, "currency", None)
-
-    # For Payment Element with automatic_payment_methods, on successful confirmation status should be 'succeeded'
-    if status != "succeeded":
-        raise HTTPException(status_code=402, detail=f"PaymentIntent not succeeded (status={status})")
-
-    # Stripe reports amounts in the smallest currency unit (cents)
-    if amount_received is None or int(amount_received) != int(req.amountCents):
-        raise HTTPException(
-            status_code=400, detail=f"Amount mismatch: expected {req.amountCents}, got {amount_received}"
-        )
-    if not currency or currency.upper() != SETTINGS.currency:
-        raise HTTPException(
-            status_code=400, detail=f"Currency mismatch: expected {SETTINGS.currency}, got {currency}"
-        )
-
     # Credit ledger atomically
     begin_immediate(db)
     db.refresh(account)
 
+    # The webhook worker may already have credited this PaymentIntent
+    prior = db.get(StripeCredit, payment_intent_id)
+    if prior:
+        return DepositResponse(transactionId=prior.ledger_entry_id, newBalanceCents=account.balance_cents)
+
     entry = LedgerEntry(
         account_id=account.id,
         type="deposit",
         status="posted",
-        amount_cents=req.amountCents,
+        amount_cents=amount_cents,
         currency=SETTINGS.currency,
     )
-    account.balance_cents = account.balance_cents + req.amountCents
+    account.balance_cents = account.balance_cents + amount_cents
     db.add(entry)
     db.flush()
+    db.add(StripeCredit(payment_intent_id=payment_intent_id, ledger_entry_id=entry.id))
+    _record_deposit_event(db, account, entry, "stripe")
 
     if idempotency_key:
         _upsert_idempotency(
@@ -563,3 +1073,181 @@ def stripe_deposit_credit(
     db.commit()
 
     return DepositResponse(transactionId=entry.id, newBalanceCents=account.balance_cents)
+
+
+def _run_credit_stripe_deposit(
+    account_id: int, payment_intent_id: str, amount_cents: int, idempotency_key: Optional[str]
+) -> DepositResponse:
+    with session_scope() as db:
+        return _credit_stripe_deposit(
+            db=db,
+            account_id=account_id,
+            payment_intent_id=payment_intent_id,
+            amount_cents=amount_cents,
+            idempotency_key=idempotency_key,
+        )
+
+
+@app.post("/accounts/{account_id}/deposit/stripe", response_model=DepositResponse)
+async def stripe_deposit_credit(
+    account_id: int,
+    req: StripeDepositRequest,
+    idempotency_key: Optional[str] = Header(default=None, alias="Idempotency-Key"),
+):
+    if not SETTINGS.stripe_secret_key:
+        raise HTTPException(status_code=501, detail="Stripe not configured on server")
+
+    # Validate currency/amount against service limits
+    enforce_currency_and_limits(req.amountCents, req.currency)
+
+    WRITE_ADMISSION.check_rate(account_id)
+
+    # Retrieve the PaymentIntent from Stripe and verify it succeeded and matches amount/currency.
+    # This happens before any DB session is opened so a slow Stripe never holds a connection or the write lock.
+    try:
+        pi = await get_stripe_client().retrieve_payment_intent(req.paymentIntentId)
+    except StripeError as e:
+        raise HTTPException(status_code=400, detail=f"Stripe PI retrieve error: {str(e)}")
+
+    status = pi.get("status")
+    amount_received = pi.get("amount_received")
+    currency = pi.get("currency")
+
+    # For Payment Element with automatic_payment_methods, on successful confirmation status should be 'succeeded'
+    if status != "succeeded":
+        raise HTTPException(status_code=402, detail=f"PaymentIntent not succeeded (status={status})")
+
+    # Stripe reports amounts in the smallest currency unit (cents)
+    if amount_received is None or int(amount_received) != int(req.amountCents):
+        raise HTTPException(
+            status_code=400, detail=f"Amount mismatch: expected {req.amountCents}, got {amount_received}"
+        )
+    if not currency or currency.upper() != SETTINGS.currency:
+        raise HTTPException(
+            status_code=400, detail=f"Currency mismatch: expected {SETTINGS.currency}, got {currency}"
+        )
+
+    # Blocking SQLAlchemy work goes to the threadpool; lock retries never repeat the Stripe call.
+    # A shed request is safe to retry: the PaymentIntent is credited at most once.
+    async with WRITE_ADMISSION.writer():
+        return await run_in_threadpool(
+            _run_credit_stripe_deposit, account_id, req.paymentIntentId, req.amountCents, idempotency_key
+        )
+
+
+# ===== Stripe webhooks =====
+
+@retry_on_lock
+def _enqueue_webhook_event(db: Session, event: dict) -> bool:
+    queued = enqueue_event(db, event)
+    db.commit()
+    return queued
+
+
+def _run_enqueue_webhook_event(event: dict) -> bool:
+    with session_scope() as db:
+        return _enqueue_webhook_event(db=db, event=event)
+
+
+@app.post("/stripe/webhook")
+async def stripe_webhook(
+    request: Request,
+    stripe_signature: Optional[str] = Header(default=None, alias="Stripe-Signature"),
+):
+    """
+    Verify and durably queue payment_intent.succeeded events; WebhookWorker credits them in batches.
+    No outbound calls are made here: the signed event already carries amount, currency and account metadata.
+    """
+    if not SETTINGS.stripe_webhook_secret:
+        raise HTTPException(status_code=501, detail="Stripe webhooks not configured on server")
+
+    payload = await request.body()
+    try:
+        verify_signature(
+            payload,
+            stripe_signature,
+            SETTINGS.stripe_webhook_secret,
+            tolerance_seconds=SETTINGS.stripe_webhook_tolerance_seconds,
+        )
+        event = json.loads(payload)
+    except (WebhookSignatureError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid webhook: {str(e)}")
+
+    if event.get("type") != SUCCEEDED_EVENT:
+        # Acknowledge so Stripe stops retrying; nothing to credit
+        return {"received": True, "queued": False}
+
+    queued = await run_in_threadpool(_run_enqueue_webhook_event, event)
+    WEBHOOK_WORKER.notify()
+    return {"received": True, "queued": queued}
+
+
+# ===== Change feed (outbox) =====
+
+def _run_fetch_events(after: int, limit: int) -> list:
+    with read_session_scope() as db:
+        return fetch_events(db, after, limit)
+
+
+@app.get("/events")
+async def get_events(
+    after: int = Query(0, ge=0, description="Return events with id greater than this cursor"),
+    limit: int = Query(100, ge=1, le=1000, description="Max events per batch"),
+    timeout: float = Query(25.0, ge=0, le=60, description="Seconds to wait for new events (0 = no wait)"),
+):
+    """
+    Long-poll the ledger change feed. Returns as soon as at least one event newer than `after` exists,
+    or an empty batch after `timeout`. Resume with after=<next>.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while True:
+        seen = FEED_NOTIFIER.version
+        events = await run_in_threadpool(_run_fetch_events, after, limit)
+        remaining = deadline - loop.time()
+        if events or remaining <= 0:
+            break
+        # Woken by a local commit; the poll interval bounds latency for writes from other workers
+        await FEED_NOTIFIER.wait(seen, min(remaining, SETTINGS.outbox_poll_interval_seconds))
+    return FastJSONResponse({"events": events, "next": events[-1]["id"] if events else after})
+
+
+@app.get("/events/stream")
+async def stream_events(
+    request: Request,
+    after: int = Query(0, ge=0, description="Start after this event id"),
+    last_event_id: Optional[str] = Header(default=None, alias="Last-Event-ID"),
+):
+    """
+    Server-Sent Events stream of the change feed. Each message's `id` is the event id, so
+    EventSource reconnects resume from Last-Event-ID. Sends a keepalive comment when idle.
+    """
+    cursor = int(last_event_id) if last_event_id and last_event_id.isdigit() else after
+    batch_size = 500
+    keepalive_seconds = 15.0
+
+    async def messages():
+        nonlocal cursor
+        loop = asyncio.get_running_loop()
+        idle_since = loop.time()
+        while not await request.is_disconnected():
+            seen = FEED_NOTIFIER.version
+            events = await run_in_threadpool(_run_fetch_events, cursor, batch_size)
+            if events:
+                cursor = events[-1]["id"]
+                idle_since = loop.time()
+                # One chunk per event: each is written (flushed) to the client on its own
+                for e in events:
+                    yield b"id: %d\nevent: %s\ndata: %s\n\n" % (e["id"], e["type"].encode(), dumps(e))
+                if len(events) == batch_size:
+                    continue
+            elif loop.time() - idle_since >= keepalive_seconds:
+                idle_since = loop.time()
+                yield b": keepalive\n\n"
+            await FEED_NOTIFIER.wait(seen, SETTINGS.outbox_poll_interval_seconds)
+
+    return StreamingResponse(
+        messages(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,198 @@
+# payments/metrics.py
+# Dependency-free Prometheus metrics for the payments service (text exposition format 0.0.4).
+#
+# Fed by:
+#   - HTTP middleware in payments/main.py (per-route latency, status counts, 402/404/409 outcomes)
+#   - SQLAlchemy engine events in payments/db.py (per statement class) and begin_immediate lock waits
+#   - Stripe and processor clients (outbound call latency)
+#   - idempotency lookups (hit/miss)
+
+from __future__ import annotations
+
+import bisect
+import threading
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+LabelValues = Tuple[str, ...]
+
+# Seconds; covers sub-millisecond SQLite statements up to slow processor calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Iterable[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Metric:
+    type_name = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        lines = self.header()
+        for key, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value:g}")
+        return lines
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # per label set: [count per bucket (+Inf last)], sum, count
+        self._series: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = ([0] * (len(self.buckets) + 1), [0.0, 0.0])
+                self._series[key] = series
+            series[0][idx] += 1
+            series[1][0] += value
+            series[1][1] += 1
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted((k, (list(c), list(t))) for k, (c, t) in self._series.items())
+        lines = self.header()
+        for key, (counts, (total, count)) in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                labels = _format_labels(self.labelnames, key, f'le="{bound:g}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{labels} {int(count)}")
+            plain = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{plain} {total:.6f}")
+            lines.append(f"{self.name}_count{plain} {int(count)}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        metric = Counter(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (), **kwargs) -> Histogram:
+        metric = Histogram(name, documentation, labelnames, **kwargs)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+REGISTRY = Registry()
+
+HTTP_REQUESTS = REGISTRY.counter(
+    "payments_http_requests_total", "HTTP requests by route template, method and status code",
+    ("method", "route", "status"),
+)
+HTTP_LATENCY = REGISTRY.histogram(
+    "payments_http_request_duration_seconds", "HTTP handler latency by route template", ("method", "route"),
+)
+HTTP_OUTCOMES = REGISTRY.counter(
+    "payments_http_outcomes_total",
+    "Rejections: 402 insufficient funds / payment declined, 404 not found, 409 conflict, 429/503 load shed",
+    ("route", "outcome"),
+)
+DB_STATEMENTS = REGISTRY.histogram(
+    "payments_db_statement_duration_seconds", "SQL statement execution time by engine and statement class",
+    ("engine", "statement"),
+)
+DB_LOCK_WAIT = REGISTRY.histogram(
+    "payments_db_lock_wait_seconds", "Time spent acquiring the SQLite write lock (BEGIN IMMEDIATE)",
+)
+OUTBOUND_LATENCY = REGISTRY.histogram(
+    "payments_outbound_request_duration_seconds", "Stripe / card processor call latency",
+    ("service", "operation", "outcome"),
+)
+IDEMPOTENCY_LOOKUPS = REGISTRY.counter(
+    "payments_idempotency_lookups_total", "Idempotency-Key lookups by route and result (hit/miss)",
+    ("route", "result"),
+)
+ADMISSION_REJECTIONS = REGISTRY.counter(
+    "payments_admission_rejections_total",
+    "Write requests shed by admission control (account_rate, global_rate, queue_full, queue_latency, queue_timeout)",
+    ("reason",),
+)
+ADMISSION_QUEUE_WAIT = REGISTRY.histogram(
+    "payments_admission_queue_wait_seconds", "Time admitted write requests waited for a writer slot",
+)
+DIRECTORY_LOOKUPS = REGISTRY.counter(
+    "payments_account_directory_lookups_total", "Email -> account id resolutions by cache result (hit/miss)",
+    ("result",),
+)
+CAPTURE_REVERSALS = REGISTRY.counter(
+    "payments_capture_reversals_total",
+    "Card captures reversed because the ledger credit failed or was a duplicate (reversed/failed)",
+    ("outcome",),
+)
+
+OUTCOME_NAMES = {
+    402: "payment_required", 404: "not_found", 409: "conflict", 429: "rate_limited", 503: "overloaded",
+}
+
+
+def statement_class(statement: str) -> str:
+    """
+    Leading SQL keyword (SELECT, INSERT, UPDATE, DELETE, BEGIN, PRAGMA, ...), or OTHER.
+    """
+    head = statement.lstrip()[:16].split(None, 1)
+    keyword = head[0].upper() if head else ""
+    if keyword in ("SELECT", "INSERT", "UPDATE", "DELETE", "BEGIN", "COMMIT", "ROLLBACK", "PRAGMA", "WITH"):
+        return keyword
+    return "OTHER"
@@ -0,0 +1,113 @@
+# payments/outbox.py
+# Transactional outbox and change feed of ledger postings.
+#
+# Writers call record_event() inside the transaction that posts to the ledger, so an event exists
+# if and only if its posting committed. Consumers tail the feed by id:
+#   GET /events?after=<id>          long-poll; returns a batch as soon as events newer than <id> exist
+#   GET /events/stream?after=<id>   Server-Sent Events; resumes from Last-Event-ID on reconnect
+#
+# Event types and payloads (camelCase, like the REST API):
+#   transfer.posted  transferGroupId, fromAccountId, toAccountId, amountCents, currency,
+#                    fromBalanceCents, toBalanceCents, debitEntryId, creditEntryId
+#   deposit.posted   accountId, transactionId, amountCents, currency, balanceCents,
+#                    source (simulated | card | stripe | stripe_webhook)
+#
+# FEED_NOTIFIER wakes waiting consumers in this process right after a commit that wrote events;
+# consumers also re-read every OUTBOX_POLL_INTERVAL_SECONDS to pick up writes from other workers.
+
+from __future__ import annotations
+
+import asyncio
+import json
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from payments.db import OutboxEvent
+
+TRANSFER_POSTED = "transfer.posted"
+DEPOSIT_POSTED = "deposit.posted"
+
+_PENDING_KEY = "outbox_pending"
+
+
+def record_event(db: Session, event_type: str, payload: Dict[str, Any], account_id: Optional[int] = None) -> None:
+    """
+    Add an outbox row to the caller's transaction; it commits or rolls back with the posting.
+    """
+    db.add(OutboxEvent(type=event_type, account_id=account_id, payload=json.dumps(payload, separators=(",", ":"))))
+    db.info[_PENDING_KEY] = True
+
+
+def fetch_events(db: Session, after: int, limit: int) -> List[Dict[str, Any]]:
+    """
+    Events with id > after in id order: one primary-key range scan, no ORM objects.
+    """
+    rows: List[Tuple[int, str, str, Any]] = db.execute(
+        select(OutboxEvent.id, OutboxEvent.type, OutboxEvent.payload, OutboxEvent.created_at)
+        .where(OutboxEvent.id > after)
+        .order_by(OutboxEvent.id)
+        .limit(limit)
+    ).all()
+    return [
+        {
+            "id": event_id,
+            "type": event_type,
+            "createdAt": created_at.isoformat() + "Z" if created_at else None,
+            "data": json.loads(payload),
+        }
+        for event_id, event_type, payload, created_at in rows
+    ]
+
+
+class FeedNotifier:
+    """
+    Wakes event-loop waiters from any thread. `version` increases on every notify(), so a waiter
+    that read it before querying cannot miss a commit that lands between the query and the wait.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._waiters: Dict[asyncio.Event, asyncio.AbstractEventLoop] = {}
+        self.version = 0
+
+    def notify(self) -> None:
+        with self._lock:
+            self.version += 1
+            waiters = list(self._waiters.items())
+        for waiter, loop in waiters:
+            loop.call_soon_threadsafe(waiter.set)
+
+    async def wait(self, seen_version: int, timeout: float) -> bool:
+        """
+        Wait until notify() is called after `seen_version` was read, or until timeout. Returns True if notified.
+        """
+        waiter = asyncio.Event()
+        with self._lock:
+            if self.version != seen_version:
+                return True
+            self._waiters[waiter] = asyncio.get_running_loop()
+        try:
+            await asyncio.wait_for(waiter.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            with self._lock:
+                self._waiters.pop(waiter, None)
+
+
+FEED_NOTIFIER = FeedNotifier()
+
+
+@event.listens_for(Session, "after_commit")
+def _notify_after_commit(session: Session) -> None:
+    if session.info.pop(_PENDING_KEY, False):
+        FEED_NOTIFIER.notify()
+
+
+@event.listens_for(Session, "after_rollback")
+def _clear_after_rollback(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
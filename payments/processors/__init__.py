@@ -0,0 +1,68 @@
+"""
+Card processor adapters.
+
+`get_processor()` returns the process-wide adapter selected by PAYMENTS_PROCESSOR
+("simulator" or "cybersource"); implementations are imported on first use.
+"""
+from __future__ import annotations
+
+from typing import Optional
+
+from payments.config import SETTINGS
+from payments.processors.base import (
+    ACCEPT,
+    DECLINE,
+    ERROR,
+    ProcessorAdapter,
+    ProcessorError,
+    ProcessorResult,
+)
+
+__all__ = [
+    "ACCEPT",
+    "DECLINE",
+    "ERROR",
+    "ProcessorAdapter",
+    "ProcessorError",
+    "ProcessorResult",
+    "get_processor",
+    "close_processor",
+]
+
+_processor: Optional[ProcessorAdapter] = None
+
+
+def get_processor() -> ProcessorAdapter:
+    global _processor
+    if _processor is None:
+        name = SETTINGS.payments_processor
+        if name == "simulator":
+            from payments.processors.simulator import SimulatorProcessor
+
+            _processor = SimulatorProcessor(
+                latency_ms=SETTINGS.simulator_latency_ms,
+                jitter_ms=SETTINGS.simulator_jitter_ms,
+                decline_rate=SETTINGS.simulator_decline_rate,
+            )
+        elif name == "cybersource":
+            from payments.processors.cybersource import CyberSourceProcessor
+
+            _processor = CyberSourceProcessor(
+                merchant_id=SETTINGS.cybersource_merchant_id,
+                key_id=SETTINGS.cybersource_key_id,
+                shared_secret=SETTINGS.cybersource_shared_secret,
+                environment=SETTINGS.cybersource_environment,
+                auth_type=SETTINGS.cybersource_auth_type,
+                timeout_seconds=SETTINGS.processor_timeout_seconds,
+                max_connections=SETTINGS.processor_max_connections,
+            )
+        else:
+            raise ProcessorError(f"Unknown PAYMENTS_PROCESSOR: {name} (expected simulator or cybersource)")
+    return _processor
+
+
+async def close_processor() -> None:
+    global _processor
+    if _processor is not None:
+        await _processor.aclose()
+        _processor = None
@@ -0,0 +1,60 @@
+# payments/processors/base.py
+# Card processor adapter interface used by POST /accounts/{id}/deposit (simulate=false).
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+
+ACCEPT = "ACCEPT"
+DECLINE = "DECLINE"
+ERROR = "ERROR"
+
+
+class ProcessorError(Exception):
+    """
+    Transport or configuration failure talking to a processor (distinct from a DECLINE decision).
+    """
+
+
+@dataclass(frozen=True)
+class ProcessorResult:
+    # ACCEPT, DECLINE or ERROR; the ledger is only credited on ACCEPT
+    decision: str
+    # Processor-side id of the authorization / capture / void
+    transaction_id: Optional[str] = None
+    status: Optional[str] = None
+    reason: Optional[str] = None
+    raw: Dict[str, Any] = field(default_factory=dict, repr=False)
+
+    @property
+    def accepted(self) -> bool:
+        return self.decision == ACCEPT
+
+
+class ProcessorAdapter:
+    """
+    Async processor adapter. Implementations keep their own pooled connections so
+    many deposits can be in flight at once without touching the database.
+    """
+
+    name = "base"
+
+    async def authorize(self, amount_cents: int, currency: str, token: str, reference: str) -> ProcessorResult:
+        raise NotImplementedError
+
+    async def capture(self, authorization_id: str, amount_cents: int, currency: str, reference: str) -> ProcessorResult:
+        raise NotImplementedError
+
+    async def void(self, transaction_id: str, reference: str) -> ProcessorResult:
+        raise NotImplementedError
+
+    async def void_capture(self, capture_id: str, reference: str) -> ProcessorResult:
+        """
+        Reverse a capture before it settles, returning the captured funds (voiding the
+        authorization does not).
+        """
+        raise NotImplementedError
+
+    async def aclose(self) -> None:
+        pass
@@ -0,0 +1,146 @@
+# payments/processors/cybersource.py
+# CyberSource (Visa) REST Payments API adapter using HTTP Signature auth over a pooled httpx.AsyncClient.
+#
+# Endpoints used:
+#   POST /pts/v2/payments                 authorize (capture=false) with a Flex transient token
+#   POST /pts/v2/payments/{id}/captures   capture an authorization
+#   POST /pts/v2/payments/{id}/voids      void a payment
+#   POST /pts/v2/captures/{id}/voids      void a capture (returns the funds before settlement)
+#
+# Only the http_signature auth type is supported; JWT credentials raise ProcessorError.
+
+from __future__ import annotations
+
+import base64
+import hashlib
+import hmac
+import json
+from email.utils import formatdate
+from typing import Any, Dict, Optional
+
+import httpx
+
+from payments.processors.base import ACCEPT, DECLINE, ERROR, ProcessorAdapter, ProcessorError, ProcessorResult
+
+HOSTS = {
+    "sandbox": "apitest.cybersource.com",
+    "production": "api.cybersource.com",
+}
+
+# CyberSource statuses that mean the step went through
+_OK_STATUSES = {"AUTHORIZED", "PENDING", "TRANSMITTED", "VOIDED", "REVERSED"}
+
+
+def _format_amount(amount_cents: int) -> str:
+    return f"{amount_cents // 100}.{amount_cents % 100:02d}"
+
+
+class CyberSourceProcessor(ProcessorAdapter):
+    name = "cybersource"
+
+    def __init__(
+        self,
+        merchant_id: Optional[str],
+        key_id: Optional[str],
+        shared_secret: Optional[str],
+        environment: str = "sandbox",
+        auth_type: str = "http_signature",
+        timeout_seconds: float = 15.0,
+        max_connections: int = 64,
+    ):
+        if auth_type != "http_signature":
+            raise ProcessorError(f"Unsupported CyberSource auth type: {auth_type} (use http_signature)")
+        if not (merchant_id and key_id and shared_secret):
+            raise ProcessorError("CyberSource merchant not configured (CYBERSOURCE_MERCHANT_ID/KEY_ID/SHARED_SECRET)")
+        self.merchant_id = merchant_id
+        self.key_id = key_id
+        self._secret = base64.b64decode(shared_secret)
+        self.host = HOSTS.get(environment, environment)
+        self._client = httpx.AsyncClient(
+            base_url=f"https://{self.host}",
+            timeout=httpx.Timeout(timeout_seconds, connect=min(timeout_seconds, 5.0)),
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+        )
+
+    def _signed_headers(self, method: str, path: str, body: bytes) -> Dict[str, str]:
+        date = formatdate(usegmt=True)
+        digest = "SHA-256=" + base64.b64encode(hashlib.sha256(body).digest()).decode()
+        signing_string = "\n".join(
+            [
+                f"host: {self.host}",
+                f"date: {date}",
+                f"request-target: {method.lower()} {path}",
+                f"digest: {digest}",
+                f"v-c-merchant-id: {self.merchant_id}",
+            ]
+        )
+        signature = base64.b64encode(hmac.new(self._secret, signing_string.encode(), hashlib.sha256).digest()).decode()
+        return {
+            "v-c-merchant-id": self.merchant_id,
+            "Date": date,
+            "Host": self.host,
+            "Digest": digest,
+            "Signature": (
+                f'keyid="{self.key_id}", algorithm="HmacSHA256", '
+                f'headers="host date request-target digest v-c-merchant-id", signature="{signature}"'
+            ),
+            "Content-Type": "application/json",
+        }
+
+    async def _post(self, path: str, payload: Dict[str, Any]) -> ProcessorResult:
+        body = json.dumps(payload, separators=(",", ":")).encode()
+        try:
+            resp = await self._client.post(path, content=body, headers=self._signed_headers("POST", path, body))
+        except httpx.HTTPError as e:
+            raise ProcessorError(f"CyberSource request failed: {e}") from e
+
+        try:
+            data = resp.json()
+        except ValueError:
+            data = {}
+        status = data.get("status")
+        reason = data.get("reason") or (data.get("errorInformation") or {}).get("reason")
+        if resp.status_code >= 500:
+            return ProcessorResult(decision=ERROR, status=status, reason=reason or resp.text, raw=data)
+        if resp.status_code < 300 and status in _OK_STATUSES:
+            return ProcessorResult(decision=ACCEPT, transaction_id=data.get("id"), status=status, raw=data)
+        return ProcessorResult(decision=DECLINE, transaction_id=data.get("id"), status=status, reason=reason, raw=data)
+
+    async def authorize(self, amount_cents: int, currency: str, token: str, reference: str) -> ProcessorResult:
+        return await self._post(
+            "/pts/v2/payments",
+            {
+                "clientReferenceInformation": {"code": reference},
+                "processingInformation": {"capture": False},
+                "orderInformation": {
+                    "amountDetails": {"totalAmount": _format_amount(amount_cents), "currency": currency}
+                },
+                "tokenInformation": {"transientTokenJwt": token},
+            },
+        )
+
+    async def capture(self, authorization_id: str, amount_cents: int, currency: str, reference: str) -> ProcessorResult:
+        return await self._post(
+            f"/pts/v2/payments/{authorization_id}/captures",
+            {
+                "clientReferenceInformation": {"code": reference},
+                "orderInformation": {
+                    "amountDetails": {"totalAmount": _format_amount(amount_cents), "currency": currency}
+                },
+            },
+        )
+
+    async def void(self, transaction_id: str, reference: str) -> ProcessorResult:
+        return await self._post(
+            f"/pts/v2/payments/{transaction_id}/voids",
+            {"clientReferenceInformation": {"code": reference}},
+        )
+
+    async def void_capture(self, capture_id: str, reference: str) -> ProcessorResult:
+        return await self._post(
+            f"/pts/v2/captures/{capture_id}/voids",
+            {"clientReferenceInformation": {"code": reference}},
+        )
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
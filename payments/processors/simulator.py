@@ -0,0 +1,50 @@
+# payments/processors/simulator.py
+# Local processor with configurable latency, for offline load tests of the card deposit path.
+#
+# Tokens:
+#   anything            -> ACCEPT
+#   "tok_decline..."    -> DECLINE on authorize
+#   "tok_error..."      -> ERROR on authorize
+# SIMULATOR_DECLINE_RATE adds random declines on top.
+
+from __future__ import annotations
+
+import asyncio
+import random
+import uuid
+
+from payments.processors.base import ACCEPT, DECLINE, ERROR, ProcessorAdapter, ProcessorResult
+
+
+class SimulatorProcessor(ProcessorAdapter):
+    name = "simulator"
+
+    def __init__(self, latency_ms: float = 200.0, jitter_ms: float = 50.0, decline_rate: float = 0.0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.decline_rate = decline_rate
+
+    async def _delay(self) -> None:
+        delay_ms = self.latency_ms + random.uniform(-self.jitter_ms, self.jitter_ms)
+        if delay_ms > 0:
+            await asyncio.sleep(delay_ms / 1000)
+
+    async def authorize(self, amount_cents: int, currency: str, token: str, reference: str) -> ProcessorResult:
+        await self._delay()
+        if token.startswith("tok_error"):
+            return ProcessorResult(decision=ERROR, status="SERVER_ERROR", reason="simulated processor error")
+        if token.startswith("tok_decline") or random.random() < self.decline_rate:
+            return ProcessorResult(decision=DECLINE, status="DECLINED", reason="simulated decline")
+        return ProcessorResult(decision=ACCEPT, transaction_id=f"sim_auth_{uuid.uuid4().hex}", status="AUTHORIZED")
+
+    async def capture(self, authorization_id: str, amount_cents: int, currency: str, reference: str) -> ProcessorResult:
+        await self._delay()
+        return ProcessorResult(decision=ACCEPT, transaction_id=f"sim_cap_{uuid.uuid4().hex}", status="PENDING")
+
+    async def void(self, transaction_id: str, reference: str) -> ProcessorResult:
+        await self._delay()
+        return ProcessorResult(decision=ACCEPT, transaction_id=f"sim_void_{uuid.uuid4().hex}", status="VOIDED")
+
+    async def void_capture(self, capture_id: str, reference: str) -> ProcessorResult:
+        await self._delay()
+        return ProcessorResult(decision=ACCEPT, transaction_id=f"sim_capvoid_{uuid.uuid4().hex}", status="VOIDED")
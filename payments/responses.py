@@ -0,0 +1,70 @@
+# payments/responses.py
+# Fast response path for list endpoints: column tuples -> plain dicts -> orjson bytes.
+#
+# Output is byte-identical to FastAPI's default JSONResponse (compact separators,
+# ensure_ascii=False) for the payloads we emit (ints, strings, None). orjson is optional;
+# without it we fall back to the same json.dumps call FastAPI uses.
+
+from __future__ import annotations
+
+import json
+from typing import Any, Dict, Iterable, List, Sequence
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        try:
+            return orjson.dumps(content)
+        except TypeError:
+            # e.g. ints beyond 64 bits; let the stdlib produce (or reject) them
+            pass
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+# Column order for transaction rows; must match the fields of schemas.Transaction
+TRANSACTION_COLUMNS = (
+    "id",
+    "account_id",
+    "type",
+    "status",
+    "amount_cents",
+    "currency",
+    "transfer_group_id",
+    "related_entry_id",
+    "created_at",
+)
+
+
+def transaction_items(rows: Iterable[Sequence[Any]]) -> List[Dict[str, Any]]:
+    """
+    Convert (id, account_id, type, status, amount_cents, currency, transfer_group_id,
+    related_entry_id, created_at) tuples into Transaction-shaped dicts.
+    created_at is naive UTC, so isoformat() + "Z" equals the old
+    replace(tzinfo=utc).isoformat().replace("+00:00", "Z").
+    """
+    return [
+        {
+            "id": r[0],
+            "accountId": r[1],
+            "type": r[2],
+            "status": r[3],
+            "amountCents": r[4],
+            "currency": r[5],
+            "transferGroupId": r[6],
+            "relatedEntryId": r[7],
+            "createdAt": r[8].isoformat() + "Z",
+        }
+        for r in rows
+    ]
@@ -2,7 +2,7 @@
 # Pydantic models for request/response payloads
 
 from __future__ import annotations
-from typing import List, Optional
+from typing import Dict, List, Optional
 from pydantic import BaseModel, Field
 
 
@@ -27,6 +27,49 @@ class AccountResponse(BaseModel):
     balanceCents: int
 
 
+class BulkAccountUser(BaseModel):
+    email: str
+    name: Optional[str] = None
+
+
+class AccountsBulkRequest(BaseModel):
+    users: List[BulkAccountUser] = Field(..., description="Users to create or update; duplicates by email are merged")
+
+
+class BulkAccountItem(BaseModel):
+    email: str
+    userId: int
+    accountId: int
+    currency: str
+    balanceCents: int
+    created: bool
+
+
+class AccountsBulkResponse(BaseModel):
+    accounts: List[BulkAccountItem]
+    createdUsers: int
+    createdAccounts: int
+
+
+class AccountIds(BaseModel):
+    userId: int
+    accountId: int
+
+
+class AccountsByEmailResponse(BaseModel):
+    accounts: Dict[str, AccountIds]
+    missing: List[str]
+
+
+class BalancesRequest(BaseModel):
+    emails: List[str] = Field(..., description="Users to look up; unknown emails are reported in missing")
+
+
+class BalancesResponse(BaseModel):
+    balances: Dict[str, int] = Field(..., description="email -> balanceCents of the service-currency account")
+    missing: List[str]
+
+
 # ---- Transfers ----
 
 class TransferRequest(BaseModel):
@@ -42,6 +85,29 @@ class TransferResponse(BaseModel):
     toBalanceCents: int
 
 
+class TransferBatchItem(TransferRequest):
+    idempotencyKey: Optional[str] = None
+
+
+class TransferBatchRequest(BaseModel):
+    transfers: List[TransferBatchItem]
+
+
+class TransferBatchResult(BaseModel):
+    # 200 on success (or idempotent replay); otherwise the status the single endpoint would return
+    status: int
+    transferGroupId: Optional[str] = None
+    fromBalanceCents: Optional[int] = None
+    toBalanceCents: Optional[int] = None
+    detail: Optional[str] = None
+    # Seconds until a 429/503 item may be retried, as the Retry-After header of the single endpoint
+    retryAfter: Optional[int] = None
+
+
+class TransferBatchResponse(BaseModel):
+    results: List[TransferBatchResult]
+
+
 # ---- Deposits ----
 
 class DepositRequest(BaseModel):
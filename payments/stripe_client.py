@@ -0,0 +1,157 @@
+# payments/stripe_client.py
+# Minimal async Stripe REST client for the payments service.
+#
+# - One pooled httpx.AsyncClient per process (keep-alive connections to the Stripe API)
+# - Per-request timeouts and a semaphore capping in-flight Stripe calls
+# - STRIPE_API_BASE can point at a local stub (see benchmarks/stripe_stub.py)
+# - httpx is imported when the first client is built, not when the service starts
+
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Any, Dict, Optional
+from urllib.parse import quote
+
+from payments.config import SETTINGS
+from payments.metrics import OUTBOUND_LATENCY
+from payments.tracing import TRACER
+
+
+class StripeError(Exception):
+    """
+    Raised for Stripe API errors and transport failures (timeouts, connection errors).
+    """
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def _form_encode(data: Dict[str, Any], prefix: str = "") -> Dict[str, str]:
+    # Stripe expects nested params as bracketed form keys, e.g. automatic_payment_methods[enabled]=true
+    out: Dict[str, str] = {}
+    for key, value in data.items():
+        name = f"{prefix}[{key}]" if prefix else key
+        if isinstance(value, dict):
+            out.update(_form_encode(value, name))
+        elif isinstance(value, bool):
+            out[name] = "true" if value else "false"
+        elif value is not None:
+            out[name] = str(value)
+    return out
+
+
+class StripeClient:
+    def __init__(
+        self,
+        secret_key: str,
+        api_base: str = "https://api.stripe.com",
+        timeout_seconds: float = 10.0,
+        max_concurrency: int = 32,
+    ):
+        import httpx
+
+        self._client = httpx.AsyncClient(
+            base_url=api_base,
+            auth=(secret_key, ""),
+            timeout=httpx.Timeout(timeout_seconds, connect=min(timeout_seconds, 5.0)),
+            limits=httpx.Limits(max_connections=max_concurrency, max_keepalive_connections=max_concurrency),
+        )
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def _request(
+        self,
+        operation: str,
+        method: str,
+        path: str,
+        data: Optional[Dict[str, Any]] = None,
+        idempotency_key: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        import httpx
+
+        headers = {"Idempotency-Key": idempotency_key} if idempotency_key else None
+        async with self._semaphore:
+            with TRACER.span(f"stripe.{operation}") as span:
+                started = time.perf_counter()
+                outcome = "error"
+                try:
+                    resp = await self._client.request(
+                        method, path, data=_form_encode(data) if data else None, headers=headers
+                    )
+                    outcome = str(resp.status_code)
+                except httpx.TimeoutException as e:
+                    outcome = "timeout"
+                    raise StripeError(f"timeout calling Stripe {path}") from e
+                except httpx.HTTPError as e:
+                    raise StripeError(f"error calling Stripe {path}: {e}") from e
+                finally:
+                    span.set_attribute("outcome", outcome)
+                    OUTBOUND_LATENCY.observe(
+                        time.perf_counter() - started, service="stripe", operation=operation, outcome=outcome
+                    )
+
+        try:
+            body = resp.json()
+        except ValueError:
+            body = {}
+        if resp.status_code >= 400:
+            message = (body.get("error") or {}).get("message") or resp.text
+            raise StripeError(message, status_code=resp.status_code)
+        return body
+
+    async def create_payment_intent(
+        self,
+        amount_cents: int,
+        currency: str,
+        idempotency_key: Optional[str] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        return await self._request(
+            "create_payment_intent",
+            "POST",
+            "/v1/payment_intents",
+            data={
+                "amount": int(amount_cents),
+                "currency": currency.lower(),
+                "automatic_payment_methods": {"enabled": True},
+                "metadata": metadata,
+            },
+            idempotency_key=idempotency_key,
+        )
+
+    async def retrieve_payment_intent(self, payment_intent_id: str) -> Dict[str, Any]:
+        # The id comes from the client; escape it so it cannot change the request path
+        return await self._request(
+            "retrieve_payment_intent", "GET", f"/v1/payment_intents/{quote(payment_intent_id, safe='')}"
+        )
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+
+_client: Optional[StripeClient] = None
+
+
+def get_stripe_client() -> StripeClient:
+    """
+    Process-wide client, created on first use (inside the running event loop).
+    """
+    global _client
+    if _client is None:
+        if not SETTINGS.stripe_secret_key:
+            raise StripeError("Stripe not configured on server")
+        _client = StripeClient(
+            secret_key=SETTINGS.stripe_secret_key,
+            api_base=SETTINGS.stripe_api_base,
+            timeout_seconds=SETTINGS.stripe_timeout_seconds,
+            max_concurrency=SETTINGS.stripe_max_concurrency,
+        )
+    return _client
+
+
+async def close_stripe_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
@@ -0,0 +1,242 @@
+# payments/tracing.py
+# Lightweight request tracing for the payments service.
+#
+# - Trace context travels in the W3C `traceparent` header (00-<trace id>-<span id>-<flags>)
+# - Root spans are sampled at TRACE_SAMPLE_RATE unless the caller already decided (sampled flag)
+# - Child spans: handler, each DB statement, BEGIN IMMEDIATE lock wait, Stripe / processor calls
+# - Finished spans are queued to a background exporter: JSON lines file or HTTP collector
+# - With tracing off or an unsampled request every span is the shared NOOP_SPAN: one
+#   ContextVar lookup and no allocation per call site
+
+from __future__ import annotations
+
+import json
+import os
+import queue
+import random
+import threading
+import time
+import urllib.request
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Tuple
+
+from payments.config import SETTINGS
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("payments_current_span", default=None)
+
+
+def _new_id(nbytes: int) -> str:
+    return f"{random.getrandbits(nbytes * 8):0{nbytes * 2}x}"
+
+
+def parse_traceparent(header: Optional[str]) -> Optional[Tuple[str, str, bool]]:
+    """
+    Returns (trace_id, parent_span_id, sampled) or None for a missing/invalid header.
+    """
+    if not header:
+        return None
+    parts = header.strip().split("-")
+    if len(parts) < 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        flags = int(parts[3][:2], 16)
+        int(parts[1], 16)
+        int(parts[2], 16)
+    except ValueError:
+        return None
+    if parts[1] == "0" * 32 or parts[2] == "0" * 16:
+        return None
+    return parts[1], parts[2], bool(flags & 1)
+
+
+class _NoopSpan:
+    recording = False
+    trace_id = None
+    span_id = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def rename(self, name: str) -> None:
+        pass
+
+    def end(self, error: Optional[BaseException] = None) -> None:
+        pass
+
+    def traceparent(self) -> Optional[str]:
+        return None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Span:
+    __slots__ = (
+        "tracer", "name", "trace_id", "span_id", "parent_id", "start", "_t0", "attributes", "error", "_token",
+    )
+    recording = True
+
+    def __init__(
+        self,
+        tracer: "Tracer",
+        name: str,
+        trace_id: str,
+        parent_id: Optional[str],
+        attributes: Dict[str, Any],
+    ):
+        self.tracer = tracer
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = _new_id(8)
+        self.parent_id = parent_id
+        self.start = time.time()
+        self._t0 = time.perf_counter()
+        self.attributes = attributes
+        self.error: Optional[str] = None
+        self._token = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def rename(self, name: str) -> None:
+        self.name = name
+
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def end(self, error: Optional[BaseException] = None) -> None:
+        if error is not None:
+            self.error = f"{type(error).__name__}: {error}"
+        self.tracer.export(
+            {
+                "service": self.tracer.service,
+                "name": self.name,
+                "traceId": self.trace_id,
+                "spanId": self.span_id,
+                "parentId": self.parent_id,
+                "start": self.start,
+                "durationMs": round((time.perf_counter() - self._t0) * 1000, 3),
+                "attributes": self.attributes,
+                "error": self.error,
+            }
+        )
+
+    def __enter__(self):
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _current_span.reset(self._token)
+        self.end(exc)
+        return False
+
+
+class _Exporter:
+    """
+    Background batching exporter. `target` is "file:<path>" or an http(s) collector URL
+    (receives a JSON array of spans per POST). Drops spans when the queue is full.
+    """
+
+    def __init__(self, target: str, max_queue: int = 10000, batch_size: int = 256, flush_interval: float = 1.0):
+        self.target = target
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self._queue: "queue.Queue[Dict[str, Any]]" = queue.Queue(maxsize=max_queue)
+        self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+        self._thread.start()
+
+    def put(self, span: Dict[str, Any]) -> None:
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def _write(self, batch: List[Dict[str, Any]]) -> None:
+        if self.target.startswith("file:"):
+            path = self.target[len("file:"):]
+            if os.path.dirname(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "a", encoding="utf-8") as f:
+                f.write("".join(json.dumps(s, default=str) + "\n" for s in batch))
+        else:
+            req = urllib.request.Request(
+                self.target,
+                data=json.dumps(batch, default=str).encode(),
+                headers={"Content-Type": "application/json"},
+                method="POST",
+            )
+            urllib.request.urlopen(req, timeout=5).close()
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                self._write(batch)
+            except Exception:
+                self.dropped += len(batch)
+
+
+class Tracer:
+    def __init__(self, service: str, sample_rate: float, export_target: Optional[str]):
+        self.service = service
+        self.sample_rate = sample_rate
+        self.enabled = sample_rate > 0 and bool(export_target)
+        self._exporter = _Exporter(export_target) if self.enabled else None
+
+    def export(self, span: Dict[str, Any]) -> None:
+        if self._exporter is not None:
+            self._exporter.put(span)
+
+    def start_request(self, name: str, traceparent: Optional[str] = None, **attributes: Any):
+        """
+        Root span for an incoming request (use as a context manager). Continues the caller's
+        trace when a valid traceparent is present and sampled; otherwise samples locally.
+        """
+        if not self.enabled:
+            return NOOP_SPAN
+        parent = parse_traceparent(traceparent)
+        if parent is not None:
+            trace_id, parent_id, sampled = parent
+        else:
+            trace_id, parent_id, sampled = _new_id(16), None, random.random() < self.sample_rate
+        if not sampled:
+            return NOOP_SPAN
+        return Span(self, name, trace_id, parent_id, attributes)
+
+    def span(self, name: str, **attributes: Any):
+        """
+        Child of the current span, or NOOP_SPAN when nothing is being traced.
+        Use as a context manager, or call .end() for leaf spans started in event hooks.
+        """
+        parent = _current_span.get()
+        if parent is None:
+            return NOOP_SPAN
+        return Span(self, name, parent.trace_id, parent.span_id, attributes)
+
+
+def current_traceparent() -> Optional[str]:
+    span = _current_span.get()
+    return span.traceparent() if span is not None else None
+
+
+TRACER = Tracer(
+    service=SETTINGS.service_name,
+    sample_rate=SETTINGS.trace_sample_rate,
+    export_target=SETTINGS.trace_export,
+)
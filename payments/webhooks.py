@@ -0,0 +1,266 @@
+# payments/webhooks.py
+# Stripe webhook ingestion: signature verification, durable queueing and batched ledger crediting.
+#
+# Flow:
+#   POST /stripe/webhook -> verify_signature -> enqueue_event (one INSERT, deduped on event id)
+#   WebhookWorker thread -> credit_batch: one BEGIN IMMEDIATE transaction per batch of pending
+#   events, de-duplicated on PaymentIntent id via the stripe_credits table.
+
+from __future__ import annotations
+
+import hashlib
+import hmac
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional, Set
+
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from payments.config import SETTINGS
+from payments.db import (
+    Account,
+    LedgerEntry,
+    StripeCredit,
+    WebhookEvent,
+    begin_immediate,
+    is_lock_error,
+    now_utc,
+    session_scope,
+)
+from payments.outbox import DEPOSIT_POSTED, record_event
+
+logger = logging.getLogger(__name__)
+
+SUCCEEDED_EVENT = "payment_intent.succeeded"
+
+
+class WebhookSignatureError(Exception):
+    pass
+
+
+def verify_signature(
+    payload: bytes,
+    header: Optional[str],
+    secret: str,
+    tolerance_seconds: int = 300,
+    now: Optional[float] = None,
+) -> None:
+    """
+    Verify a Stripe-Signature header (t=<ts>,v1=<hex hmac-sha256 of "<ts>.<payload>">).
+    Raises WebhookSignatureError on a missing/invalid signature or a stale timestamp.
+    """
+    if not header:
+        raise WebhookSignatureError("Missing Stripe-Signature header")
+
+    timestamp: Optional[int] = None
+    signatures: List[str] = []
+    for part in header.split(","):
+        key, _, value = part.strip().partition("=")
+        if key == "t":
+            try:
+                timestamp = int(value)
+            except ValueError:
+                raise WebhookSignatureError("Invalid timestamp in Stripe-Signature header")
+        elif key == "v1":
+            signatures.append(value)
+    if timestamp is None or not signatures:
+        raise WebhookSignatureError("Malformed Stripe-Signature header")
+
+    signed = str(timestamp).encode() + b"." + payload
+    expected = hmac.new(secret.encode(), signed, hashlib.sha256).hexdigest()
+    if not any(hmac.compare_digest(expected, s) for s in signatures):
+        raise WebhookSignatureError("No matching signature")
+
+    now = time.time() if now is None else now
+    if tolerance_seconds and abs(now - timestamp) > tolerance_seconds:
+        raise WebhookSignatureError("Timestamp outside tolerance")
+
+
+def enqueue_event(db: Session, event: Dict[str, Any]) -> bool:
+    """
+    Persist a payment_intent.succeeded event as a pending WebhookEvent.
+    Returns False if the event id was already queued (Stripe redelivery).
+    """
+    pi = (event.get("data") or {}).get("object") or {}
+    account_ref = (pi.get("metadata") or {}).get("account_id")
+    try:
+        account_id = int(account_ref) if account_ref is not None else None
+    except (TypeError, ValueError):
+        account_id = None
+
+    row = WebhookEvent(
+        event_id=str(event.get("id")),
+        type=str(event.get("type")),
+        payment_intent_id=pi.get("id"),
+        account_id=account_id,
+        amount_cents=pi.get("amount_received"),
+        currency=(pi.get("currency") or "").upper() or None,
+        status="pending",
+        received_at=now_utc(),
+    )
+    db.add(row)
+    try:
+        db.flush()
+    except IntegrityError:
+        db.rollback()
+        return False
+    return True
+
+
+def credit_batch(db: Session, limit: int) -> int:
+    """
+    Credit up to `limit` pending events in a single write transaction.
+    Events for an already-credited PaymentIntent are marked processed without a new posting.
+    Returns the number of events consumed.
+    """
+    begin_immediate(db)
+
+    events = (
+        db.execute(
+            select(WebhookEvent)
+            .where(WebhookEvent.status == "pending")
+            .order_by(WebhookEvent.id)
+            .limit(limit)
+        )
+        .scalars()
+        .all()
+    )
+    if not events:
+        db.commit()
+        return 0
+
+    pi_ids = {e.payment_intent_id for e in events if e.payment_intent_id}
+    credited: Set[str] = set(
+        db.execute(
+            select(StripeCredit.payment_intent_id).where(StripeCredit.payment_intent_id.in_(pi_ids))
+        ).scalars()
+    ) if pi_ids else set()
+    account_ids = {e.account_id for e in events if e.account_id is not None}
+    accounts = {
+        a.id: a for a in db.execute(select(Account).where(Account.id.in_(account_ids))).scalars()
+    } if account_ids else {}
+
+    now = now_utc()
+    postings = []
+    for ev in events:
+        ev.processed_at = now
+        account = accounts.get(ev.account_id) if ev.account_id is not None else None
+        if not ev.payment_intent_id:
+            ev.status, ev.error = "failed", "missing payment_intent id"
+        elif ev.payment_intent_id in credited:
+            ev.status = "processed"
+        elif account is None:
+            ev.status, ev.error = "failed", f"account {ev.account_id} not found"
+        elif ev.currency != account.currency or not ev.amount_cents or ev.amount_cents <= 0:
+            ev.status, ev.error = "failed", f"invalid amount/currency {ev.amount_cents} {ev.currency}"
+        else:
+            entry = LedgerEntry(
+                account_id=account.id,
+                type="deposit",
+                status="posted",
+                amount_cents=ev.amount_cents,
+                currency=account.currency,
+                created_at=now,
+            )
+            account.balance_cents = account.balance_cents + ev.amount_cents
+            postings.append((ev.payment_intent_id, entry, account.balance_cents))
+            credited.add(ev.payment_intent_id)
+            ev.status = "processed"
+
+    if postings:
+        db.add_all([entry for _, entry, _ in postings])
+        db.flush()  # assign ledger ids
+        db.add_all(
+            [StripeCredit(payment_intent_id=pi_id, ledger_entry_id=entry.id, created_at=now) for pi_id, entry, _ in postings]
+        )
+        for _, entry, balance in postings:
+            record_event(
+                db,
+                DEPOSIT_POSTED,
+                {
+                    "accountId": entry.account_id,
+                    "transactionId": entry.id,
+                    "amountCents": entry.amount_cents,
+                    "currency": entry.currency,
+                    "balanceCents": balance,
+                    "source": "stripe_webhook",
+                },
+                account_id=entry.account_id,
+            )
+
+    db.commit()
+    return len(events)
+
+
+class WebhookWorker:
+    """
+    Background thread draining the webhook queue.
+    notify() wakes it immediately; it then waits batch_window_ms so a burst lands in a few batches.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = 500,
+        batch_window_ms: int = 50,
+        poll_interval_seconds: float = 1.0,
+    ):
+        self.batch_size = batch_size
+        self.batch_window_ms = batch_window_ms
+        self.poll_interval_seconds = poll_interval_seconds
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="webhook-worker", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def notify(self) -> None:
+        self._wake.set()
+
+    def drain(self) -> int:
+        """
+        Process batches until the queue is empty; returns the number of events consumed.
+        """
+        total = 0
+        while True:
+            with session_scope() as db:
+                n = credit_batch(db, self.batch_size)
+            total += n
+            if n < self.batch_size:
+                return total
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            woken = self._wake.wait(self.poll_interval_seconds)
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+            if woken and self.batch_window_ms:
+                time.sleep(self.batch_window_ms / 1000)
+            try:
+                self.drain()
+            except Exception as e:  # keep the worker alive; pending events are retried next tick
+                if is_lock_error(e):
+                    logger.debug("webhook batch hit a lock; retrying next tick")
+                else:
+                    logger.exception("webhook batch failed")
+
+
+WEBHOOK_WORKER = WebhookWorker(
+    batch_size=SETTINGS.webhook_batch_size,
+    batch_window_ms=SETTINGS.webhook_batch_window_ms,
+    poll_interval_seconds=SETTINGS.webhook_poll_interval_seconds,
+)
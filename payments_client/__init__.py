@@ -0,0 +1,30 @@
+"""
+Python client for the payments service (payments/main.py).
+
+`PaymentsClient` (threads) and `AsyncPaymentsClient` (asyncio) share one API: pooled keep-alive
+connections, automatic Idempotency-Keys, jittered retries on 429/5xx/transport errors, and
+coalescing of concurrent transfer() calls into POST /transfers/batch. Requires httpx.
+"""
+from __future__ import annotations
+
+from payments_client._common import RetryPolicy, new_idempotency_key, transfer_item
+from payments_client.async_client import AsyncPaymentsClient
+from payments_client.client import PaymentsClient
+from payments_client.errors import (
+    InsufficientFundsError,
+    NotFoundError,
+    PaymentsError,
+    RateLimitedError,
+)
+
+__all__ = [
+    "AsyncPaymentsClient",
+    "InsufficientFundsError",
+    "NotFoundError",
+    "PaymentsClient",
+    "PaymentsError",
+    "RateLimitedError",
+    "RetryPolicy",
+    "new_idempotency_key",
+    "transfer_item",
+]
@@ -0,0 +1,298 @@
+# payments_client/_common.py
+# Pieces shared by the sync and async clients: retry policy, request building, response parsing,
+# and every endpoint as a sans-IO call (ClientCore). The clients only send requests and sleep.
+
+from __future__ import annotations
+
+import json
+import random
+import uuid
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Generator, Iterable, List, Optional, Tuple, Union
+
+import httpx
+
+from payments_client.errors import PaymentsError, error_for
+
+DEFAULT_BASE_URL = "http://127.0.0.1:8001"
+
+# Statuses worth retrying: load shedding (429/503), lock errors that outlived the server's own
+# retries (500) and proxy/transport hiccups (502/504). Writes always carry an Idempotency-Key,
+# so a retry after an ambiguous failure never posts twice.
+RETRYABLE_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+# Header-injection hook, e.g. backend tracing's inject_headers(headers) to forward `traceparent`
+InjectHeaders = Callable[[Dict[str, str]], Any]
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    attempts: int = 4
+    base_delay: float = 0.05
+    max_delay: float = 2.0
+
+    def delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        # Full jitter; never sooner than the server's Retry-After
+        backoff = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+        return max(backoff, retry_after or 0.0)
+
+
+def new_idempotency_key() -> str:
+    return uuid.uuid4().hex
+
+
+def build_headers(
+    idempotency_key: Optional[str], inject: Optional[InjectHeaders], extra: Optional[Dict[str, str]] = None
+) -> Dict[str, str]:
+    headers: Dict[str, str] = dict(extra or {})
+    if idempotency_key:
+        headers["Idempotency-Key"] = idempotency_key
+    if inject is not None:
+        inject(headers)
+    return headers
+
+
+def retry_after_seconds(value: Optional[str]) -> Optional[float]:
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
+
+
+def parse_response(status_code: int, headers: Any, body: bytes, json_loads: Callable[[bytes], Any]) -> Any:
+    if 200 <= status_code < 300:
+        return json_loads(body) if body else None
+    detail: Optional[str] = None
+    try:
+        data = json_loads(body)
+        detail = data.get("detail") if isinstance(data, dict) else None
+        if detail is not None and not isinstance(detail, str):
+            detail = str(detail)
+    except ValueError:
+        detail = body.decode("utf-8", "replace")[:500] or None
+    raise error_for(status_code, detail, retry_after_seconds(headers.get("Retry-After")))
+
+
+def transfer_item(
+    from_account_id: int, to_account_id: int, amount_cents: int, currency: str, idempotency_key: Optional[str]
+) -> Dict[str, Any]:
+    return {
+        "fromAccountId": from_account_id,
+        "toAccountId": to_account_id,
+        "amountCents": amount_cents,
+        "currency": currency,
+        "idempotencyKey": idempotency_key or new_idempotency_key(),
+    }
+
+
+def transfer_result(result: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    One /transfers/batch result -> the single-transfer response shape, or the matching exception.
+    """
+    status = result.get("status", 500)
+    if status != 200:
+        raise error_for(status, result.get("detail"), result.get("retryAfter"))
+    return {
+        "transferGroupId": result["transferGroupId"],
+        "fromBalanceCents": result["fromBalanceCents"],
+        "toBalanceCents": result["toBalanceCents"],
+    }
+
+
+def chunks(items: List[Any], size: int) -> List[List[Any]]:
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def batch_limit(config: Optional[Dict[str, Any]], configured: int) -> int:
+    """
+    Server-advertised batch size (GET /config features), capped by the client's max_batch; 0 = unsupported.
+    """
+    features = (config or {}).get("features") or {}
+    if not features.get("transferBatch"):
+        return 0
+    return max(1, min(configured, int(features.get("maxTransferBatch") or configured)))
+
+
+
+@dataclass(frozen=True)
+class Request:
+    method: str
+    path: str
+    headers: Dict[str, str]
+    params: Any = None
+    body: Any = None
+    timeout: Optional[float] = None
+
+    def options(self) -> Dict[str, Any]:
+        # Keyword arguments for httpx.Client.request / httpx.AsyncClient.request
+        options = {"params": self.params, "json": self.body, "headers": self.headers}
+        if self.timeout is not None:
+            options["timeout"] = self.timeout
+        return options
+
+
+# One client call without I/O: a generator that yields a Request (answered with the httpx.Response,
+# or with the httpx.TransportError thrown in) or a backoff delay in seconds (answered with None
+# after sleeping), and returns the call's result.
+Call = Generator[Union[Request, float], Any, Any]
+
+
+class ClientCore:
+    """
+    Endpoints shared by PaymentsClient and AsyncPaymentsClient as sans-IO calls. Subclasses set
+    _http and drive the calls with _run; the public methods are one-line wrappers.
+    """
+
+    _http: Any
+
+    def __init__(
+        self,
+        retry: RetryPolicy,
+        coalesce_transfers: bool,
+        max_batch: int,
+        inject_headers: Optional[InjectHeaders],
+    ):
+        self.retry = retry
+        self.coalesce_transfers = coalesce_transfers
+        self.max_batch = max_batch
+        self._inject = inject_headers
+        self._batch_size: Optional[int] = None
+
+    def _call(
+        self,
+        method: str,
+        path: str,
+        *,
+        params: Any = None,
+        body: Any = None,
+        idempotency_key: Optional[str] = None,
+        timeout: Optional[float] = None,
+    ) -> Call:
+        for attempt in range(max(1, self.retry.attempts)):
+            last = attempt + 1 >= self.retry.attempts
+            headers = build_headers(idempotency_key, self._inject)
+            try:
+                resp = yield Request(method, path, headers, params, body, timeout)
+            except httpx.TransportError as e:
+                if last:
+                    raise PaymentsError(f"{method} {path} failed: {type(e).__name__}: {e}") from e
+                yield self.retry.delay(attempt)
+                continue
+            if resp.status_code in RETRYABLE_STATUSES and not last:
+                retry_after = retry_after_seconds(resp.headers.get("Retry-After"))
+                # A long server-requested pause is surfaced to the caller instead of blocking
+                if retry_after is None or retry_after <= self.retry.max_delay:
+                    yield self.retry.delay(attempt, retry_after)
+                    continue
+            return parse_response(resp.status_code, resp.headers, resp.content, json.loads)
+        raise AssertionError("unreachable")
+
+    # ---- service ----
+
+    def _health(self) -> Call:
+        return self._call("GET", "/health")
+
+    def _config(self) -> Call:
+        return self._call("GET", "/config")
+
+    # ---- accounts ----
+
+    def _create_account(self, email: str, name: Optional[str]) -> Call:
+        # Create-or-reuse by email on the server, so safe to retry without a key
+        return self._call("POST", "/accounts", body={"email": email, "name": name})
+
+    def _create_accounts(self, users: Iterable[Dict[str, Any]]) -> Call:
+        out: List[Dict[str, Any]] = []
+        for chunk in chunks(list(users), 5000):
+            out.extend((yield from self._call("POST", "/accounts/bulk", body={"users": chunk}))["accounts"])
+        return out
+
+    def _accounts_by_email(self, emails: Iterable[str]) -> Call:
+        found: Dict[str, Dict[str, int]] = {}
+        for chunk in chunks(list(dict.fromkeys(emails)), 500):
+            resp = yield from self._call("GET", "/accounts/by-email", params=[("email", e) for e in chunk])
+            found.update(resp["accounts"])
+        return found
+
+    def _balances(self, emails: Iterable[str]) -> Call:
+        found: Dict[str, int] = {}
+        for chunk in chunks(list(dict.fromkeys(emails)), 50_000):
+            found.update((yield from self._call("POST", "/accounts/balances", body={"emails": chunk}))["balances"])
+        return found
+
+    def _get_account(self, account_id: int) -> Call:
+        return self._call("GET", f"/accounts/{account_id}")
+
+    def _transactions(self, account_id: int, limit: int) -> Call:
+        resp = yield from self._call("GET", "/transactions", params={"accountId": account_id, "limit": limit})
+        return resp["items"]
+
+    # ---- money movement ----
+
+    def _deposit(
+        self, account_id: int, amount_cents: int, currency: str, flex_token: Optional[str], idempotency_key: Optional[str]
+    ) -> Call:
+        body = {"amountCents": amount_cents, "currency": currency, "simulate": flex_token is None, "flexToken": flex_token}
+        return self._call(
+            "POST", f"/accounts/{account_id}/deposit", body=body,
+            idempotency_key=idempotency_key or new_idempotency_key(),
+        )
+
+    def _transfer(self, item: Dict[str, Any]) -> Call:
+        body = {k: v for k, v in item.items() if k != "idempotencyKey"}
+        return self._call("POST", "/transfers", body=body, idempotency_key=item["idempotencyKey"])
+
+    def _transfer_batch(self, items: List[Dict[str, Any]], size: int) -> Call:
+        # size is the discovered batch limit; 0 falls back to one POST /transfers per item
+        items = [dict(i, idempotencyKey=i.get("idempotencyKey") or new_idempotency_key()) for i in items]
+        results: List[Dict[str, Any]] = []
+        if not size:
+            for item in items:
+                try:
+                    resp = yield from self._transfer(item)
+                    results.append(dict(resp, status=200))
+                except PaymentsError as e:
+                    if e.status_code is None or e.status_code >= 500:
+                        raise
+                    results.append({"status": e.status_code, "detail": e.detail})
+            return results
+        for chunk in chunks(items, size):
+            results.extend((yield from self._call("POST", "/transfers/batch", body={"transfers": chunk}))["results"])
+        return results
+
+    # ---- change feed ----
+
+    def _events(self, after: int, limit: int, wait: float) -> Call:
+        return self._call(
+            "GET", "/events", params={"after": after, "limit": limit, "timeout": wait},
+            timeout=wait + self._http.timeout.read if self._http.timeout.read else None,
+        )
+
+
+class TransferQueue:
+    """
+    Pending transfer() items for a batcher, each with the Future (concurrent or asyncio) of its caller.
+    """
+
+    def __init__(self) -> None:
+        self._pending: List[Tuple[Dict[str, Any], Any]] = []
+
+    def _next_batch(self, max_batch: int) -> List[Tuple[Dict[str, Any], Any]]:
+        batch, self._pending = self._pending[:max_batch], self._pending[max_batch:]
+        return batch
+
+    @staticmethod
+    def _deliver(batch: List[Tuple[Dict[str, Any], Any]], results: List[Dict[str, Any]]) -> None:
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            try:
+                future.set_result(transfer_result(result))
+            except PaymentsError as e:
+                future.set_exception(e)
+
+    @staticmethod
+    def _fail(batch: List[Tuple[Dict[str, Any], Any]], error: BaseException) -> None:
+        for _, future in batch:
+            if not future.done():
+                future.set_exception(error)
@@ -0,0 +1,191 @@
+# payments_client/async_client.py
+# asyncio client for the payments service; same API as PaymentsClient with awaitable methods.
+#
+#   async with AsyncPaymentsClient("http://127.0.0.1:8001") as payments:
+#       results = await asyncio.gather(*(payments.transfer(a, b, 100) for a, b in pairs))
+#
+# transfer() calls made concurrently on one event loop are coalesced into POST /transfers/batch:
+# the first call is sent on the next loop iteration together with everything queued by then, and
+# calls arriving while a batch is in flight go out in the next one.
+
+from __future__ import annotations
+
+import asyncio
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional
+
+import httpx
+
+from payments_client._common import (
+    DEFAULT_BASE_URL,
+    Call,
+    ClientCore,
+    InjectHeaders,
+    Request,
+    RetryPolicy,
+    TransferQueue,
+    batch_limit,
+    transfer_item,
+)
+from payments_client.errors import PaymentsError
+
+
+class _AsyncTransferBatcher(TransferQueue):
+    def __init__(self, client: "AsyncPaymentsClient"):
+        super().__init__()
+        self._client = client
+        # Strong reference: the event loop only keeps weak ones to running tasks
+        self._drain_task: Optional["asyncio.Task[None]"] = None
+
+    async def submit(self, item: Dict[str, Any], max_batch: int) -> Dict[str, Any]:
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((item, future))
+        if self._drain_task is None or self._drain_task.done():
+            self._drain_task = asyncio.ensure_future(self._drain(max_batch))
+        return await future
+
+    async def wait_idle(self) -> None:
+        # Let an in-flight drain finish (its callers may have been cancelled) without raising its errors
+        if self._drain_task is not None:
+            await asyncio.wait({self._drain_task})
+
+    async def _drain(self, max_batch: int) -> None:
+        while self._pending:
+            batch = self._next_batch(max_batch)
+            try:
+                results = await self._client.transfer_batch([item for item, _ in batch])
+            except BaseException as e:  # noqa: BLE001 - hand every failure to the waiting callers
+                self._fail(batch, e)
+                if isinstance(e, asyncio.CancelledError):
+                    raise
+                continue
+            self._deliver(batch, results)
+
+
+class AsyncPaymentsClient(ClientCore):
+    def __init__(
+        self,
+        base_url: str = DEFAULT_BASE_URL,
+        timeout: float = 10.0,
+        max_connections: int = 100,
+        retry: RetryPolicy = RetryPolicy(),
+        coalesce_transfers: bool = True,
+        max_batch: int = 100,
+        inject_headers: Optional[InjectHeaders] = None,
+    ):
+        super().__init__(retry, coalesce_transfers, max_batch, inject_headers)
+        self._http = httpx.AsyncClient(
+            base_url=base_url,
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+        )
+        self._discovery_lock = asyncio.Lock()
+        self._batcher = _AsyncTransferBatcher(self)
+
+    async def aclose(self) -> None:
+        await self._batcher.wait_idle()
+        await self._http.aclose()
+
+    async def __aenter__(self) -> "AsyncPaymentsClient":
+        return self
+
+    async def __aexit__(self, *exc: Any) -> None:
+        await self.aclose()
+
+    # ---- transport ----
+
+    async def _run(self, call: Call) -> Any:
+        reply: Any = None
+        error: Optional[BaseException] = None
+        while True:
+            try:
+                action = call.throw(error) if error is not None else call.send(reply)
+            except StopIteration as stop:
+                return stop.value
+            reply, error = None, None
+            if isinstance(action, Request):
+                try:
+                    reply = await self._http.request(action.method, action.path, **action.options())
+                except httpx.TransportError as e:
+                    error = e
+            else:
+                await asyncio.sleep(action)
+
+    # ---- service ----
+
+    async def health(self) -> Dict[str, Any]:
+        return await self._run(self._health())
+
+    async def config(self) -> Dict[str, Any]:
+        return await self._run(self._config())
+
+    # ---- accounts ----
+
+    async def create_account(self, email: str, name: Optional[str] = None) -> Dict[str, Any]:
+        return await self._run(self._create_account(email, name))
+
+    async def create_accounts(self, users: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return await self._run(self._create_accounts(users))
+
+    async def accounts_by_email(self, emails: Iterable[str]) -> Dict[str, Dict[str, int]]:
+        return await self._run(self._accounts_by_email(emails))
+
+    async def balances(self, emails: Iterable[str]) -> Dict[str, int]:
+        return await self._run(self._balances(emails))
+
+    async def get_account(self, account_id: int) -> Dict[str, Any]:
+        return await self._run(self._get_account(account_id))
+
+    async def transactions(self, account_id: int, limit: int = 20) -> List[Dict[str, Any]]:
+        return await self._run(self._transactions(account_id, limit))
+
+    # ---- money movement ----
+
+    async def deposit(
+        self,
+        account_id: int,
+        amount_cents: int,
+        currency: str = "USD",
+        flex_token: Optional[str] = None,
+        idempotency_key: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        return await self._run(self._deposit(account_id, amount_cents, currency, flex_token, idempotency_key))
+
+    async def _transfer_batch_size(self) -> int:
+        # Single-flight: a burst of first transfers shares one GET /config
+        if self._batch_size is None:
+            async with self._discovery_lock:
+                if self._batch_size is None:
+                    try:
+                        self._batch_size = batch_limit(await self.config(), self.max_batch)
+                    except PaymentsError:
+                        return 0
+        return self._batch_size
+
+    async def transfer(
+        self,
+        from_account_id: int,
+        to_account_id: int,
+        amount_cents: int,
+        currency: str = "USD",
+        idempotency_key: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        item = transfer_item(from_account_id, to_account_id, amount_cents, currency, idempotency_key)
+        size = await self._transfer_batch_size() if self.coalesce_transfers else 0
+        if size:
+            return await self._batcher.submit(item, size)
+        return await self._run(self._transfer(item))
+
+    async def transfer_batch(self, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return await self._run(self._transfer_batch(items, await self._transfer_batch_size()))
+
+    # ---- change feed ----
+
+    async def events(self, after: int = 0, limit: int = 100, wait: float = 25.0) -> Dict[str, Any]:
+        return await self._run(self._events(after, limit, wait))
+
+    async def tail_events(self, after: int = 0, limit: int = 100, wait: float = 25.0) -> AsyncIterator[Dict[str, Any]]:
+        while True:
+            batch = await self.events(after, limit, wait)
+            for event in batch["events"]:
+                yield event
+            after = batch["next"]
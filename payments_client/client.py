@@ -0,0 +1,228 @@
+# payments_client/client.py
+# Synchronous client for the payments service (threads, scripts, Flask handlers).
+#
+#   from payments_client import PaymentsClient
+#   with PaymentsClient("http://127.0.0.1:8001") as payments:
+#       acct = payments.create_account("alice@email.com")
+#       payments.deposit(acct["accountId"], 5_000)
+#       payments.transfer(acct["accountId"], other_id, 1_250)
+#
+# - One keep-alive connection pool per client; share the client between threads
+# - Every write gets an Idempotency-Key (generated unless given) that is reused across retries
+# - Retries with full-jitter backoff on transport errors, 429/5xx, honoring Retry-After
+# - Concurrent transfer() calls from several threads are coalesced into POST /transfers/batch
+#   when the server advertises it in GET /config; a lone caller is sent immediately
+
+from __future__ import annotations
+
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+import httpx
+
+from payments_client._common import (
+    DEFAULT_BASE_URL,
+    Call,
+    ClientCore,
+    InjectHeaders,
+    Request,
+    RetryPolicy,
+    TransferQueue,
+    batch_limit,
+    transfer_item,
+)
+from payments_client.errors import PaymentsError
+
+
+class _TransferBatcher(TransferQueue):
+    """
+    Group commit for transfers: the first caller to find no batch in flight becomes the leader and
+    sends everything queued, in batches, until the queue is empty; other callers wait on their Future.
+    """
+
+    def __init__(self, client: "PaymentsClient"):
+        super().__init__()
+        self._client = client
+        self._lock = threading.Lock()
+        self._leader_active = False
+
+    def submit(self, item: Dict[str, Any], max_batch: int) -> Dict[str, Any]:
+        future: Future = Future()
+        with self._lock:
+            self._pending.append((item, future))
+            lead = not self._leader_active
+            self._leader_active = True
+        if lead:
+            self._drain(max_batch)
+        return future.result()
+
+    def _drain(self, max_batch: int) -> None:
+        while True:
+            with self._lock:
+                if not self._pending:
+                    self._leader_active = False
+                    return
+                batch = self._next_batch(max_batch)
+            try:
+                results = self._client.transfer_batch([item for item, _ in batch])
+            except BaseException as e:  # noqa: BLE001 - hand every failure to the waiting callers
+                self._fail(batch, e)
+                continue
+            self._deliver(batch, results)
+
+
+class PaymentsClient(ClientCore):
+    def __init__(
+        self,
+        base_url: str = DEFAULT_BASE_URL,
+        timeout: float = 10.0,
+        max_connections: int = 20,
+        retry: RetryPolicy = RetryPolicy(),
+        coalesce_transfers: bool = True,
+        max_batch: int = 100,
+        inject_headers: Optional[InjectHeaders] = None,
+    ):
+        super().__init__(retry, coalesce_transfers, max_batch, inject_headers)
+        self._http = httpx.Client(
+            base_url=base_url,
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+        )
+        self._discovery_lock = threading.Lock()
+        self._batcher = _TransferBatcher(self)
+
+    def close(self) -> None:
+        self._http.close()
+
+    def __enter__(self) -> "PaymentsClient":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    # ---- transport ----
+
+    def _run(self, call: Call) -> Any:
+        reply: Any = None
+        error: Optional[BaseException] = None
+        while True:
+            try:
+                action = call.throw(error) if error is not None else call.send(reply)
+            except StopIteration as stop:
+                return stop.value
+            reply, error = None, None
+            if isinstance(action, Request):
+                try:
+                    reply = self._http.request(action.method, action.path, **action.options())
+                except httpx.TransportError as e:
+                    error = e
+            else:
+                time.sleep(action)
+
+    # ---- service ----
+
+    def health(self) -> Dict[str, Any]:
+        return self._run(self._health())
+
+    def config(self) -> Dict[str, Any]:
+        return self._run(self._config())
+
+    # ---- accounts ----
+
+    def create_account(self, email: str, name: Optional[str] = None) -> Dict[str, Any]:
+        return self._run(self._create_account(email, name))
+
+    def create_accounts(self, users: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Bulk upsert of {"email", "name"} dicts via POST /accounts/bulk, chunked to the server limit.
+        """
+        return self._run(self._create_accounts(users))
+
+    def accounts_by_email(self, emails: Iterable[str]) -> Dict[str, Dict[str, int]]:
+        """
+        email -> {"userId", "accountId"} for known emails; unknown emails are left out.
+        """
+        return self._run(self._accounts_by_email(emails))
+
+    def balances(self, emails: Iterable[str]) -> Dict[str, int]:
+        """
+        email -> balanceCents via POST /accounts/balances; unknown emails are left out.
+        """
+        return self._run(self._balances(emails))
+
+    def get_account(self, account_id: int) -> Dict[str, Any]:
+        return self._run(self._get_account(account_id))
+
+    def transactions(self, account_id: int, limit: int = 20) -> List[Dict[str, Any]]:
+        return self._run(self._transactions(account_id, limit))
+
+    # ---- money movement ----
+
+    def deposit(
+        self,
+        account_id: int,
+        amount_cents: int,
+        currency: str = "USD",
+        flex_token: Optional[str] = None,
+        idempotency_key: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Simulated deposit, or a card deposit when flex_token is given.
+        """
+        return self._run(self._deposit(account_id, amount_cents, currency, flex_token, idempotency_key))
+
+    def _transfer_batch_size(self) -> int:
+        # Single-flight: a burst of first transfers shares one GET /config
+        if self._batch_size is None:
+            with self._discovery_lock:
+                if self._batch_size is None:
+                    try:
+                        self._batch_size = batch_limit(self.config(), self.max_batch)
+                    except PaymentsError:
+                        return 0
+        return self._batch_size
+
+    def transfer(
+        self,
+        from_account_id: int,
+        to_account_id: int,
+        amount_cents: int,
+        currency: str = "USD",
+        idempotency_key: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Returns {"transferGroupId", "fromBalanceCents", "toBalanceCents"}; raises InsufficientFundsError,
+        NotFoundError or PaymentsError.
+        """
+        item = transfer_item(from_account_id, to_account_id, amount_cents, currency, idempotency_key)
+        size = self._transfer_batch_size() if self.coalesce_transfers else 0
+        if size:
+            return self._batcher.submit(item, size)
+        return self._run(self._transfer(item))
+
+    def transfer_batch(self, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Send prepared transfer items (see transfer_item) in POST /transfers/batch calls. Returns the
+        per-item results ({"status": 200, ...} or {"status": 4xx, "detail": ...}) in order.
+        Falls back to one POST /transfers per item when the server has no batch endpoint.
+        """
+        return self._run(self._transfer_batch(items, self._transfer_batch_size()))
+
+    # ---- change feed ----
+
+    def events(self, after: int = 0, limit: int = 100, wait: float = 25.0) -> Dict[str, Any]:
+        """
+        One long-poll of GET /events: {"events": [...], "next": cursor}.
+        """
+        return self._run(self._events(after, limit, wait))
+
+    def tail_events(self, after: int = 0, limit: int = 100, wait: float = 25.0) -> Iterator[Dict[str, Any]]:
+        """
+        Yield ledger events forever, starting after `after`; persist event["id"] to resume later.
+        """
+        while True:
+            batch = self.events(after, limit, wait)
+            yield from batch["events"]
+            after = batch["next"]
@@ -0,0 +1,50 @@
+# payments_client/errors.py
+# Exceptions raised by PaymentsClient / AsyncPaymentsClient.
+
+from __future__ import annotations
+
+from typing import Optional
+
+
+class PaymentsError(Exception):
+    """
+    Any failed call. status_code is None for transport failures (connection refused, timeout).
+    """
+
+    def __init__(self, message: str, status_code: Optional[int] = None, detail: Optional[str] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.detail = detail
+
+
+class InsufficientFundsError(PaymentsError):
+    """
+    402: the paying account's balance is too low (or a card payment was declined).
+    """
+
+
+class NotFoundError(PaymentsError):
+    """
+    404: unknown account.
+    """
+
+
+class RateLimitedError(PaymentsError):
+    """
+    429/503 after all retries; retry_after is the server's last Retry-After hint in seconds.
+    """
+
+    def __init__(self, message: str, status_code: int, detail: Optional[str], retry_after: Optional[float]):
+        super().__init__(message, status_code, detail)
+        self.retry_after = retry_after
+
+
+def error_for(status_code: int, detail: Optional[str], retry_after: Optional[float] = None) -> PaymentsError:
+    message = f"{status_code}: {detail or 'Request failed'}"
+    if status_code == 402:
+        return InsufficientFundsError(message, status_code, detail)
+    if status_code == 404:
+        return NotFoundError(message, status_code, detail)
+    if status_code in (429, 503):
+        return RateLimitedError(message, status_code, detail, retry_after)
+    return PaymentsError(message, status_code, detail)
@@ -190,7 +190,7 @@ export default function WalletDemo() {
       }
       // Create PI on server
       const key = makeIdempotencyKey();
-      const { clientSecret, paymentIntentId } = await stripeCreatePaymentIntent(amountCents, key);
+      const { clientSecret, paymentIntentId } = await stripeCreatePaymentIntent(amountCents, key, account?.accountId);
       if (!clientSecret) {
         throw new Error("Server did not return clientSecret");
       }
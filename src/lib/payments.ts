@@ -145,7 +145,8 @@ export interface CreatePIResponse {
 
 export async function stripeCreatePaymentIntent(
   amountCents: number,
-  idempotencyKey: string
+  idempotencyKey: string,
+  accountId?: number // lets the payment_intent.succeeded webhook credit this account
 ): Promise<CreatePIResponse> {
   return http<CreatePIResponse>(`${BASE}/stripe/create-payment-intent`, {
     method: "POST",
@@ -156,6 +157,7 @@ export async function stripeCreatePaymentIntent(
     body: JSON.stringify({
       amountCents,
       currency: "USD",
+      accountId,
     }),
   });
 }
@@ -0,0 +1,40 @@
+import re
+
+import metrics
+
+
+def sample(text, name, **labels):
+    for line in text.splitlines():
+        match = re.match(r"^(\w+)(?:\{(.*)\})? (\S+)$", line)
+        if not match or match.group(1) != name:
+            continue
+        found = dict(re.findall(r'(\w+)="((?:[^"\\]|\\.)*)"', match.group(2) or ""))
+        if all(found.get(k) == str(v) for k, v in labels.items()):
+            return float(match.group(3))
+    return None
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = metrics.Histogram("test_seconds", "Test", ("route",), buckets=(0.01, 0.1))
+    for value in (0.005, 0.05, 1.0):
+        histogram.observe(value, route="/x")
+    text = "\n".join(histogram.render())
+    assert sample(text, "test_seconds_bucket", route="/x", le="0.01") == 1
+    assert sample(text, "test_seconds_bucket", route="/x", le="0.1") == 2
+    assert sample(text, "test_seconds_bucket", route="/x", le="+Inf") == 3
+    assert sample(text, "test_seconds_count", route="/x") == 3
+
+
+def test_requests_are_recorded_by_route_template(bets_api, create_bet):
+    bet = create_bet()
+    bets_api.post(f"/api/bets/{bet['id']}/accept", json={})
+    bets_api.post("/api/bets/999999/accept", json={})
+    resp = bets_api.get("/metrics")
+    assert resp.status_code == 200
+    assert resp.content_type == metrics.CONTENT_TYPE
+    text = resp.get_data(as_text=True)
+    route = "/api/bets/<int:bet_id>/accept"
+    assert sample(text, "bets_http_requests_total", method="POST", route=route, status=200) >= 1
+    assert sample(text, "bets_http_outcomes_total", route=route, outcome="not_found") >= 1
+    assert sample(text, "bets_http_request_duration_seconds_count", method="POST", route=route) >= 2
+    assert f"/api/bets/{bet['id']}/accept" not in text
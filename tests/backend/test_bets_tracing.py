@@ -0,0 +1,49 @@
+import pytest
+
+import tracing
+from conftest import TMP_DIR
+
+TRACE_ID = "4bf92f3577b34da6a3ce929d0e0e4736"
+PARENT_ID = "00f067aa0ba902b7"
+
+
+@pytest.fixture
+def traced(monkeypatch):
+    tracer = tracing.Tracer("bets-test", 1.0, f"file:{TMP_DIR}/bets-traces.jsonl")
+    spans = []
+    monkeypatch.setattr(tracer, "export", spans.append)
+    monkeypatch.setattr(tracing, "tracer", tracer)
+    return spans
+
+
+def test_request_span_continues_the_callers_trace(bets_api, create_bet, traced):
+    bet = create_bet()
+    traced.clear()
+    resp = bets_api.post(f"/api/bets/{bet['id']}/accept", json={},
+                         headers={"traceparent": f"00-{TRACE_ID}-{PARENT_ID}-01"})
+    assert resp.headers["X-Trace-Id"] == TRACE_ID
+    (span,) = traced
+    assert span["traceId"] == TRACE_ID
+    assert span["parentId"] == PARENT_ID
+    assert span["name"] == "HTTP POST /api/bets/<int:bet_id>/accept"
+    assert span["attributes"]["status"] == resp.status_code
+
+
+def test_unsampled_callers_are_not_traced(bets_api, traced):
+    resp = bets_api.get("/api/bets", headers={"traceparent": f"00-{TRACE_ID}-{PARENT_ID}-00"})
+    assert "X-Trace-Id" not in resp.headers
+    assert traced == []
+
+
+def test_tracing_is_off_by_default(bets_api):
+    assert not tracing.tracer.enabled
+    assert "X-Trace-Id" not in bets_api.get("/api/bets").headers
+
+
+def test_inject_headers_forwards_the_current_span(traced):
+    assert tracing.inject_headers({}) == {}
+    with tracing.tracer.start_request("HTTP GET", traceparent=f"00-{TRACE_ID}-{PARENT_ID}-01") as root:
+        with tracing.tracer.span("payments.balances") as child:
+            headers = tracing.inject_headers({"Content-Type": "application/json"})
+    assert headers["traceparent"] == f"00-{TRACE_ID}-{child.span_id}-01"
+    assert [s["parentId"] for s in traced] == [root.span_id, PARENT_ID]
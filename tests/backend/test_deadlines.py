@@ -0,0 +1,150 @@
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from deadlines import DeadlineScheduler, format_deadline, parse_deadline
+from metrics import BET_DEADLINES
+
+HOUR = 3600
+
+
+def iso(offset_seconds):
+    return (datetime.now(timezone.utc) + timedelta(seconds=offset_seconds)).isoformat()
+
+
+def fired(action):
+    return BET_DEADLINES._values.get((action,), 0)
+
+
+@pytest.fixture
+def scheduler():
+    changes = []
+    return DeadlineScheduler(threading.RLock(), on_change=changes.extend), changes
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("2030-01-01T00:00:00Z", 1893456000.0),
+    ("2030-01-01T01:00:00+01:00", 1893456000.0),
+    ("2030-01-01T00:00:00", 1893456000.0),  # naive means UTC
+    (None, None),
+    ("", None),
+])
+def test_parse_deadline(value, expected):
+    assert parse_deadline(value) == expected
+
+
+@pytest.mark.parametrize("value", ["tomorrow", 1893456000])
+def test_parse_deadline_rejects_non_iso_values(value):
+    with pytest.raises(ValueError):
+        parse_deadline(value)
+
+
+def test_format_round_trips():
+    assert format_deadline(1893456000.0) == "2030-01-01T00:00:00"
+    assert parse_deadline(format_deadline(1893456000.5)) == 1893456000.5
+
+
+def test_pending_bet_expires_when_due(scheduler):
+    deadlines, changes = scheduler
+    bet = {"id": 1, "status": "pending", "expires_at": "2030-01-01T00:00:00"}
+    deadlines.schedule(bet)
+    before = fired("expired")
+    assert deadlines.run_due(now=1893456000 - 1) == 0
+    assert bet["status"] == "pending"
+    assert deadlines.run_due(now=1893456000) == 1
+    assert bet["status"] == "expired" and "expired_at" in bet
+    assert changes == [(bet, "pending")]
+    assert fired("expired") == before + 1
+    assert len(deadlines) == 0
+
+
+def test_accepted_bet_skips_expiry_and_becomes_overdue(scheduler):
+    deadlines, changes = scheduler
+    bet = {"id": 1, "status": "pending", "expires_at": "2030-01-01T00:00:00", "settle_by": "2030-01-02T00:00:00"}
+    deadlines.schedule(bet)
+    bet["status"] = "accepted"
+    assert deadlines.run_due(now=1893456000) == 0  # stale expire entry dropped
+    assert deadlines.run_due(now=1893456000 + 86400) == 1
+    assert bet["status"] == "accepted" and bet["overdue"] is True
+    assert changes == [(bet, "accepted")]
+
+
+def test_settled_bet_is_never_flagged(scheduler):
+    deadlines, changes = scheduler
+    bet = {"id": 1, "status": "accepted", "settle_by": "2030-01-01T00:00:00"}
+    deadlines.schedule(bet)
+    bet["status"] = "settled"
+    assert deadlines.run_due(now=1893456000) == 0
+    assert "overdue" not in bet and changes == []
+
+
+def test_deadlines_fire_in_due_order(scheduler):
+    deadlines, changes = scheduler
+    bets = [{"id": i, "status": "pending", "expires_at": format_deadline(1893456000 + offset)}
+            for i, offset in enumerate([30, 10, 20])]
+    for bet in bets:
+        deadlines.schedule(bet)
+    assert deadlines.next_due() == 1893456010
+    deadlines.run_due(now=1893456025)
+    assert [bet["id"] for bet, _ in changes] == [1, 2]
+    assert deadlines.next_due() == 1893456030
+
+
+def test_load_catches_up_on_missed_deadlines(scheduler):
+    deadlines, changes = scheduler
+    missed = {"id": 1, "status": "pending", "expires_at": iso(-HOUR)}
+    upcoming = {"id": 2, "status": "pending", "expires_at": iso(HOUR)}
+    finished = {"id": 3, "status": "settled", "settle_by": iso(-HOUR)}
+    deadlines.load([missed, upcoming, finished, {"id": 4, "status": "pending"}])
+    assert len(deadlines) == 2
+    assert deadlines.run_due() == 1
+    assert (missed["status"], upcoming["status"]) == ("expired", "pending")
+
+
+def test_timer_thread_expires_bets(scheduler):
+    deadlines, changes = scheduler
+    deadlines.start()
+    bet = {"id": 1, "status": "pending", "expires_at": iso(0.05)}
+    deadlines.schedule(bet)
+    for _ in range(100):
+        if bet["status"] == "expired":
+            break
+        time.sleep(0.02)
+    assert bet["status"] == "expired"
+
+
+# ---- endpoints ----
+
+@pytest.mark.parametrize("fields, error", [
+    ({"expires_at": "soon"}, "expires_at must be an ISO 8601 timestamp"),
+    ({"expires_at": iso(-60)}, "expires_at must be in the future"),
+    ({"expires_at": iso(2 * HOUR), "settle_by": iso(HOUR)}, "settle_by must not be before expires_at"),
+])
+def test_create_rejects_bad_deadlines(bets_api, fields, error):
+    resp = bets_api.post("/api/bets/create", json={"sender": "a@x.com", "receiver": "b@x.com", "amount": 5,
+                                                  "description": "deadline", **fields})
+    assert resp.status_code == 400
+    assert resp.get_json()["error"] == error
+
+
+def test_accept_after_expiry_is_rejected(bets_api, bets_main, create_bet):
+    bet = create_bet(expires_at=iso(HOUR))
+    assert bet["expires_at"] == format_deadline(parse_deadline(bet["expires_at"]))
+    # The timer has not fired yet; accept applies due deadlines itself
+    bets_main.deadlines.run_due(now=time.time() + 2 * HOUR)
+    resp = bets_api.post(f"/api/bets/{bet['id']}/accept", json={})
+    assert resp.status_code == 400
+    assert resp.get_json()["error"] == "Bet expired"
+    assert bets_main.find_bet(bet["id"])["status"] == "expired"
+
+
+def test_overdue_bet_can_still_be_settled(bets_api, bets_main, create_bet):
+    bet = create_bet(settle_by=iso(HOUR))
+    bets_api.post(f"/api/bets/{bet['id']}/accept", json={})
+    bets_main.deadlines.run_due(now=time.time() + 2 * HOUR)
+    assert bets_main.find_bet(bet["id"])["overdue"] is True
+    resp = bets_api.post(f"/api/bets/{bet['id']}/settle", json={"winner": "sender"})
+    assert resp.status_code == 200
+    assert resp.get_json()["bet"]["status"] == "settled"
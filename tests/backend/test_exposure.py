@@ -0,0 +1,161 @@
+import random
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from exposure import BetColumns, exposure_report  # noqa: E402
+
+
+def make_bets(seed=3, count=300):
+    rng = random.Random(seed)
+    users = [f"u{i}@x.com" for i in range(12)]
+    bets = []
+    for bet_id in range(1, count + 1):
+        sender, receiver = rng.sample(users, 2)
+        bets.append({"id": bet_id, "sender": sender, "receiver": receiver, "amount": round(rng.uniform(1, 100), 2),
+                     "status": rng.choice(["pending", "accepted", "settled", "expired"])})
+    return bets, users
+
+
+def cents(amount):
+    return int(round(amount * 100))
+
+
+def brute_force(bets, balances, outcomes=None, default="sender"):
+    open_bets = [b for b in bets if b["status"] in ("pending", "accepted")]
+    users = {}
+
+    def row(email):
+        return users.setdefault(email, {"exposure": 0, "accepted": 0, "net": {}})
+
+    scenarios = {"senders_win": lambda b: True, "receivers_win": lambda b: False}
+    if outcomes:
+        scenarios["custom"] = lambda b: outcomes.get(str(b["id"]), default) == "sender"
+    for bet in open_bets:
+        amount = cents(bet["amount"])
+        for role in ("sender", "receiver"):
+            totals = row(bet[role])
+            totals["exposure"] += amount
+            if bet["status"] == "accepted":
+                totals["accepted"] += amount
+        for name, sender_wins in scenarios.items():
+            signed = amount if sender_wins(bet) else -amount
+            for email, sign in ((bet["sender"], 1), (bet["receiver"], -1)):
+                net = row(email)["net"]
+                net[name] = net.get(name, 0) + sign * signed
+    for email, totals in users.items():
+        totals["balance"] = balances.get(email)
+        totals["shortfall"] = max(totals["exposure"] - (totals["balance"] or 0), 0)
+        totals["net"] = {name: totals["net"].get(name, 0) for name in scenarios}
+    return users, scenarios
+
+
+def report_for(bets, balances=None, **options):
+    source = (lambda emails: {e: balances[e] for e in emails if e in balances}) if balances is not None else None
+    return exposure_report(BetColumns.build(bets).snapshot(), source, top=1000, **options)
+
+
+def test_report_matches_brute_force():
+    bets, users = make_bets()
+    balances = {email: random.Random(email).randrange(0, 200_000) for email in users[:-2]}
+    outcomes = {str(b["id"]): "receiver" for b in bets[::3]}
+    report = report_for(bets, balances, outcomes=outcomes, default_winner="sender")
+    expected, scenarios = brute_force(bets, balances, outcomes)
+
+    assert report["balances"] == "ok"
+    assert report["open_bets"] == sum(b["status"] in ("pending", "accepted") for b in bets)
+    assert report["users"] == len(expected)
+    assert report["totals"]["exposure_cents"] == sum(cents(b["amount"]) for b in bets
+                                                     if b["status"] in ("pending", "accepted"))
+    assert report["totals"]["shortfall_cents"] == sum(u["shortfall"] for u in expected.values())
+    assert report["totals"]["users_without_account"] == sum(u["balance"] is None for u in expected.values())
+    for row in report["top"]:
+        want = expected[row["user"]]
+        assert row["exposure_cents"] == want["exposure"]
+        assert row["accepted_exposure_cents"] == want["accepted"]
+        assert row["balance_cents"] == want["balance"]
+        assert row["shortfall_cents"] == want["shortfall"]
+        assert row["net_cents"] == want["net"]
+    shortfalls = [r["shortfall_cents"] for r in report["top"]]
+    assert len(shortfalls) == len(expected)
+    assert shortfalls == sorted(shortfalls, reverse=True)
+    for name in scenarios:
+        afters = [(u["balance"] or 0) + u["net"][name] for u in expected.values()]
+        assert report["scenarios"][name]["users_negative"] == sum(a < 0 for a in afters)
+        assert report["scenarios"][name]["shortfall_cents"] == sum(max(-a, 0) for a in afters)
+
+
+def test_status_changes_are_reflected():
+    bets, _ = make_bets(count=40)
+    columns = BetColumns.build(bets)
+    for bet in bets:
+        if bet["status"] == "pending":
+            bet["status"] = "settled"
+            columns.update(bet)
+    report = exposure_report(columns.snapshot(), None, top=0)
+    assert report["open_bets"] == sum(b["status"] == "accepted" for b in bets)
+    assert report["totals"]["exposure_cents"] == report["totals"]["accepted_exposure_cents"]
+
+
+def test_without_balances_ranks_by_exposure():
+    bets, _ = make_bets(count=80)
+    report = report_for(bets)
+    assert report["balances"] == "skipped"
+    assert report["totals"]["shortfall_cents"] is None
+    exposures = [r["exposure_cents"] for r in report["top"]]
+    assert exposures == sorted(exposures, reverse=True)
+    assert all(r["balance_cents"] is None and r["shortfall_cents"] is None for r in report["top"])
+
+
+def test_unavailable_balances_are_reported():
+    def down(emails):
+        raise OSError("connection refused")
+
+    bets, _ = make_bets(count=20)
+    report = exposure_report(BetColumns.build(bets).snapshot(), down)
+    assert report["balances"] == "unavailable: connection refused"
+    assert report["totals"]["shortfall_cents"] is None
+
+
+@pytest.mark.parametrize("outcomes, default", [({"1": "nobody"}, "sender"), ({"1": "sender"}, "draw")])
+def test_invalid_outcomes_raise(outcomes, default):
+    bets, _ = make_bets(count=5)
+    with pytest.raises(ValueError):
+        exposure_report(BetColumns.build(bets).snapshot(), None, outcomes=outcomes, default_winner=default)
+
+
+# ---- endpoint ----
+
+def test_endpoint_without_balances(bets_api, create_bet):
+    create_bet(amount=42)
+    report = bets_api.get("/api/analytics/exposure", query_string={"balances": 0, "top": 5}).get_json()
+    assert report["balances"] == "skipped"
+    assert len(report["top"]) <= 5
+    assert report["open_bets"] >= 1
+
+
+def test_endpoint_custom_scenario_uses_fetched_balances(bets_api, bets_main, create_bet, monkeypatch):
+    bet = create_bet(amount=10)
+    monkeypatch.setattr(bets_main, "fetch_balances", lambda emails: {bet["sender"]: 500})
+    resp = bets_api.post("/api/analytics/exposure", query_string={"top": 1000},
+                         json={"outcomes": {str(bet["id"]): "receiver"}, "default": "sender"})
+    assert resp.status_code == 200
+    rows = {r["user"]: r for r in resp.get_json()["top"]}
+    sender = rows[bet["sender"]]
+    assert (sender["balance_cents"], sender["shortfall_cents"]) == (500, 500)
+    assert sender["net_cents"]["custom"] == -1000
+    assert rows[bet["receiver"]]["net_cents"]["custom"] == 1000
+
+
+@pytest.mark.parametrize("kwargs, error", [
+    ({"json": [1, 2]}, "body must be a JSON object"),
+    ({"json": {"outcomes": [1]}}, "outcomes must be an object of bet id -> winner"),
+    ({"json": {"outcomes": {"1": "sender"}, "default": "draw"}, "query_string": {"balances": 0}},
+     'default must be "sender" or "receiver"'),
+    ({"query_string": {"top": 1001}}, "top must be between 0 and 1000"),
+])
+def test_endpoint_rejects_bad_requests(bets_api, kwargs, error):
+    resp = bets_api.post("/api/analytics/exposure", **kwargs)
+    assert resp.status_code == 400
+    assert resp.get_json()["error"] == error
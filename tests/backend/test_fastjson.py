@@ -0,0 +1,36 @@
+import pytest
+from flask import jsonify
+
+from fastjson import fast_jsonify
+from records import BetRecord
+
+
+def _bets():
+    return [
+        BetRecord.from_dict({"id": 1, "sender": "a@example.com", "receiver": "b@example.com", "amount": 12.5,
+                             "description": "I can beat you at chess", "status": "pending"}),
+        {"id": 2, "sender": "c@example.com", "receiver": "d@example.com", "amount": 40,
+         "description": "Coffee shop runs out of bagels by noon", "status": "settled", "winner": "sender",
+         "payment": {"status": "completed", "transaction_id": None}},
+    ]
+
+
+@pytest.mark.parametrize("debug", [False, True])
+@pytest.mark.parametrize("extra", [
+    {},
+    {"description": "Café au lait ☕ before noon"},  # non-ASCII: escaped by jsonify
+    {"amount": 1e16},  # exponent formatting differs in orjson
+    {"amount": 5e-05},
+])
+def test_fast_jsonify_matches_jsonify(bets_main, monkeypatch, debug, extra):
+    app = bets_main.app
+    monkeypatch.setattr(app, "debug", debug)
+    payload = {"bets": _bets() + [dict(_bets()[1], id=3, **extra)]}
+    with app.app_context():
+        assert fast_jsonify(payload).get_data() == jsonify(payload).get_data()
+
+
+def test_get_bets_serializes_records(bets_api, create_bet):
+    bet = create_bet(description="Tesla stock hits $300 this quarter")
+    listed = bets_api.get("/api/bets").get_json()["bets"]
+    assert bet in listed
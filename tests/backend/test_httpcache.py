@@ -0,0 +1,67 @@
+import gzip
+
+from httpcache import VersionedCache
+
+
+def test_etags_differ_between_processes_at_the_same_version():
+    # A restarted process or another worker starts again at version 0
+    first, second = VersionedCache("bets"), VersionedCache("bets")
+    assert first.version == second.version == 0
+    assert first.etag != second.etag
+
+
+def test_body_is_rendered_once_per_version():
+    cache = VersionedCache("bets")
+    renders = []
+
+    def render():
+        renders.append(cache.version)
+        return b"body-%d" % len(renders)
+
+    assert cache.body(render) == (cache.etag, b"body-1")
+    assert cache.body(render) == (cache.etag, b"body-1")
+    cache.bump()
+    assert cache.body(render) == (cache.etag, b"body-2")
+    assert renders == [0, 1]
+
+
+def test_mutation_during_render_is_not_cached_under_the_new_version():
+    cache = VersionedCache("bets")
+    before = cache.etag
+
+    def render_while_a_bet_changes():
+        cache.bump()
+        return b"rendered-during-mutation"
+
+    etag, body = cache.body(render_while_a_bet_changes)
+    # Served with the version it started from, so clients revalidate and get a fresh render
+    assert etag == before != cache.etag
+    assert cache.body(lambda: b"fresh") == (cache.etag, b"fresh")
+
+
+def test_get_bets_304_until_a_bet_changes(bets_api, create_bet):
+    first = bets_api.get("/api/bets")
+    etag = first.headers["ETag"]
+    assert first.headers["Cache-Control"] == "no-cache"
+    assert bets_api.get("/api/bets", headers={"If-None-Match": etag}).status_code == 304
+
+    bet = create_bet()
+    changed = bets_api.get("/api/bets", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert bet in changed.get_json()["bets"]
+    etag = changed.headers["ETag"]
+
+    bets_api.post(f"/api/bets/{bet['id']}/accept", json={})
+    assert bets_api.get("/api/bets", headers={"If-None-Match": etag}).status_code == 200
+
+
+def test_large_responses_are_compressed(bets_api, create_bet):
+    for _ in range(20):
+        create_bet()
+    plain = bets_api.get("/api/bets")
+    assert "Content-Encoding" not in plain.headers
+    compressed = bets_api.get("/api/bets", headers={"Accept-Encoding": "gzip"})
+    assert compressed.headers["Content-Encoding"] in ("gzip", "br")
+    assert "Accept-Encoding" in compressed.headers["Vary"]
+    if compressed.headers["Content-Encoding"] == "gzip":
+        assert gzip.decompress(compressed.get_data()) == plain.get_data()
@@ -0,0 +1,87 @@
+import json
+
+import pytest
+
+import records
+from records import STRINGS, BetRecord
+
+SETTLED = {
+    "id": 7,
+    "sender": "alice@email.com",
+    "receiver": "bob@email.com",
+    "amount": 12.5,
+    "description": "I can beat you at chess",
+    "status": "settled",
+    "accepted_at": "2025-01-01T10:00:00",
+    "winner": "receiver",
+    "settled_at": "2025-01-02T10:00:00",
+    "payment": {"status": "completed", "winner": "bob@email.com", "loser": "alice@email.com", "amount": 12.5,
+                "transaction_id": None},
+    "settle_by": "2025-01-03T00:00:00",
+    "overdue": False,
+}
+
+
+@pytest.mark.parametrize("data", [
+    SETTLED,
+    {"id": 1, "sender": "a@x.com", "receiver": "b@x.com", "amount": 5, "description": "rain", "status": "pending"},
+    {"id": 2, "status": "expired", "expired_at": "2025-01-01T00:00:00", "expires_at": "2025-01-01T00:00:00"},
+    {"id": 3, "status": "pending", "source": "import", "tags": ["a", "b"]},  # unknown fields
+])
+def test_json_round_trip(data):
+    record = BetRecord.from_dict(json.loads(json.dumps(data)))
+    assert record.to_dict() == data
+    assert json.loads(json.dumps(record.to_dict(), sort_keys=True)) == data
+    assert BetRecord.from_dict(record.to_dict()).to_dict() == data
+
+
+def test_unknown_fields_live_in_extra():
+    record = BetRecord.from_dict({"id": 1, "status": "pending"})
+    assert not hasattr(record, "_extra")
+    record["source"] = "seed"
+    assert record._extra == {"source": "seed"}
+    assert record["source"] == "seed" and "source" in record
+
+
+def test_dict_operations():
+    record = BetRecord(id=1, status="pending", amount=3)
+    assert record["status"] == "pending" and record.get("status") == "pending"
+    assert record.get("winner") is None and record.get("winner", "n/a") == "n/a"
+    assert "winner" not in record and "amount" in record
+    with pytest.raises(KeyError):
+        record["winner"]
+    record.update({"status": "accepted", "accepted_by": "b@x.com"})
+    assert record.to_dict() == {"id": 1, "amount": 3, "status": "accepted", "accepted_by": "b@x.com"}
+    assert repr(record).startswith("BetRecord({")
+
+
+def test_strings_and_payment_keys_are_shared():
+    first = BetRecord.from_dict(json.loads(json.dumps(SETTLED)))
+    second = BetRecord.from_dict(json.loads(json.dumps(SETTLED)))
+    assert first["sender"] is second["sender"] is STRINGS("alice@email.com")
+    assert first["description"] is second["description"]
+    assert first["payment"]["loser"] is first["sender"]
+    assert first["payment"] is not second["payment"]
+
+
+def test_status_is_stored_as_a_code():
+    record = BetRecord(status="settled")
+    assert record.status == records.STATUSES.index("settled")
+    custom = BetRecord(status="disputed")
+    assert "disputed" in records.STATUSES
+    assert custom.to_dict() == {"status": "disputed"}
+
+
+@pytest.mark.parametrize("status", [1, None, 2.0])
+def test_non_string_status_is_rejected(status):
+    with pytest.raises(TypeError, match="bet status must be a string"):
+        BetRecord.from_dict({"id": 1, "status": status})
+
+
+def test_api_output_matches_the_record(bets_api, create_bet):
+    created = create_bet(amount=7.25)
+    listed = bets_api.get("/api/bets").get_json()["bets"]
+    assert next(b for b in listed if b["id"] == created["id"]) == created
+    accepted = bets_api.post(f"/api/bets/{created['id']}/accept", json={"user": created["receiver"]}).get_json()
+    assert accepted["bet"]["accepted_by"] == created["receiver"]
+    assert accepted["bet"]["status"] == "accepted"
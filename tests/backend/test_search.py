@@ -0,0 +1,121 @@
+import random
+import uuid
+
+import pytest
+
+from conftest import unique_email
+from search import BetIndex, tokenize
+
+WORDS = "chess cheap check pizza pie rain run runner stock stocks snow game games bus late".split()
+
+
+def brute_force(bets, query, status=None, user=None):
+    terms = list(dict.fromkeys(tokenize(query)))
+    if not terms:
+        return set()
+    hits = set()
+    for bet in bets:
+        tokens = set(tokenize(bet["description"]))
+        if not all(t in tokens for t in terms[:-1]):
+            continue
+        if not any(t.startswith(terms[-1]) for t in tokens):
+            continue
+        if status is not None and bet["status"] != status:
+            continue
+        if user is not None and user not in (bet["sender"], bet["receiver"]):
+            continue
+        hits.add(bet["id"])
+    return hits
+
+
+@pytest.fixture(scope="module")
+def corpus():
+    rng = random.Random(11)
+    users = [f"u{i}@x.com" for i in range(6)]
+    bets = []
+    for bet_id in range(1, 401):
+        sender, receiver = rng.sample(users, 2)
+        bets.append({
+            "id": bet_id, "sender": sender, "receiver": receiver,
+            "description": " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 5))),
+            "status": rng.choice(["pending", "accepted", "settled"]),
+        })
+    return bets, BetIndex.build(bets), users
+
+
+@pytest.mark.parametrize("query", ["chess", "ch", "che", "run", "stock", "game rain", "pizza ru", "late bus s", "zzz",
+                                   "the"])
+def test_search_matches_brute_force(corpus, query):
+    bets, index, users = corpus
+    lookup = {b["id"]: b for b in bets}.get
+    assert set(index.search(query, lookup, limit=1000)) == brute_force(bets, query)
+    for status in ("pending", "settled"):
+        assert set(index.search(query, lookup, limit=1000, status=status)) == brute_force(bets, query, status=status)
+    assert set(index.search(query, lookup, limit=1000, user=users[0])) == brute_force(bets, query, user=users[0])
+
+
+def test_limit_keeps_the_best_hits(corpus):
+    bets, index, _ = corpus
+    lookup = {b["id"]: b for b in bets}.get
+    everything = index.search("ch", lookup, limit=1000)
+    assert index.search("ch", lookup, limit=5) == everything[:5]
+
+
+def test_exact_matches_rank_ahead_of_prefix_matches_newest_first():
+    bets = [
+        {"id": 1, "description": "stock market"},
+        {"id": 2, "description": "stocks rally"},
+        {"id": 3, "description": "stock split"},
+    ]
+    index = BetIndex.build(bets)
+    assert index.search("stock", lambda i: None) == [3, 1, 2]
+    assert index.search("stocks", lambda i: None) == [2]
+
+
+def test_tokenize():
+    assert tokenize("I can't beat you at Chess for $100k!") == ["cant", "beat", "chess", "for", "100k"]
+
+
+def test_seed_order_does_not_matter():
+    index = BetIndex()
+    for bet_id in (5, 2, 9, 2):
+        index.add({"id": bet_id, "description": "chess"})
+    assert index.search("chess", lambda i: None, limit=10) == [9, 5, 2]
+    index.add({"id": None, "description": "chess"})
+    assert index.info()["bets"] == 4
+
+
+# ---- endpoint ----
+
+def test_created_bet_is_searchable_at_once(bets_api, create_bet):
+    word = f"zebra{uuid.uuid4().hex[:8]}"
+    sender = unique_email("searcher")
+    bet = create_bet(sender=sender, description=f"A {word} crosses the road")
+    resp = bets_api.get("/api/bets/search", query_string={"q": word[:7]})
+    assert bet["id"] in [b["id"] for b in resp.get_json()["bets"]]
+
+    def ids(**params):
+        found = bets_api.get("/api/bets/search", query_string={"q": f"{word} road", **params}).get_json()["bets"]
+        return [b["id"] for b in found]
+
+    assert ids() == [bet["id"]]
+    assert ids(user=sender) == [bet["id"]]
+    assert ids(user=unique_email()) == []
+    assert ids(status="pending") == [bet["id"]]
+    # Status is read from the live bet, so the filter follows accept
+    bets_api.post(f"/api/bets/{bet['id']}/accept", json={})
+    assert ids(status="pending") == []
+    assert ids(status="accepted") == [bet["id"]]
+
+
+@pytest.mark.parametrize("params", [{}, {"q": " "}, {"q": "chess", "limit": 0}, {"q": "chess", "limit": 101}])
+def test_search_validates_parameters(bets_api, params):
+    assert bets_api.get("/api/bets/search", query_string=params).status_code == 400
+
+
+def test_index_info_counts_new_bets(bets_api, create_bet):
+    before = bets_api.get("/api/bets/search/index").get_json()
+    create_bet(description="Unique walrus wager")
+    after = bets_api.get("/api/bets/search/index").get_json()
+    assert after["bets"] == before["bets"] + 1
+    assert after["terms"] >= before["terms"] + 3
@@ -0,0 +1,120 @@
+import random
+
+import pytest
+
+from conftest import unique_email
+from stats import SortedList, UserStats, to_cents
+
+
+class SmallSortedList(SortedList):
+    LOAD = 4  # splits and bucket removals happen after a handful of items
+
+
+def test_sorted_list_matches_a_plain_sorted_list():
+    rng = random.Random(5)
+    items = [rng.randrange(100) for _ in range(30)]
+    ours, expected = SmallSortedList(items), sorted(items)
+    for _ in range(500):
+        if expected and rng.random() < 0.45:
+            value = rng.choice(expected)
+            ours.remove(value)
+            expected.remove(value)
+        else:
+            value = rng.randrange(100)
+            ours.add(value)
+            expected.append(value)
+            expected.sort()
+        assert len(ours) == len(expected)
+    assert list(ours) == expected
+    assert ours.head(5) == expected[:5]
+    for value in set(expected):
+        assert ours.index(value) == expected.index(value)
+    with pytest.raises(ValueError):
+        ours.remove(1000)
+
+
+def bet(sender, receiver, amount, status="pending", winner=None):
+    record = {"sender": sender, "receiver": receiver, "amount": amount, "status": status}
+    if winner:
+        record["winner"] = winner
+    return record
+
+
+def settle(stats, record, winner):
+    record["status"], record["winner"] = "settled", winner
+    stats.transition(record, "accepted")
+
+
+def test_leaderboard_follows_settlements():
+    stats = UserStats()
+    a_vs_b = bet("a@x.com", "b@x.com", 10)
+    c_vs_b = bet("c@x.com", "b@x.com", 2.5)
+    for record in (a_vs_b, c_vs_b):
+        stats.add(record)
+        record["status"] = "accepted"
+        stats.transition(record, "pending")
+    assert stats.user("a@x.com")["open_exposure"] == 10
+    assert [row["user"] for row in stats.top(3)] == ["a@x.com", "b@x.com", "c@x.com"]  # ties by email
+
+    settle(stats, a_vs_b, "receiver")
+    settle(stats, c_vs_b, "sender")
+    assert [(row["user"], row["net_winnings"]) for row in stats.top(3)] == [
+        ("b@x.com", 7.5), ("c@x.com", 2.5), ("a@x.com", -10.0),
+    ]
+    assert stats.rank("a@x.com") == 3
+    b = stats.user("b@x.com")
+    assert (b["wins"], b["losses"], b["wagered"], b["open_exposure"], b["settled"]) == (1, 1, 12.5, 0, 2)
+    assert stats.diff(UserStats.rebuild([a_vs_b, c_vs_b])) == []
+
+
+def test_diff_reports_drift():
+    records = [bet("a@x.com", "b@x.com", 5, status="settled", winner="sender")]
+    stats = UserStats.rebuild(records)
+    records.append(bet("a@x.com", "c@x.com", 1))
+    mismatches = stats.diff(UserStats.rebuild(records))
+    assert [m["user"] for m in mismatches] == ["a@x.com", "c@x.com"]
+    assert stats.rank("nobody@x.com") is None and stats.user("nobody@x.com") is None
+
+
+@pytest.mark.parametrize("amount, cents", [(12.34, 1234), ("5", 500), (0.015, 2), (None, 0), ("abc", 0)])
+def test_to_cents(amount, cents):
+    assert to_cents(amount) == cents
+
+
+# ---- endpoints ----
+
+def test_leaderboard_reorders_after_settle(bets_api, create_bet):
+    winner, loser = unique_email("winner"), unique_email("loser")
+    record = create_bet(sender=winner, receiver=loser, amount=10**7)
+    bets_api.post(f"/api/bets/{record['id']}/accept", json={})
+    assert bets_api.get(f"/api/users/{winner}/stats").get_json()["open_exposure"] == 10**7
+
+    bets_api.post(f"/api/bets/{record['id']}/settle", json={"winner": "sender"})
+    board = bets_api.get("/api/leaderboard", query_string={"top": 1000}).get_json()["leaderboard"]
+    assert board[0]["user"] == winner and board[0]["net_winnings"] == 10**7
+    assert [row["rank"] for row in board] == list(range(1, len(board) + 1))
+    assert board == sorted(board, key=lambda row: (-row["net_winnings"], row["user"]))
+
+    stats = bets_api.get(f"/api/users/{loser}/stats").get_json()
+    assert (stats["losses"], stats["net_winnings"], stats["open_exposure"]) == (1, -10**7, 0)
+    assert board[stats["rank"] - 1]["user"] == loser
+
+
+def test_verify_and_rebuild_agree_with_incremental_stats(bets_api, create_bet):
+    record = create_bet()
+    bets_api.post(f"/api/bets/{record['id']}/accept", json={})
+    bets_api.post(f"/api/bets/{record['id']}/settle", json={"winner": "receiver"})
+    verify = bets_api.get("/api/stats/verify").get_json()
+    assert verify["ok"] is True and verify["mismatches"] == []
+    rebuilt = bets_api.post("/api/stats/rebuild").get_json()
+    assert rebuilt["ok"] is True and rebuilt["users"] == verify["users"]
+    assert bets_api.get(f"/api/users/{record['receiver']}/stats").get_json()["wins"] == 1
+
+
+@pytest.mark.parametrize("top", [0, 1001])
+def test_leaderboard_size_is_bounded(bets_api, top):
+    assert bets_api.get("/api/leaderboard", query_string={"top": top}).status_code == 400
+
+
+def test_unknown_user_stats_are_404(bets_api):
+    assert bets_api.get(f"/api/users/{unique_email()}/stats").status_code == 404
@@ -0,0 +1,91 @@
+import hashlib
+import json
+import random
+import sqlite3
+
+from benchmarks.compare import compare
+from benchmarks.dataset import build_bets_file, build_payments_db, email_for
+from payments.db import SCHEMA_VERSION
+from records import BetRecord
+
+
+def build(tmp_path, name, seed=7):
+    db_path = str(tmp_path / f"{name}.db")
+    summary = build_payments_db(db_path, users=50, ledger_rows=400, hot_accounts=3, hot_share=0.5,
+                                rng=random.Random(seed))
+    return db_path, summary
+
+
+def dump(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return (
+            conn.execute("SELECT id, balance_cents FROM accounts ORDER BY id").fetchall(),
+            conn.execute("SELECT * FROM ledger_entries ORDER BY id").fetchall(),
+        )
+    finally:
+        conn.close()
+
+
+def test_same_seed_builds_the_same_database(tmp_path):
+    first, summary = build(tmp_path, "a")
+    second, _ = build(tmp_path, "b")
+    other, _ = build(tmp_path, "c", seed=8)
+    assert dump(first) == dump(second)
+    assert dump(first) != dump(other)
+    assert summary == {"users": 50, "accounts": 50, "ledger_rows": 400, "hot_accounts": [1, 2, 3]}
+
+
+def test_balances_match_the_ledger(tmp_path):
+    db_path, _ = build(tmp_path, "ledger")
+    conn = sqlite3.connect(db_path)
+    try:
+        mismatched = conn.execute(
+            "SELECT a.id FROM accounts a LEFT JOIN ("
+            "  SELECT account_id, SUM(CASE WHEN type = 'transfer_out' THEN -amount_cents ELSE amount_cents END) AS s"
+            "  FROM ledger_entries GROUP BY account_id"
+            ") l ON l.account_id = a.id WHERE a.balance_cents != COALESCE(l.s, 0) OR a.balance_cents < 0"
+        ).fetchall()
+        version = conn.execute("SELECT version FROM schema_meta").fetchone()[0]
+        emails = [row[0] for row in conn.execute("SELECT email FROM users ORDER BY id LIMIT 2")]
+    finally:
+        conn.close()
+    assert mismatched == []
+    assert version == SCHEMA_VERSION
+    assert emails == [email_for(1), email_for(2)]
+
+
+def test_bets_file_is_reproducible_and_loadable(tmp_path):
+    paths = [tmp_path / "a.jsonl", tmp_path / "b.jsonl"]
+    counts = [build_bets_file(str(p), bets=200, users=20, rng=random.Random(3)) for p in paths]
+    digests = {hashlib.sha256(p.read_bytes()).hexdigest() for p in paths}
+    assert len(digests) == 1
+    assert counts[0] == counts[1] and sum(counts[0].values()) == 200
+    records = [json.loads(line) for line in paths[0].read_text().splitlines()]
+    assert all(r["sender"] != r["receiver"] for r in records)
+    for record in records:
+        assert BetRecord.from_dict(record).to_dict() == record
+
+
+def scenario(rps, p99, error_rate=0.0):
+    return {"throughput_rps": rps, "latency_ms": {"p99": p99}, "error_rate": error_rate}
+
+
+def test_compare_flags_regressions_beyond_the_threshold():
+    base = {"transfers": scenario(1000, 20), "history": scenario(500, 10), "deposits": scenario(300, 50),
+            "removed": scenario(1, 1)}
+    head = {"transfers": scenario(850, 21), "history": scenario(480, 12), "deposits": scenario(310, 50, 0.05)}
+    rows = {r["scenario"]: r for r in compare(base, head, threshold=0.1, error_threshold=0.01)}
+    assert set(rows) == {"transfers", "history", "deposits"}
+    assert rows["transfers"]["regressed"] == ["throughput"]
+    assert rows["transfers"]["throughput_change"] == -0.15
+    assert rows["history"]["regressed"] == ["p99"]
+    assert rows["deposits"]["regressed"] == ["errors"]
+
+
+def test_compare_tolerates_noise_and_missing_baselines():
+    rows = compare({"etag": scenario(0, None)}, {"etag": scenario(900, 5)}, threshold=0.1, error_threshold=0.01)
+    assert rows[0]["regressed"] == []
+    assert rows[0]["throughput_change"] is None
+    rows = compare({"etag": scenario(1000, 10)}, {"etag": scenario(950, 10.5)}, threshold=0.1, error_threshold=0.01)
+    assert rows[0]["regressed"] == []
@@ -0,0 +1,128 @@
+# tests/conftest.py
+# Shared fixtures for the payments service, the Python client and the bets backend.
+#
+# Settings are read from the environment at import time, so everything is configured here
+# before any service module is imported:
+#   - payments: a throwaway file-backed SQLite database (WAL, read-only pool), the local card
+#     simulator with no latency, a Stripe webhook secret, and no per-account rate limit
+#   - bets backend: an empty BETS_SEED_FILE, so the store starts with no bets
+#
+# Usage (from repo root):
+#   python -m pytest -q
+#   python -m pytest -q tests/backend
+
+import os
+import shutil
+import sys
+import tempfile
+import uuid
+
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BACKEND_DIR = os.path.join(REPO_ROOT, "backend")
+TMP_DIR = tempfile.mkdtemp(prefix="bets-tests-")
+WEBHOOK_SECRET = "whsec_test_secret"
+
+_seed_file = os.path.join(TMP_DIR, "bets.jsonl")
+open(_seed_file, "w").close()
+
+os.environ.update({
+    "DATABASE_URL": f"sqlite:///{os.path.join(TMP_DIR, 'payments.db')}",
+    "PAYMENTS_PROCESSOR": "simulator",
+    "SIMULATOR_LATENCY_MS": "0",
+    "SIMULATOR_JITTER_MS": "0",
+    "STRIPE_SECRET_KEY": "sk_test_dummy",
+    "STRIPE_API_BASE": "http://stripe.test",
+    "STRIPE_WEBHOOK_SECRET": WEBHOOK_SECRET,
+    "WEBHOOK_POLL_INTERVAL_SECONDS": "0.05",
+    "WEBHOOK_BATCH_WINDOW_MS": "0",
+    "OUTBOX_POLL_INTERVAL_SECONDS": "0.05",
+    "ADMISSION_ACCOUNT_RATE": "0",
+    "TRACE_SAMPLE_RATE": "0",
+    "TRACE_EXPORT": "",
+    "BETS_SEED_FILE": _seed_file,
+    "PAYMENTS_URL": "http://payments.test",
+})
+for path in (REPO_ROOT, BACKEND_DIR):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+
+def pytest_sessionfinish(session, exitstatus):
+    shutil.rmtree(TMP_DIR, ignore_errors=True)
+
+
+def unique_email(prefix="user"):
+    return f"{prefix}-{uuid.uuid4().hex[:12]}@example.com"
+
+
+@pytest.fixture(scope="session")
+def payments_app():
+    from fastapi.testclient import TestClient
+
+    from payments.main import app
+
+    # Entering the client runs startup (schema, webhook worker) and shutdown
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def api(payments_app):
+    return payments_app
+
+
+@pytest.fixture
+def new_account(api):
+    """
+    new_account(balance_cents=0) -> account id of a fresh user, funded by a simulated deposit.
+    """
+
+    def create(balance_cents=0):
+        resp = api.post("/accounts", json={"email": unique_email()})
+        assert resp.status_code == 200, resp.text
+        account_id = resp.json()["accountId"]
+        if balance_cents:
+            resp = api.post(
+                f"/accounts/{account_id}/deposit",
+                json={"amountCents": balance_cents, "currency": "USD", "simulate": True},
+            )
+            assert resp.status_code == 200, resp.text
+        return account_id
+
+    return create
+
+
+@pytest.fixture(scope="session")
+def bets_main():
+    import main
+
+    return main
+
+
+@pytest.fixture
+def bets_api(bets_main):
+    return bets_main.app.test_client()
+
+
+@pytest.fixture
+def create_bet(bets_api):
+    """
+    create_bet(sender=None, receiver=None, amount=10, description=..., **extra) -> bet dict.
+    Unset parties get fresh emails so tests never share users.
+    """
+
+    def create(sender=None, receiver=None, amount=10, description="I can beat you at chess", **extra):
+        body = {
+            "sender": sender or unique_email("sender"),
+            "receiver": receiver or unique_email("receiver"),
+            "amount": amount,
+            "description": description,
+            **extra,
+        }
+        resp = bets_api.post("/api/bets/create", json=body)
+        assert resp.status_code == 201, resp.get_data(as_text=True)
+        return resp.get_json()["bet"]
+
+    return create
@@ -0,0 +1,198 @@
+import asyncio
+
+import pytest
+
+import payments.main as payments_main
+from payments.admission import AdmissionRejected, TokenBucket, WriteAdmission
+
+
+def admission(**overrides):
+    options = dict(concurrency=1, queue_size=10, queue_timeout_ms=1000, account_rate=0, account_burst=1,
+                   global_rate=0, global_burst=1)
+    options.update(overrides)
+    return WriteAdmission(**options)
+
+
+def test_token_bucket_refills_at_its_rate():
+    bucket = TokenBucket(rate=2.0, burst=2, now=0.0)
+    assert bucket.take(now=0.0) == 0.0
+    assert bucket.take(now=0.0) == 0.0
+    assert bucket.take(now=0.0) == pytest.approx(0.5)
+    assert bucket.take(now=0.5) == 0.0
+    # Idle time never banks more than the burst
+    bucket.take(now=100.0), bucket.take(now=100.0)
+    assert bucket.take(now=100.0) > 0
+
+
+def test_token_bucket_takes_all_or_nothing():
+    bucket = TokenBucket(rate=1.0, burst=5, now=0.0)
+    assert bucket.take(3, now=0.0) == 0.0
+    assert bucket.take(3, now=0.0) == pytest.approx(1.0)
+    assert bucket.tokens == pytest.approx(2.0)
+    bucket.refund(10)
+    assert bucket.tokens == 5
+
+
+def test_account_rate_limits_each_account_separately():
+    gate = admission(account_rate=0.5, account_burst=2)
+    gate.check_rate(1)
+    gate.check_rate(1)
+    gate.check_rate(2)
+    with pytest.raises(AdmissionRejected) as excinfo:
+        gate.check_rate(1)
+    assert (excinfo.value.status_code, excinfo.value.reason) == (429, "account_rate")
+    assert excinfo.value.retry_after == 2
+
+
+def test_global_rate_is_shared():
+    gate = admission(global_rate=1, global_burst=1)
+    gate.check_rate(1)
+    with pytest.raises(AdmissionRejected) as excinfo:
+        gate.check_rate(2)
+    assert (excinfo.value.status_code, excinfo.value.reason) == (503, "global_rate")
+
+
+def test_global_rejection_does_not_charge_the_account():
+    gate = admission(account_rate=0.01, account_burst=1, global_rate=0.01, global_burst=1)
+    gate.check_rate(1)
+    with pytest.raises(AdmissionRejected):
+        gate.check_rate(2)
+    assert gate._accounts[2].tokens == pytest.approx(1.0, abs=0.01)
+
+
+def test_batch_rate_admits_each_account_up_to_its_tokens():
+    gate = admission(account_rate=0.01, account_burst=2)
+    verdicts = gate.check_batch_rate([1, 2, 1, 1, 2])
+    assert [v and (v.status_code, v.reason) for v in verdicts] == [
+        None, None, None, (429, "account_rate"), None,
+    ]
+    assert gate._accounts[1].tokens == pytest.approx(0.0, abs=0.01)
+
+
+def test_batch_rate_refunds_accounts_rejected_globally():
+    gate = admission(account_rate=0.01, account_burst=5, global_rate=0.01, global_burst=2)
+    verdicts = gate.check_batch_rate([1, 1, 1])
+    assert [v and v.status_code for v in verdicts] == [None, None, 503]
+    assert gate._accounts[1].tokens == pytest.approx(3.0, abs=0.01)
+
+
+def test_tracked_accounts_are_bounded():
+    gate = admission(account_rate=1, account_burst=1, max_tracked_accounts=2)
+    for account_id in (1, 2, 3):
+        gate.check_rate(account_id)
+    assert list(gate._accounts) == [2, 3]
+    gate.check_rate(1)  # evicted, so it starts again with a full bucket
+
+
+def test_writers_are_serialized_in_arrival_order():
+    gate = admission(concurrency=1)
+    order, active = [], []
+
+    async def write(n):
+        async with gate.writer():
+            active.append(n)
+            assert len(active) == 1
+            await asyncio.sleep(0)
+            order.append(n)
+            active.remove(n)
+
+    async def run():
+        await asyncio.gather(*(write(n) for n in range(5)))
+
+    asyncio.run(run())
+    assert order == [0, 1, 2, 3, 4]
+    assert gate._in_flight == 0 and gate.queued == 0
+
+
+def test_full_queue_is_shed_with_retry_after():
+    gate = admission(concurrency=1, queue_size=1)
+
+    async def run():
+        release = asyncio.Event()
+
+        async def hold(shed=True):
+            async with gate.writer(shed=shed):
+                await release.wait()
+
+        holder = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        with pytest.raises(AdmissionRejected) as excinfo:
+            async with gate.writer():
+                pass
+        # Work that must not be dropped still queues
+        unshed = asyncio.create_task(hold(shed=False))
+        await asyncio.sleep(0)
+        assert gate.queued == 2
+        release.set()
+        await asyncio.gather(holder, waiter, unshed)
+        return excinfo.value
+
+    rejected = asyncio.run(run())
+    assert (rejected.status_code, rejected.reason, rejected.retry_after) == (503, "queue_full", 1)
+    assert gate._in_flight == 0
+
+
+def test_queue_timeout_rejects_waiters_that_wait_too_long():
+    gate = admission(concurrency=1, queue_timeout_ms=20)
+
+    async def run():
+        release = asyncio.Event()
+
+        async def hold():
+            async with gate.writer():
+                await release.wait()
+
+        holder = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        with pytest.raises(AdmissionRejected) as excinfo:
+            async with gate.writer():
+                pass
+        assert gate.queued == 0
+        release.set()
+        await holder
+        return excinfo.value
+
+    assert asyncio.run(run()).reason == "queue_timeout"
+    assert gate._in_flight == 0
+
+
+def test_rate_limited_transfer_returns_429(api, new_account, monkeypatch):
+    source, target = new_account(balance_cents=500), new_account()
+    monkeypatch.setattr(payments_main, "WRITE_ADMISSION", admission(account_rate=0.01, account_burst=1))
+    body = {"fromAccountId": source, "toAccountId": target, "amountCents": 100, "currency": "USD"}
+    assert api.post("/transfers", json=body).status_code == 200
+    resp = api.post("/transfers", json=body)
+    assert resp.status_code == 429
+    assert int(resp.headers["Retry-After"]) >= 1
+    assert api.get(f"/accounts/{source}").json()["balanceCents"] == 400
+
+
+def test_overloaded_writes_return_503(api, new_account, monkeypatch):
+    source, target = new_account(balance_cents=500), new_account()
+    monkeypatch.setattr(payments_main, "WRITE_ADMISSION", admission(global_rate=0.01, global_burst=1))
+    body = {"fromAccountId": source, "toAccountId": target, "amountCents": 100, "currency": "USD"}
+    api.post("/transfers", json=body)
+    resp = api.post("/transfers", json=body)
+    assert resp.status_code == 503
+    assert "Retry-After" in resp.headers
+
+
+def test_batch_larger_than_the_burst_gets_per_item_429s(api, new_account, monkeypatch):
+    source, target = new_account(balance_cents=1000), new_account()
+    gate = admission(account_rate=0.01, account_burst=3)
+    monkeypatch.setattr(payments_main, "WRITE_ADMISSION", gate)
+    item = {"fromAccountId": source, "toAccountId": target, "amountCents": 100, "currency": "USD"}
+    resp = api.post("/transfers/batch", json={"transfers": [item] * 5})
+    assert resp.status_code == 200
+    results = resp.json()["results"]
+    assert [r["status"] for r in results] == [200, 200, 200, 429, 429]
+    assert results[3]["retryAfter"] >= 1
+    assert api.get(f"/accounts/{source}").json()["balanceCents"] == 700
+
+    # Once the bucket refills, the rejected items go through
+    gate._accounts[source].tokens = 3.0
+    resp = api.post("/transfers/batch", json={"transfers": [item] * 2})
+    assert [r["status"] for r in resp.json()["results"]] == [200, 200]
+    assert api.get(f"/accounts/{source}").json()["balanceCents"] == 500
@@ -0,0 +1,56 @@
+import pytest
+
+from payments.caching import etag_matches, make_etag
+
+
+def test_etag_matching_is_weak_and_handles_lists():
+    etag = make_etag("acct", 1, 5, 100)
+    assert etag == 'W/"acct-1-5-100"'
+    assert etag_matches(etag, etag)
+    assert etag_matches('"acct-1-5-100"', etag)
+    assert etag_matches('W/"other", W/"acct-1-5-100"', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches(None, etag)
+    assert not etag_matches('W/"acct-1-5-10"', etag)
+
+
+def test_account_etag_revalidates_until_the_ledger_changes(api, new_account):
+    account_id = new_account(balance_cents=100)
+    first = api.get(f"/accounts/{account_id}")
+    etag = first.headers["ETag"]
+    assert first.headers["Cache-Control"] == "no-cache"
+
+    unchanged = api.get(f"/accounts/{account_id}", headers={"If-None-Match": etag})
+    assert unchanged.status_code == 304
+    assert unchanged.headers["ETag"] == etag
+    assert unchanged.content == b""
+
+    api.post(f"/accounts/{account_id}/deposit", json={"amountCents": 50, "currency": "USD", "simulate": True})
+    changed = api.get(f"/accounts/{account_id}", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.json()["balanceCents"] == 150
+    assert changed.headers["ETag"] != etag
+
+
+def test_transactions_etag_depends_on_limit_and_postings(api, new_account):
+    account_id = new_account(balance_cents=100)
+    etag = api.get("/transactions", params={"accountId": account_id, "limit": 5}).headers["ETag"]
+    assert api.get("/transactions", params={"accountId": account_id, "limit": 5},
+                   headers={"If-None-Match": etag}).status_code == 304
+    assert api.get("/transactions", params={"accountId": account_id, "limit": 6},
+                   headers={"If-None-Match": etag}).status_code == 200
+    api.post(f"/accounts/{account_id}/deposit", json={"amountCents": 1, "currency": "USD", "simulate": True})
+    assert api.get("/transactions", params={"accountId": account_id, "limit": 5},
+                   headers={"If-None-Match": etag}).status_code == 200
+
+
+@pytest.mark.parametrize("deposits, compressed", [(1, False), (40, True)])
+def test_large_bodies_are_gzip_compressed(api, new_account, deposits, compressed):
+    account_id = new_account()
+    for _ in range(deposits):
+        api.post(f"/accounts/{account_id}/deposit", json={"amountCents": 1, "currency": "USD", "simulate": True})
+    resp = api.get("/transactions", params={"accountId": account_id, "limit": 100},
+                   headers={"Accept-Encoding": "gzip"})
+    assert resp.status_code == 200
+    assert (resp.headers.get("Content-Encoding") == "gzip") is compressed
+    assert len(resp.json()["items"]) == deposits
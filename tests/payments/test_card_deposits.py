@@ -0,0 +1,237 @@
+import asyncio
+import base64
+import json
+import logging
+
+import httpx
+import pytest
+
+import payments.main as payments_main
+import payments.processors as processors
+from payments.metrics import CAPTURE_REVERSALS
+from payments.processors.base import ACCEPT, DECLINE, ProcessorError, ProcessorResult
+from payments.processors.cybersource import CyberSourceProcessor
+from payments.processors.simulator import SimulatorProcessor
+
+
+class RecordingProcessor(SimulatorProcessor):
+    """
+    Zero-latency simulator that records every call; capture and void_capture outcomes can be forced.
+    """
+
+    def __init__(self):
+        super().__init__(latency_ms=0, jitter_ms=0)
+        self.calls = []
+        self.capture_decision = ACCEPT
+        self.void_capture_error = None
+
+    async def authorize(self, amount_cents, currency, token, reference):
+        result = await super().authorize(amount_cents, currency, token, reference)
+        self.calls.append(("authorize", result.transaction_id))
+        return result
+
+    async def capture(self, authorization_id, amount_cents, currency, reference):
+        result = await super().capture(authorization_id, amount_cents, currency, reference)
+        if self.capture_decision != ACCEPT:
+            result = ProcessorResult(decision=self.capture_decision, status="DECLINED")
+        self.calls.append(("capture", result.transaction_id))
+        return result
+
+    async def void(self, transaction_id, reference):
+        self.calls.append(("void", transaction_id))
+        return await super().void(transaction_id, reference)
+
+    async def void_capture(self, capture_id, reference):
+        self.calls.append(("void_capture", capture_id))
+        if self.void_capture_error is not None:
+            raise self.void_capture_error
+        return await super().void_capture(capture_id, reference)
+
+    def ids(self, operation):
+        return [tx for op, tx in self.calls if op == operation]
+
+
+@pytest.fixture
+def processor(monkeypatch):
+    recording = RecordingProcessor()
+    monkeypatch.setattr(processors, "_processor", recording)
+    return recording
+
+
+def card_deposit(api, account_id, amount_cents=2000, token="tok_visa", key=None):
+    return api.post(
+        f"/accounts/{account_id}/deposit",
+        json={"amountCents": amount_cents, "currency": "USD", "simulate": False, "flexToken": token},
+        headers={"Idempotency-Key": key} if key else {},
+    )
+
+
+def balance(api, account_id):
+    return api.get(f"/accounts/{account_id}").json()["balanceCents"]
+
+
+def reversals(outcome):
+    return CAPTURE_REVERSALS._values.get((outcome,), 0)
+
+
+def test_card_deposit_authorizes_captures_and_credits(api, new_account, processor):
+    account_id = new_account()
+    resp = card_deposit(api, account_id)
+    assert resp.status_code == 200, resp.text
+    assert resp.json()["newBalanceCents"] == 2000
+    assert [op for op, _ in processor.calls] == ["authorize", "capture"]
+    assert balance(api, account_id) == 2000
+
+
+def test_idempotent_replay_does_not_charge_again(api, new_account, processor):
+    account_id = new_account()
+    first = card_deposit(api, account_id, key="card-replay")
+    replay = card_deposit(api, account_id, key="card-replay")
+    assert replay.status_code == 200
+    assert replay.json() == first.json()
+    assert len(processor.ids("authorize")) == 1
+    assert balance(api, account_id) == 2000
+
+
+def test_flex_token_is_required(api, new_account, processor):
+    resp = api.post(f"/accounts/{new_account()}/deposit",
+                    json={"amountCents": 100, "currency": "USD", "simulate": False})
+    assert resp.status_code == 400
+    assert processor.calls == []
+
+
+@pytest.mark.parametrize("token", ["tok_decline_card", "tok_error_gateway"])
+def test_failed_authorization_is_not_credited(api, new_account, processor, token):
+    account_id = new_account()
+    resp = card_deposit(api, account_id, token=token)
+    assert resp.status_code == 402
+    assert processor.ids("capture") == []
+    assert balance(api, account_id) == 0
+
+
+def test_declined_capture_voids_the_authorization(api, new_account, processor):
+    account_id = new_account()
+    processor.capture_decision = DECLINE
+    resp = card_deposit(api, account_id)
+    assert resp.status_code == 402
+    assert processor.ids("void") == processor.ids("authorize")
+    assert processor.ids("void_capture") == []
+    assert balance(api, account_id) == 0
+
+
+def test_ledger_failure_reverses_the_capture(api, new_account, processor, monkeypatch):
+    account_id = new_account()
+
+    def ledger_down(*args):
+        raise RuntimeError("ledger unavailable")
+
+    monkeypatch.setattr(payments_main, "_run_credit_deposit", ledger_down)
+    before = reversals("reversed")
+    with pytest.raises(RuntimeError):
+        card_deposit(api, account_id)
+    # The capture itself is reversed; voiding only the authorization would keep the money
+    assert processor.ids("void_capture") == processor.ids("capture")
+    assert processor.ids("void") == []
+    assert reversals("reversed") == before + 1
+    assert balance(api, account_id) == 0
+
+
+def test_concurrent_duplicate_reverses_the_second_capture(api, new_account, processor, monkeypatch):
+    account_id = new_account()
+    first = card_deposit(api, account_id, key="card-race")
+    credit = payments_main._run_credit_deposit
+
+    def lost_race(*args):
+        # The pre-check missed the key, so this request charged the card; the credit then replays
+        response, created = credit(*args)
+        assert not created
+        return response, created
+
+    monkeypatch.setattr(payments_main, "_run_check_deposit", lambda account_id, key: None)
+    monkeypatch.setattr(payments_main, "_run_credit_deposit", lost_race)
+    second = card_deposit(api, account_id, key="card-race")
+
+    assert second.json() == first.json()
+    captures = processor.ids("capture")
+    assert len(captures) == 2
+    assert processor.ids("void_capture") == [captures[1]]
+    assert balance(api, account_id) == 2000
+
+
+def test_failed_reversal_is_logged_and_counted(api, new_account, processor, monkeypatch, caplog):
+    account_id = new_account()
+    processor.void_capture_error = ProcessorError("gateway timeout")
+
+    def ledger_down(*args):
+        raise RuntimeError("ledger unavailable")
+
+    monkeypatch.setattr(payments_main, "_run_credit_deposit", ledger_down)
+    before = reversals("failed")
+    with caplog.at_level(logging.ERROR, logger="payments.main"), pytest.raises(RuntimeError):
+        card_deposit(api, account_id)
+    assert reversals("failed") == before + 1
+    capture_id = processor.ids("capture")[0]
+    assert any(capture_id in r.getMessage() and "gateway timeout" in r.getMessage() for r in caplog.records)
+
+
+# ---- CyberSource adapter ----
+
+def _cybersource(handler):
+    adapter = CyberSourceProcessor(
+        merchant_id="merchant", key_id="key", shared_secret=base64.b64encode(b"secret").decode(),
+    )
+    adapter._client = httpx.AsyncClient(base_url=f"https://{adapter.host}", transport=httpx.MockTransport(handler))
+    return adapter
+
+
+def _run(adapter, call):
+    async def go():
+        try:
+            return await call(adapter)
+        finally:
+            await adapter.aclose()
+
+    return asyncio.run(go())
+
+
+def test_cybersource_void_capture_posts_to_the_capture_voids_endpoint():
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(201, json={"id": "void-1", "status": "VOIDED"})
+
+    result = _run(_cybersource(handler), lambda a: a.void_capture("cap-123", "ref-1"))
+    assert result.accepted and result.transaction_id == "void-1"
+    request = requests[0]
+    assert request.url.path == "/pts/v2/captures/cap-123/voids"
+    assert json.loads(request.content) == {"clientReferenceInformation": {"code": "ref-1"}}
+    assert 'keyid="key"' in request.headers["Signature"]
+    assert request.headers["Digest"].startswith("SHA-256=")
+
+
+@pytest.mark.parametrize("status_code, body, decision", [
+    (201, {"id": "auth-1", "status": "AUTHORIZED"}, "ACCEPT"),
+    (201, {"id": "auth-1", "status": "DECLINED", "errorInformation": {"reason": "INSUFFICIENT_FUND"}}, "DECLINE"),
+    (400, {"status": "INVALID_REQUEST", "reason": "MISSING_FIELD"}, "DECLINE"),
+    (502, {}, "ERROR"),
+])
+def test_cybersource_decisions(status_code, body, decision):
+    result = _run(
+        _cybersource(lambda request: httpx.Response(status_code, json=body)),
+        lambda a: a.authorize(1050, "USD", "jwt", "ref"),
+    )
+    assert result.decision == decision
+
+
+def test_cybersource_transport_errors_raise_processor_error():
+    def handler(request):
+        raise httpx.ConnectError("refused", request=request)
+
+    with pytest.raises(ProcessorError):
+        _run(_cybersource(handler), lambda a: a.capture("auth-1", 1050, "USD", "ref"))
+
+
+def test_cybersource_requires_credentials():
+    with pytest.raises(ProcessorError):
+        CyberSourceProcessor(merchant_id=None, key_id=None, shared_secret=None)
@@ -0,0 +1,58 @@
+import json
+import os
+import subprocess
+import sys
+
+from sqlalchemy import text
+
+from conftest import REPO_ROOT, TMP_DIR
+from payments import db as payments_db
+
+
+def test_service_import_defers_optional_clients():
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(TMP_DIR, 'cold-start.db')}")
+    code = (
+        "import json, sys; import payments.main; "
+        "print(json.dumps({m: m in sys.modules for m in "
+        "('httpx', 'dotenv', 'payments.processors.simulator', 'payments.processors.cybersource')}))"
+    )
+    out = subprocess.run([sys.executable, "-c", code], cwd=REPO_ROOT, env=env, capture_output=True, text=True,
+                         check=True)
+    assert json.loads(out.stdout.strip().splitlines()[-1]) == {
+        "httpx": False, "dotenv": False,
+        "payments.processors.simulator": False, "payments.processors.cybersource": False,
+    }
+
+
+def test_startup_with_a_current_schema_skips_create_all(api, monkeypatch):
+    assert payments_db._stored_schema_version() == payments_db.SCHEMA_VERSION
+
+    def create_all(*args, **kwargs):
+        raise AssertionError("create_all should not run")
+
+    monkeypatch.setattr(payments_db.Base.metadata, "create_all", create_all)
+    payments_db.init_db()
+
+
+def test_older_schema_is_upgraded(api, monkeypatch):
+    calls = []
+    create_all = payments_db.Base.metadata.create_all
+    monkeypatch.setattr(payments_db.Base.metadata, "create_all",
+                        lambda *args, **kwargs: calls.append(1) or create_all(*args, **kwargs))
+    with payments_db.engine.begin() as conn:
+        conn.execute(text("UPDATE schema_meta SET version = 1 WHERE id = 1"))
+    payments_db.init_db()
+    assert calls == [1]
+    assert payments_db._stored_schema_version() == payments_db.SCHEMA_VERSION
+
+
+def test_missing_schema_meta_reads_as_version_zero(monkeypatch):
+    class NoTable:
+        def __enter__(self):
+            raise payments_db.OperationalError("SELECT", {}, Exception("no such table: schema_meta"))
+
+        def __exit__(self, *exc):
+            return False
+
+    monkeypatch.setattr(payments_db.engine, "connect", lambda: NoTable())
+    assert payments_db._stored_schema_version() == 0
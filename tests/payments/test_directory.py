@@ -0,0 +1,117 @@
+import dataclasses
+
+import pytest
+from sqlalchemy import select
+
+import payments.main as payments_main
+from conftest import unique_email
+from payments.db import User, read_session_scope
+from payments.directory import ACCOUNT_DIRECTORY, AccountDirectory, chunked
+from payments.metrics import DIRECTORY_LOOKUPS
+
+
+def lookups(result):
+    return DIRECTORY_LOOKUPS._values.get((result,), 0)
+
+
+def bulk(api, *users):
+    resp = api.post("/accounts/bulk", json={"users": list(users)})
+    assert resp.status_code == 200, resp.text
+    return resp.json()
+
+
+def test_bulk_creates_then_reuses_accounts(api):
+    emails = [unique_email("bulk") for _ in range(3)]
+    first = bulk(api, *({"email": e, "name": f"User {i}"} for i, e in enumerate(emails)))
+    assert (first["createdUsers"], first["createdAccounts"]) == (3, 3)
+    assert [a["email"] for a in first["accounts"]] == emails
+    assert all(a["created"] and a["balanceCents"] == 0 and a["currency"] == "USD" for a in first["accounts"])
+
+    newcomer = unique_email("bulk")
+    second = bulk(api, {"email": emails[0]}, {"email": newcomer})
+    assert (second["createdUsers"], second["createdAccounts"]) == (1, 1)
+    reused, created = second["accounts"]
+    assert reused["accountId"] == first["accounts"][0]["accountId"] and not reused["created"]
+    assert created["created"]
+
+
+def test_bulk_merges_duplicates_and_updates_names(api):
+    email = unique_email("rename")
+    bulk(api, {"email": email, "name": "Old"})
+    result = bulk(api, {"email": email, "name": "New"}, {"email": email})
+    assert len(result["accounts"]) == 1
+    with read_session_scope() as db:
+        assert db.execute(select(User.name).where(User.email == email)).scalar_one() == "New"
+
+
+def test_bulk_matches_single_account_creation(api):
+    email = unique_email("single")
+    single = api.post("/accounts", json={"email": email, "name": "Single"}).json()
+    (item,) = bulk(api, {"email": email})["accounts"]
+    assert (item["userId"], item["accountId"]) == (single["userId"], single["accountId"])
+
+
+def test_bulk_rejects_oversized_requests(api, monkeypatch):
+    monkeypatch.setattr(payments_main, "SETTINGS", dataclasses.replace(payments_main.SETTINGS, accounts_bulk_max=2))
+    resp = api.post("/accounts/bulk", json={"users": [{"email": unique_email()} for _ in range(3)]})
+    assert resp.status_code == 413
+
+
+def test_by_email_resolves_known_and_reports_missing(api):
+    known = [unique_email("known") for _ in range(2)]
+    created = {a["email"]: a for a in bulk(api, *({"email": e} for e in known))["accounts"]}
+    unknown = unique_email("unknown")
+    resp = api.get("/accounts/by-email", params={"email": [known[0], unknown, known[1], known[0]]})
+    body = resp.json()
+    assert body["missing"] == [unknown]
+    assert body["accounts"] == {
+        e: {"userId": created[e]["userId"], "accountId": created[e]["accountId"]} for e in known
+    }
+
+
+def test_by_email_caches_hits_but_not_unknown_emails(api):
+    email = unique_email("cache")
+    account = api.post("/accounts", json={"email": email}).json()
+    ACCOUNT_DIRECTORY._entries.pop(email, None)
+
+    hits, misses = lookups("hit"), lookups("miss")
+    api.get("/accounts/by-email", params={"email": email})
+    assert (lookups("hit"), lookups("miss")) == (hits, misses + 1)
+    api.get("/accounts/by-email", params={"email": email})
+    assert (lookups("hit"), lookups("miss")) == (hits + 1, misses + 1)
+    assert ACCOUNT_DIRECTORY.get(email) == (account["userId"], account["accountId"])
+
+    # An unknown email is looked up again next time, so it resolves once provisioned
+    later = unique_email("later")
+    assert api.get("/accounts/by-email", params={"email": later}).json()["missing"] == [later]
+    assert ACCOUNT_DIRECTORY.get(later) is None
+    bulk(api, {"email": later})
+    assert later in api.get("/accounts/by-email", params={"email": later}).json()["accounts"]
+
+
+def test_directory_is_a_bounded_lru():
+    directory = AccountDirectory(max_entries=2)
+    directory.remember("a@x.com", 1, 10)
+    directory.remember("b@x.com", 2, 20)
+    assert directory.get("a@x.com") == (1, 10)
+    directory.remember("c@x.com", 3, 30)
+    assert directory.get("b@x.com") is None
+    assert len(directory) == 2
+    disabled = AccountDirectory(max_entries=0)
+    disabled.remember("a@x.com", 1, 10)
+    assert len(disabled) == 0
+
+
+@pytest.mark.parametrize("size, expected", [(2, [["a", "b"], ["c"]]), (5, [["a", "b", "c"]])])
+def test_chunked(size, expected):
+    assert list(chunked(["a", "b", "c"], size)) == expected
+
+
+def test_balances_by_email(api):
+    funded = unique_email("funded")
+    account_id = api.post("/accounts", json={"email": funded}).json()["accountId"]
+    api.post(f"/accounts/{account_id}/deposit", json={"amountCents": 250, "currency": "USD", "simulate": True})
+    unknown = unique_email("nobody")
+    assert api.post("/accounts/balances", json={"emails": [funded, unknown, funded]}).json() == {
+        "balances": {funded: 250}, "missing": [unknown],
+    }
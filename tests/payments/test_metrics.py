@@ -0,0 +1,80 @@
+import re
+
+from payments.metrics import CONTENT_TYPE, Registry, statement_class
+
+
+def sample(text, name, **labels):
+    """
+    Value of the first series `name` whose labels include `labels`, or None.
+    """
+    for line in text.splitlines():
+        match = re.match(r"^(\w+)(?:\{(.*)\})? (\S+)$", line)
+        if not match or match.group(1) != name:
+            continue
+        found = dict(re.findall(r'(\w+)="((?:[^"\\]|\\.)*)"', match.group(2) or ""))
+        if all(found.get(k) == str(v) for k, v in labels.items()):
+            return float(match.group(3))
+    return None
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = Registry()
+    latency = registry.histogram("test_seconds", "Test latency", ("route",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 3.0):
+        latency.observe(value, route="/a")
+    text = registry.render()
+    assert "# TYPE test_seconds histogram" in text
+    assert sample(text, "test_seconds_bucket", route="/a", le="0.1") == 1
+    assert sample(text, "test_seconds_bucket", route="/a", le="1") == 3
+    assert sample(text, "test_seconds_bucket", route="/a", le="+Inf") == 4
+    assert sample(text, "test_seconds_count", route="/a") == 4
+    assert sample(text, "test_seconds_sum", route="/a") == 4.05
+
+
+def test_counter_label_values_are_escaped():
+    registry = Registry()
+    counter = registry.counter("test_total", "Test counter", ("path",))
+    counter.inc(path='a"b\\c')
+    counter.inc(2, path='a"b\\c')
+    assert 'test_total{path="a\\"b\\\\c"} 3' in registry.render()
+
+
+def test_statement_classes():
+    assert statement_class("  select * from accounts") == "SELECT"
+    assert statement_class("BEGIN IMMEDIATE") == "BEGIN"
+    assert statement_class("VACUUM") == "OTHER"
+    assert statement_class("") == "OTHER"
+
+
+def test_metrics_endpoint_uses_route_templates(api, new_account):
+    account_id = new_account(balance_cents=100)
+    api.get(f"/accounts/{account_id}")
+    api.get("/accounts/999999999")
+    resp = api.get("/metrics")
+    assert resp.status_code == 200
+    assert resp.headers["content-type"] == CONTENT_TYPE
+    text = resp.text
+    assert sample(text, "payments_http_requests_total", method="GET", route="/accounts/{account_id}", status=200) >= 1
+    assert sample(text, "payments_http_outcomes_total", route="/accounts/{account_id}", outcome="not_found") >= 1
+    assert sample(text, "payments_http_request_duration_seconds_count", method="GET",
+                  route="/accounts/{account_id}") >= 2
+    # Raw paths never become labels
+    assert f'route="/accounts/{account_id}"' not in text
+
+
+def test_db_statements_and_lock_waits_are_timed(api, new_account):
+    new_account(balance_cents=100)
+    text = api.get("/metrics").text
+    assert sample(text, "payments_db_statement_duration_seconds_count", statement="INSERT") >= 1
+    assert sample(text, "payments_db_statement_duration_seconds_count", statement="SELECT") >= 1
+    assert sample(text, "payments_db_lock_wait_seconds_count") >= 1
+
+
+def test_idempotency_lookups_are_counted(api, new_account):
+    source, target = new_account(balance_cents=500), new_account()
+    body = {"fromAccountId": source, "toAccountId": target, "amountCents": 100, "currency": "USD"}
+    labels = {"route": "POST /transfers", "result": "hit"}
+    before = sample(api.get("/metrics").text, "payments_idempotency_lookups_total", **labels) or 0
+    for _ in range(2):
+        api.post("/transfers", json=body, headers={"Idempotency-Key": f"metrics-{source}"})
+    assert sample(api.get("/metrics").text, "payments_idempotency_lookups_total", **labels) == before + 1
@@ -0,0 +1,144 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import func, select
+from starlette.applications import Starlette
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+
+import payments.main as payments_main
+from payments.caching import SkipCompression
+from payments.db import OutboxEvent, read_session_scope
+
+
+def tail():
+    with read_session_scope() as db:
+        return db.execute(select(func.max(OutboxEvent.id))).scalar() or 0
+
+
+def transfer(api, source, target, amount_cents):
+    return api.post("/transfers", json={"fromAccountId": source, "toAccountId": target,
+                                        "amountCents": amount_cents, "currency": "USD"})
+
+
+def test_feed_returns_postings_in_commit_order(api, new_account):
+    source, target = new_account(balance_cents=1000), new_account()
+    cursor = tail()
+    first = transfer(api, source, target, 100).json()
+    second = transfer(api, source, target, 200).json()
+    page = api.get("/events", params={"after": cursor, "timeout": 0}).json()
+    events = page["events"]
+    assert [e["type"] for e in events] == ["transfer.posted", "transfer.posted"]
+    assert [e["data"]["transferGroupId"] for e in events] == [first["transferGroupId"], second["transferGroupId"]]
+    assert events[0]["id"] < events[1]["id"] == page["next"]
+    assert events[1]["data"]["fromBalanceCents"] == 700
+    assert events[1]["data"]["toBalanceCents"] == 300
+
+
+def test_cursor_pages_through_the_feed(api, new_account):
+    cursor = tail()
+    accounts = [new_account(balance_cents=100) for _ in range(3)]
+    seen = []
+    while True:
+        page = api.get("/events", params={"after": cursor, "limit": 2, "timeout": 0}).json()
+        if not page["events"]:
+            assert page["next"] == cursor
+            break
+        assert len(page["events"]) <= 2
+        seen.extend(e["data"]["accountId"] for e in page["events"])
+        cursor = page["next"]
+    assert seen == accounts
+
+
+def test_rejected_postings_record_no_event(api, new_account):
+    source, target = new_account(balance_cents=50), new_account()
+    cursor = tail()
+    assert transfer(api, source, target, 100).status_code == 402
+    assert tail() == cursor
+
+
+def test_events_roll_back_with_their_posting(api, new_account, monkeypatch):
+    source, target = new_account(balance_cents=500), new_account()
+    cursor = tail()
+
+    def feed_down(*args, **kwargs):
+        raise RuntimeError("outbox insert failed")
+
+    monkeypatch.setattr(payments_main, "record_event", feed_down)
+    with pytest.raises(RuntimeError):
+        transfer(api, source, target, 100)
+    assert tail() == cursor
+    assert api.get(f"/accounts/{source}").json()["balanceCents"] == 500
+
+
+def test_long_poll_waits_then_times_out(api):
+    started = time.perf_counter()
+    page = api.get("/events", params={"after": tail(), "timeout": 0.2}).json()
+    assert page["events"] == []
+    assert time.perf_counter() - started >= 0.2
+
+
+def test_long_poll_wakes_on_commit(api, new_account):
+    source, target = new_account(balance_cents=500), new_account()
+    cursor = tail()
+    timer = threading.Timer(0.1, transfer, args=(api, source, target, 100))
+    timer.start()
+    started = time.perf_counter()
+    try:
+        page = api.get("/events", params={"after": cursor, "timeout": 10}).json()
+    finally:
+        timer.join()
+    assert [e["data"]["fromAccountId"] for e in page["events"]] == [source]
+    assert time.perf_counter() - started < 5
+
+
+class _Disconnects:
+    """
+    Request stand-in for the SSE generator: reports a disconnect after `polls` checks.
+    """
+
+    def __init__(self, polls):
+        self.polls = polls
+
+    async def is_disconnected(self):
+        self.polls -= 1
+        return self.polls < 0
+
+
+def _stream(after, last_event_id=None):
+    async def collect():
+        response = await payments_main.stream_events(_Disconnects(1), after=after, last_event_id=last_event_id)
+        return response, [chunk async for chunk in response.body_iterator]
+
+    return asyncio.run(collect())
+
+
+def test_stream_sends_one_chunk_per_event_and_resumes(api, new_account):
+    cursor = tail()
+    accounts = [new_account(balance_cents=100) for _ in range(3)]
+    response, chunks = _stream(cursor)
+    assert response.media_type == "text/event-stream"
+    assert len(chunks) == 3
+    ids = [int(chunk.split(b"\n")[0][len(b"id: "):]) for chunk in chunks]
+    assert ids == sorted(ids) and ids[0] > cursor
+    assert all(chunk.startswith(b"id: ") and b"\nevent: deposit.posted\ndata: " in chunk for chunk in chunks)
+    assert str(accounts[0]).encode() in chunks[0]
+    # Last-Event-ID wins over ?after on reconnect
+    _, resumed = _stream(0, last_event_id=str(ids[1]))
+    assert resumed == chunks[2:]
+
+
+def test_skip_compression_leaves_listed_paths_alone():
+    body = "x" * 2000
+    inner = Starlette(routes=[
+        Route("/events/stream", lambda request: PlainTextResponse(body)),
+        Route("/transactions", lambda request: PlainTextResponse(body)),
+    ])
+    client = TestClient(SkipCompression(inner, compressor=GZipMiddleware, paths=("/events/stream",), minimum_size=500))
+    headers = {"Accept-Encoding": "gzip"}
+    assert "content-encoding" not in client.get("/events/stream", headers=headers).headers
+    assert client.get("/transactions", headers=headers).headers["content-encoding"] == "gzip"
@@ -0,0 +1,55 @@
+import threading
+import time
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from payments import db as payments_db
+
+
+def test_read_engine_is_a_separate_read_only_pool():
+    assert payments_db.IS_SQLITE_FILE
+    assert payments_db.read_engine is not payments_db.engine
+    assert payments_db.read_engine.url.query.get("mode") == "ro"
+
+
+def test_read_sessions_reject_writes(api):
+    with payments_db.read_session_scope() as db:
+        with pytest.raises(OperationalError):
+            db.execute(text("UPDATE accounts SET balance_cents = balance_cents + 1"))
+
+
+def test_reads_see_committed_writes(api, new_account):
+    account_id = new_account(balance_cents=1234)
+    resp = api.get(f"/accounts/{account_id}")
+    assert resp.status_code == 200
+    assert resp.json()["balanceCents"] == 1234
+    items = api.get("/transactions", params={"accountId": account_id}).json()["items"]
+    assert [i["amountCents"] for i in items] == [1234]
+
+
+def test_reads_are_not_blocked_by_a_writer_holding_the_lock(api, new_account):
+    account_id = new_account(balance_cents=500)
+    locked, release = threading.Event(), threading.Event()
+
+    def writer():
+        with payments_db.session_scope() as db:
+            payments_db.begin_immediate(db)
+            locked.set()
+            release.wait(10)
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    try:
+        assert locked.wait(5)
+        started = time.perf_counter()
+        resp = api.get(f"/accounts/{account_id}")
+        elapsed = time.perf_counter() - started
+    finally:
+        release.set()
+        thread.join()
+    assert resp.status_code == 200
+    assert resp.json()["balanceCents"] == 500
+    # Well under the busy timeout a writer-blocked read would wait for
+    assert elapsed < 1.0
@@ -0,0 +1,40 @@
+import datetime as dt
+
+import pytest
+from fastapi.responses import JSONResponse
+
+from payments.responses import TRANSACTION_COLUMNS, FastJSONResponse, dumps, transaction_items
+from payments.schemas import Transaction
+
+
+@pytest.mark.parametrize("content", [
+    {"accountId": 1, "items": []},
+    {"items": [{"id": 3, "type": "deposit", "transferGroupId": None, "note": "café ☕"}]},
+    {"big": 2**70, "negative": -1, "nested": {"list": [1, "two", None]}},
+])
+def test_fast_response_is_byte_identical_to_fastapi(content):
+    assert FastJSONResponse(content).body == JSONResponse(content).body
+    assert dumps(content) == JSONResponse(content).body
+
+
+def test_transaction_items_match_the_schema():
+    created = dt.datetime(2026, 1, 2, 3, 4, 5, 678000)
+    row = (7, 2, "transfer_out", "posted", 1500, "USD", "group-1", None, created)
+    [item] = transaction_items([row])
+    assert len(row) == len(TRANSACTION_COLUMNS)
+    assert item == {
+        "id": 7, "accountId": 2, "type": "transfer_out", "status": "posted", "amountCents": 1500,
+        "currency": "USD", "transferGroupId": "group-1", "relatedEntryId": None,
+        "createdAt": "2026-01-02T03:04:05.678000Z",
+    }
+    assert set(item) == set(Transaction.model_fields)
+
+
+def test_transactions_endpoint_lists_newest_first(api, new_account):
+    source, target = new_account(balance_cents=1000), new_account()
+    api.post("/transfers", json={"fromAccountId": source, "toAccountId": target, "amountCents": 300, "currency": "USD"})
+    resp = api.get("/transactions", params={"accountId": source, "limit": 10})
+    assert resp.status_code == 200
+    items = resp.json()["items"]
+    assert [(i["type"], i["amountCents"]) for i in items] == [("transfer_out", 300), ("deposit", 1000)]
+    assert all(i["createdAt"].endswith("Z") for i in items)
@@ -0,0 +1,104 @@
+import sqlite3
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from payments import db as payments_db
+from payments.config import STORAGE_PROFILES, _load_storage_profile
+
+
+def _sqlite_error(message):
+    return OperationalError("UPDATE accounts", {}, sqlite3.OperationalError(message))
+
+
+@pytest.fixture
+def no_backoff(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(payments_db.time, "sleep", sleeps.append)
+    return sleeps
+
+
+def test_profile_from_env_with_overrides(monkeypatch):
+    monkeypatch.setenv("PAYMENTS_STORAGE_PROFILE", "Durable")
+    monkeypatch.setenv("SQLITE_SYNCHRONOUS", "normal")
+    monkeypatch.setenv("SQLITE_BUSY_TIMEOUT_MS", "1234")
+    profile = _load_storage_profile()
+    assert profile.name == "durable"
+    assert profile.journal_mode == "WAL"
+    assert profile.synchronous == "NORMAL"
+    assert profile.busy_timeout_ms == 1234
+    assert STORAGE_PROFILES["durable"].busy_timeout_ms == 10000  # presets are not modified
+
+
+def test_unknown_profile_is_rejected(monkeypatch):
+    monkeypatch.setenv("PAYMENTS_STORAGE_PROFILE", "fastest")
+    with pytest.raises(ValueError, match="Unknown PAYMENTS_STORAGE_PROFILE"):
+        _load_storage_profile()
+
+
+def test_write_connections_apply_the_profile(api):
+    profile = payments_db.STORAGE
+    with payments_db.engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar().upper() == profile.journal_mode
+        assert conn.execute(text("PRAGMA busy_timeout")).scalar() == profile.busy_timeout_ms
+        assert conn.execute(text("PRAGMA foreign_keys")).scalar() == 1
+
+
+def test_lock_errors_are_recognized():
+    assert payments_db.is_lock_error(_sqlite_error("database is locked"))
+    assert payments_db.is_lock_error(_sqlite_error("database is busy"))
+    assert not payments_db.is_lock_error(_sqlite_error("no such table: accounts"))
+    assert not payments_db.is_lock_error(ValueError("database is locked"))
+
+
+class _Session:
+    rollbacks = 0
+
+    def rollback(self):
+        self.rollbacks += 1
+
+
+def test_retry_on_lock_reruns_after_rollback(no_backoff):
+    calls = []
+
+    @payments_db.retry_on_lock
+    def write(db):
+        calls.append(db)
+        if len(calls) < 3:
+            raise _sqlite_error("database is locked")
+        return "posted"
+
+    session = _Session()
+    assert write(db=session) == "posted"
+    assert len(calls) == 3
+    assert session.rollbacks == 2
+    assert len(no_backoff) == 2
+    assert no_backoff[1] >= no_backoff[0]  # exponential backoff; jitter stays within each step
+
+
+def test_retry_on_lock_gives_up_after_the_configured_attempts(no_backoff):
+    calls = []
+
+    @payments_db.retry_on_lock
+    def write(db):
+        calls.append(1)
+        raise _sqlite_error("database is locked")
+
+    with pytest.raises(OperationalError):
+        write(db=_Session())
+    assert len(calls) == payments_db.SETTINGS.write_retry_attempts
+
+
+def test_other_errors_are_not_retried(no_backoff):
+    calls = []
+
+    @payments_db.retry_on_lock
+    def write(db):
+        calls.append(1)
+        raise _sqlite_error("no such table: accounts")
+
+    with pytest.raises(OperationalError):
+        write(db=_Session())
+    assert calls == [1]
+    assert no_backoff == []
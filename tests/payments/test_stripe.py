@@ -0,0 +1,161 @@
+import asyncio
+import urllib.parse
+
+import httpx
+import pytest
+
+from payments import stripe_client
+from payments.stripe_client import StripeClient, StripeError, _form_encode
+
+
+class FakeStripe:
+    """
+    In-process Stripe API: records requests and serves PaymentIntents from a dict.
+    """
+
+    def __init__(self):
+        self.requests = []
+        self.intents = {}
+
+    def handler(self, request):
+        self.requests.append(request)
+        path = request.url.raw_path.decode()
+        if request.method == "POST" and path == "/v1/payment_intents":
+            form = dict(urllib.parse.parse_qsl(request.content.decode()))
+            pi_id = f"pi_{len(self.intents) + 1}"
+            self.intents[pi_id] = {"id": pi_id, "client_secret": f"{pi_id}_secret", "status": "requires_payment_method",
+                                   "amount": int(form["amount"]), "currency": form["currency"]}
+            return httpx.Response(200, json=self.intents[pi_id])
+        prefix = "/v1/payment_intents/"
+        if request.method == "GET" and path.startswith(prefix):
+            pi = self.intents.get(urllib.parse.unquote(path[len(prefix):]))
+            if pi is None:
+                return httpx.Response(404, json={"error": {"message": "No such payment_intent"}})
+            return httpx.Response(200, json=pi)
+        return httpx.Response(404, json={"error": {"message": f"Unrecognized request URL ({path})"}})
+
+    def succeed(self, pi_id, amount_received=None, currency="usd"):
+        pi = self.intents[pi_id]
+        pi.update(status="succeeded", amount_received=pi["amount"] if amount_received is None else amount_received,
+                  currency=currency)
+
+
+def _client_for(fake):
+    client = StripeClient(secret_key="sk_test_dummy", api_base="http://stripe.test")
+    client._client = httpx.AsyncClient(base_url="http://stripe.test", transport=httpx.MockTransport(fake.handler))
+    return client
+
+
+@pytest.fixture
+def fake_stripe(api, monkeypatch):
+    fake = FakeStripe()
+    monkeypatch.setattr(stripe_client, "_client", _client_for(fake))
+    return fake
+
+
+def _create_intent(api, fake, amount_cents, account_id=None, key=None):
+    resp = api.post(
+        "/stripe/create-payment-intent",
+        json={"amountCents": amount_cents, "currency": "USD", "accountId": account_id},
+        headers={"Idempotency-Key": key} if key else {},
+    )
+    assert resp.status_code == 200, resp.text
+    return resp.json()["paymentIntentId"]
+
+
+def test_form_encoding_nests_and_drops_none():
+    assert _form_encode({"amount": 500, "automatic_payment_methods": {"enabled": True},
+                         "metadata": {"account_id": 7}, "description": None}) == {
+        "amount": "500",
+        "automatic_payment_methods[enabled]": "true",
+        "metadata[account_id]": "7",
+    }
+
+
+def test_create_payment_intent(api, fake_stripe, new_account):
+    account_id = new_account()
+    pi_id = _create_intent(api, fake_stripe, 2500, account_id=account_id, key="create-1")
+    request = fake_stripe.requests[-1]
+    form = dict(urllib.parse.parse_qsl(request.content.decode()))
+    assert form["amount"] == "2500"
+    assert form["currency"] == "usd"
+    assert form["metadata[account_id]"] == str(account_id)
+    assert request.headers["Idempotency-Key"] == "create-1"
+    assert fake_stripe.intents[pi_id]["client_secret"] == f"{pi_id}_secret"
+
+
+def test_stripe_deposit_credits_a_payment_intent_once(api, fake_stripe, new_account):
+    account_id = new_account()
+    pi_id = _create_intent(api, fake_stripe, 1500, account_id=account_id)
+    fake_stripe.succeed(pi_id)
+    body = {"paymentIntentId": pi_id, "amountCents": 1500, "currency": "USD"}
+
+    first = api.post(f"/accounts/{account_id}/deposit/stripe", json=body, headers={"Idempotency-Key": "a"})
+    replay = api.post(f"/accounts/{account_id}/deposit/stripe", json=body, headers={"Idempotency-Key": "a"})
+    other_key = api.post(f"/accounts/{account_id}/deposit/stripe", json=body, headers={"Idempotency-Key": "b"})
+
+    assert first.status_code == 200, first.text
+    assert first.json()["newBalanceCents"] == 1500
+    assert replay.json()["transactionId"] == first.json()["transactionId"]
+    # A new key for the same PaymentIntent is still credited once
+    assert other_key.json()["transactionId"] == first.json()["transactionId"]
+    assert api.get(f"/accounts/{account_id}").json()["balanceCents"] == 1500
+
+
+@pytest.mark.parametrize("status, amount_received, currency, expected", [
+    ("requires_payment_method", None, "usd", 402),
+    ("succeeded", 999, "usd", 400),
+    ("succeeded", None, "eur", 400),
+])
+def test_stripe_deposit_rejects_unverified_intents(api, fake_stripe, new_account, status, amount_received, currency,
+                                                   expected):
+    account_id = new_account()
+    pi_id = _create_intent(api, fake_stripe, 1000, account_id=account_id)
+    if status == "succeeded":
+        fake_stripe.succeed(pi_id, amount_received=amount_received, currency=currency)
+    resp = api.post(f"/accounts/{account_id}/deposit/stripe",
+                    json={"paymentIntentId": pi_id, "amountCents": 1000, "currency": "USD"})
+    assert resp.status_code == expected
+    assert api.get(f"/accounts/{account_id}").json()["balanceCents"] == 0
+
+
+def test_unknown_payment_intent_is_a_client_error(api, fake_stripe, new_account):
+    account_id = new_account()
+    resp = api.post(f"/accounts/{account_id}/deposit/stripe",
+                    json={"paymentIntentId": "pi_missing", "amountCents": 1000, "currency": "USD"})
+    assert resp.status_code == 400
+    assert "No such payment_intent" in resp.json()["detail"]
+
+
+def test_payment_intent_id_is_escaped_in_the_path():
+    fake = FakeStripe()
+    client = _client_for(fake)
+
+    async def retrieve():
+        try:
+            with pytest.raises(StripeError) as excinfo:
+                await client.retrieve_payment_intent("pi_1/../../v1/charges?limit=1")
+            return excinfo.value
+        finally:
+            await client.aclose()
+
+    error = asyncio.run(retrieve())
+    assert error.status_code == 404
+    assert fake.requests[-1].url.raw_path == b"/v1/payment_intents/pi_1%2F..%2F..%2Fv1%2Fcharges%3Flimit%3D1"
+
+
+def test_transport_failures_raise_stripe_error():
+    def timeout(request):
+        raise httpx.ReadTimeout("timed out", request=request)
+
+    client = StripeClient(secret_key="sk_test_dummy", api_base="http://stripe.test")
+    client._client = httpx.AsyncClient(base_url="http://stripe.test", transport=httpx.MockTransport(timeout))
+
+    async def retrieve():
+        try:
+            await client.retrieve_payment_intent("pi_1")
+        finally:
+            await client.aclose()
+
+    with pytest.raises(StripeError, match="timeout"):
+        asyncio.run(retrieve())
@@ -0,0 +1,91 @@
+import pytest
+
+import payments.db as payments_db
+import payments.main as payments_main
+from conftest import TMP_DIR
+from payments.tracing import NOOP_SPAN, Tracer, current_traceparent, parse_traceparent
+
+TRACE_ID = "4bf92f3577b34da6a3ce929d0e0e4736"
+PARENT_ID = "00f067aa0ba902b7"
+
+
+def recording_tracer(monkeypatch, sample_rate=1.0):
+    tracer = Tracer("payments-test", sample_rate, f"file:{TMP_DIR}/payments-traces.jsonl")
+    spans = []
+    monkeypatch.setattr(tracer, "export", spans.append)
+    return tracer, spans
+
+
+@pytest.fixture
+def traced(monkeypatch):
+    tracer, spans = recording_tracer(monkeypatch)
+    monkeypatch.setattr(payments_main, "TRACER", tracer)
+    monkeypatch.setattr(payments_db, "TRACER", tracer)
+    return spans
+
+
+@pytest.mark.parametrize("header, expected", [
+    (f"00-{TRACE_ID}-{PARENT_ID}-01", (TRACE_ID, PARENT_ID, True)),
+    (f"00-{TRACE_ID}-{PARENT_ID}-00", (TRACE_ID, PARENT_ID, False)),
+    (None, None),
+    ("00-abc-def-01", None),
+    (f"00-{'0' * 32}-{PARENT_ID}-01", None),
+    (f"00-{TRACE_ID}-{'z' * 16}-01", None),
+])
+def test_parse_traceparent(header, expected):
+    assert parse_traceparent(header) == expected
+
+
+def test_disabled_tracer_hands_out_the_noop_span():
+    tracer = Tracer("payments-test", 0.0, "file:unused")
+    assert not tracer.enabled
+    with tracer.start_request("HTTP GET") as span:
+        assert span is NOOP_SPAN
+        assert tracer.span("db.SELECT") is NOOP_SPAN
+        assert current_traceparent() is None
+
+
+def test_children_join_the_current_trace(monkeypatch):
+    tracer, spans = recording_tracer(monkeypatch)
+    with tracer.start_request("HTTP GET", traceparent=f"00-{TRACE_ID}-{PARENT_ID}-01") as root:
+        assert current_traceparent() == f"00-{TRACE_ID}-{root.span_id}-01"
+        with tracer.span("db.SELECT", engine="read"):
+            pass
+    child, parent = spans
+    assert parent["parentId"] == PARENT_ID
+    assert child["traceId"] == parent["traceId"] == TRACE_ID
+    assert child["parentId"] == parent["spanId"]
+    assert child["attributes"] == {"engine": "read"}
+    assert current_traceparent() is None
+
+
+def test_callers_sampling_decision_is_respected(monkeypatch):
+    tracer, spans = recording_tracer(monkeypatch)
+    assert tracer.start_request("HTTP GET", traceparent=f"00-{TRACE_ID}-{PARENT_ID}-00") is NOOP_SPAN
+    unsampled, _ = recording_tracer(monkeypatch, sample_rate=1e-12)
+    assert unsampled.start_request("HTTP GET") is NOOP_SPAN
+
+
+def test_span_records_errors(monkeypatch):
+    tracer, spans = recording_tracer(monkeypatch)
+    with pytest.raises(ValueError):
+        with tracer.start_request("HTTP POST"):
+            raise ValueError("bad amount")
+    assert spans[0]["error"] == "ValueError: bad amount"
+
+
+def test_request_continues_the_callers_trace(api, new_account, traced):
+    account_id = new_account(balance_cents=100)
+    traced.clear()
+    resp = api.get(f"/accounts/{account_id}", headers={"traceparent": f"00-{TRACE_ID}-{PARENT_ID}-01"})
+    assert resp.headers["X-Trace-Id"] == TRACE_ID
+    root = next(s for s in traced if s["parentId"] == PARENT_ID)
+    assert root["name"] == "HTTP GET /accounts/{account_id}"
+    assert root["attributes"]["status"] == 200
+    statements = [s for s in traced if s["name"] == "db.SELECT"]
+    assert statements and all(s["traceId"] == TRACE_ID for s in statements)
+    assert {s["attributes"]["engine"] for s in statements} == {"read"}
+
+
+def test_untraced_requests_have_no_trace_header(api):
+    assert "X-Trace-Id" not in api.get("/health").headers
@@ -0,0 +1,86 @@
+import dataclasses
+
+from sqlalchemy import false
+
+import payments.main as payments_main
+from payments.db import IdempotencyKey
+
+
+def item(source, target, amount_cents, key=None, currency="USD"):
+    return {"fromAccountId": source, "toAccountId": target, "amountCents": amount_cents, "currency": currency,
+            "idempotencyKey": key}
+
+
+def batch(api, *items):
+    resp = api.post("/transfers/batch", json={"transfers": list(items)})
+    assert resp.status_code == 200, resp.text
+    return resp.json()["results"]
+
+
+def balance(api, account_id):
+    return api.get(f"/accounts/{account_id}").json()["balanceCents"]
+
+
+def test_config_advertises_the_batch_endpoint(api):
+    features = api.get("/config").json()["features"]
+    assert features["transferBatch"] is True
+    assert features["maxTransferBatch"] == payments_main.SETTINGS.transfer_batch_max
+
+
+def test_each_item_gets_its_own_result(api, new_account):
+    source, target = new_account(balance_cents=300), new_account()
+    results = batch(
+        api,
+        item(source, target, 200),
+        item(source, target, 200),           # only 100 left
+        item(source, 10**9, 50),
+        item(source, source, 50),
+        item(source, target, 50, currency="EUR"),
+        item(source, target, 100),
+    )
+    assert [r["status"] for r in results] == [200, 402, 404, 400, 400, 200]
+    assert results[1]["detail"] == "Insufficient funds"
+    assert (results[0]["fromBalanceCents"], results[5]["fromBalanceCents"]) == (100, 0)
+    assert results[5]["toBalanceCents"] == 300
+    assert (balance(api, source), balance(api, target)) == (0, 300)
+
+
+def test_keys_replay_within_a_batch_and_across_endpoints(api, new_account):
+    source, target = new_account(balance_cents=1000), new_account()
+    first, repeat = batch(api, item(source, target, 100, key="batch-k1"), item(source, target, 100, key="batch-k1"))
+    assert repeat["transferGroupId"] == first["transferGroupId"]
+    replayed = batch(api, item(source, target, 100, key="batch-k1"))[0]
+    single = api.post("/transfers", json=item(source, target, 100), headers={"Idempotency-Key": "batch-k1"})
+    assert replayed["transferGroupId"] == single.json()["transferGroupId"] == first["transferGroupId"]
+    assert balance(api, source) == 900
+
+
+def test_oversized_and_empty_batches(api, new_account, monkeypatch):
+    assert batch(api) == []
+    source, target = new_account(balance_cents=10), new_account()
+    monkeypatch.setattr(payments_main, "SETTINGS", dataclasses.replace(payments_main.SETTINGS, transfer_batch_max=1))
+    resp = api.post("/transfers/batch", json={"transfers": [item(source, target, 1)] * 2})
+    assert resp.status_code == 413
+
+
+def test_key_stored_by_a_concurrent_writer_is_replayed(api, new_account, monkeypatch):
+    source, target = new_account(balance_cents=500), new_account()
+    first = api.post("/transfers", json=item(source, target, 100), headers={"Idempotency-Key": "race-k"}).json()
+
+    # The lookup misses as if the other writer had not committed yet; the insert then conflicts
+    real_select = payments_main.select
+    lookups = []
+
+    def racing_select(*entities):
+        if len(entities) == 1 and entities[0] is IdempotencyKey:
+            lookups.append(1)
+            if len(lookups) == 1:
+                return real_select(IdempotencyKey).where(false())
+        return real_select(*entities)
+
+    monkeypatch.setattr(payments_main, "select", racing_select)
+    second = api.post("/transfers", json=item(source, target, 100), headers={"Idempotency-Key": "race-k"})
+    assert second.status_code == 200
+    assert second.json()["transferGroupId"] == first["transferGroupId"]
+    assert len(lookups) == 2
+    assert (balance(api, source), balance(api, target)) == (400, 100)
@@ -0,0 +1,128 @@
+import hashlib
+import hmac
+import json
+import time
+import uuid
+
+import pytest
+from sqlalchemy import select
+
+from conftest import WEBHOOK_SECRET
+from payments.db import WebhookEvent, read_session_scope
+from payments.webhooks import WEBHOOK_WORKER, WebhookSignatureError, verify_signature
+
+
+def sign(payload, secret=WEBHOOK_SECRET, timestamp=None):
+    timestamp = int(time.time()) if timestamp is None else timestamp
+    digest = hmac.new(secret.encode(), f"{timestamp}.".encode() + payload, hashlib.sha256).hexdigest()
+    return f"t={timestamp},v1={digest}"
+
+
+def succeeded_event(account_id, amount_cents, pi_id=None, event_id=None, currency="usd"):
+    return {
+        "id": event_id or f"evt_{uuid.uuid4().hex}",
+        "type": "payment_intent.succeeded",
+        "data": {"object": {
+            "id": pi_id or f"pi_{uuid.uuid4().hex}",
+            "amount_received": amount_cents,
+            "currency": currency,
+            "metadata": {"account_id": str(account_id)},
+        }},
+    }
+
+
+def deliver(api, event):
+    payload = json.dumps(event).encode()
+    return api.post("/stripe/webhook", content=payload, headers={"Stripe-Signature": sign(payload)})
+
+
+def balance(api, account_id):
+    return api.get(f"/accounts/{account_id}").json()["balanceCents"]
+
+
+def event_status(event_id):
+    with read_session_scope() as db:
+        row = db.execute(select(WebhookEvent).where(WebhookEvent.event_id == event_id)).scalar_one()
+        return row.status, row.error
+
+
+def test_verify_signature_accepts_any_matching_v1():
+    payload = b'{"id": "evt_1"}'
+    header = sign(payload)
+    verify_signature(payload, header, WEBHOOK_SECRET)
+    verify_signature(payload, header.replace("v1=", "v1=deadbeef,v1="), WEBHOOK_SECRET)
+
+
+@pytest.mark.parametrize("header, message", [
+    (None, "Missing"),
+    ("v1=abc", "Malformed"),
+    ("t=abc,v1=abc", "Invalid timestamp"),
+    ("t=1,v1=abc", "No matching signature"),
+])
+def test_verify_signature_rejects_bad_headers(header, message):
+    with pytest.raises(WebhookSignatureError, match=message):
+        verify_signature(b"{}", header, WEBHOOK_SECRET)
+
+
+def test_verify_signature_rejects_stale_and_foreign_signatures():
+    payload = b"{}"
+    with pytest.raises(WebhookSignatureError, match="tolerance"):
+        verify_signature(payload, sign(payload, timestamp=int(time.time()) - 600), WEBHOOK_SECRET)
+    with pytest.raises(WebhookSignatureError, match="No matching"):
+        verify_signature(payload, sign(payload, secret="whsec_other"), WEBHOOK_SECRET)
+
+
+def test_unsigned_webhook_is_rejected(api, new_account):
+    payload = json.dumps(succeeded_event(new_account(), 100)).encode()
+    resp = api.post("/stripe/webhook", content=payload, headers={"Stripe-Signature": sign(b"other")})
+    assert resp.status_code == 400
+
+
+def test_other_event_types_are_acknowledged_but_not_queued(api):
+    resp = deliver(api, {"id": "evt_other", "type": "payment_intent.created", "data": {"object": {}}})
+    assert resp.json() == {"received": True, "queued": False}
+
+
+def test_succeeded_event_is_credited_by_the_worker(api, new_account):
+    account_id = new_account()
+    event = succeeded_event(account_id, 4200)
+    assert deliver(api, event).json() == {"received": True, "queued": True}
+    WEBHOOK_WORKER.drain()
+    assert balance(api, account_id) == 4200
+    assert event_status(event["id"]) == ("processed", None)
+    items = api.get("/transactions", params={"accountId": account_id}).json()["items"]
+    assert [(i["type"], i["amountCents"]) for i in items] == [("deposit", 4200)]
+
+
+def test_redelivery_and_duplicate_intents_credit_once(api, new_account):
+    account_id = new_account()
+    event = succeeded_event(account_id, 700)
+    assert deliver(api, event).json()["queued"] is True
+    # Stripe redelivers the same event id, and a second event reports the same PaymentIntent
+    assert deliver(api, event).json()["queued"] is False
+    duplicate = succeeded_event(account_id, 700, pi_id=event["data"]["object"]["id"])
+    assert deliver(api, duplicate).json()["queued"] is True
+    WEBHOOK_WORKER.drain()
+    assert balance(api, account_id) == 700
+    assert event_status(duplicate["id"]) == ("processed", None)
+
+
+def test_events_that_cannot_be_credited_are_marked_failed(api, new_account):
+    account_id = new_account()
+    unknown_account = succeeded_event(10**9, 500)
+    wrong_currency = succeeded_event(account_id, 500, currency="eur")
+    for event in (unknown_account, wrong_currency):
+        deliver(api, event)
+    WEBHOOK_WORKER.drain()
+    assert event_status(unknown_account["id"])[0] == "failed"
+    assert event_status(wrong_currency["id"])[0] == "failed"
+    assert balance(api, account_id) == 0
+
+
+def test_a_burst_across_accounts_is_fully_credited(api, new_account):
+    accounts = [new_account() for _ in range(5)]
+    for account_id in accounts:
+        for _ in range(3):
+            deliver(api, succeeded_event(account_id, 100))
+    WEBHOOK_WORKER.drain()
+    assert [balance(api, a) for a in accounts] == [300] * 5
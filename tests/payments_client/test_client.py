@@ -0,0 +1,212 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+import payments.main as payments_main
+from payments_client import (
+    AsyncPaymentsClient,
+    InsufficientFundsError,
+    NotFoundError,
+    PaymentsClient,
+    PaymentsError,
+    RateLimitedError,
+    RetryPolicy,
+)
+
+NO_WAIT = RetryPolicy(attempts=3, base_delay=0, max_delay=0.5)
+
+
+def mock_client(handler, **options):
+    client = PaymentsClient("http://payments.test", retry=NO_WAIT, **options)
+    client._http = httpx.Client(base_url="http://payments.test", transport=httpx.MockTransport(handler))
+    return client
+
+
+def replies(*responses):
+    """
+    MockTransport handler serving `responses` in order (a callable is invoked with the request) and recording requests.
+    """
+    queue = list(responses)
+    seen = []
+
+    def handler(request):
+        seen.append(request)
+        response = queue.pop(0)
+        return response(request) if callable(response) else response
+
+    handler.requests = seen
+    return handler
+
+
+def test_writes_are_retried_with_the_same_idempotency_key():
+    handler = replies(
+        httpx.Response(503, headers={"Retry-After": "0"}, json={"detail": "overloaded"}),
+        httpx.Response(500, json={"detail": "database is locked"}),
+        httpx.Response(200, json={"transactionId": 1, "newBalanceCents": 100}),
+    )
+    with mock_client(handler) as client:
+        assert client.deposit(1, 100)["newBalanceCents"] == 100
+    keys = {r.headers["Idempotency-Key"] for r in handler.requests}
+    assert len(handler.requests) == 3 and len(keys) == 1
+
+
+def test_caller_keys_are_sent_unchanged():
+    handler = replies(httpx.Response(200, json={"transferGroupId": "g", "fromBalanceCents": 0, "toBalanceCents": 1}))
+    with mock_client(handler, coalesce_transfers=False) as client:
+        client.transfer(1, 2, 1, idempotency_key="order-42")
+    assert handler.requests[0].headers["Idempotency-Key"] == "order-42"
+    assert json.loads(handler.requests[0].content) == {
+        "fromAccountId": 1, "toAccountId": 2, "amountCents": 1, "currency": "USD",
+    }
+
+
+def test_transport_errors_are_retried_then_raised():
+    def refused(request):
+        raise httpx.ConnectError("refused", request=request)
+
+    handler = replies(refused, refused, refused)
+    with mock_client(handler) as client, pytest.raises(PaymentsError) as excinfo:
+        client.get_account(1)
+    assert excinfo.value.status_code is None
+    assert len(handler.requests) == 3
+
+
+def test_long_retry_after_is_surfaced_instead_of_waited():
+    handler = replies(httpx.Response(429, headers={"Retry-After": "30"}, json={"detail": "slow down"}))
+    with mock_client(handler) as client, pytest.raises(RateLimitedError) as excinfo:
+        client.deposit(1, 100)
+    assert excinfo.value.retry_after == 30
+    assert len(handler.requests) == 1
+
+
+@pytest.mark.parametrize("status, error", [(402, InsufficientFundsError), (404, NotFoundError), (400, PaymentsError)])
+def test_client_errors_are_not_retried(status, error):
+    handler = replies(httpx.Response(status, json={"detail": "nope"}))
+    with mock_client(handler) as client, pytest.raises(error) as excinfo:
+        client.get_account(1)
+    assert (excinfo.value.status_code, excinfo.value.detail) == (status, "nope")
+    assert len(handler.requests) == 1
+
+
+def test_batch_falls_back_to_single_transfers_without_server_support():
+    handler = replies(
+        httpx.Response(200, json={"version": "old"}),
+        httpx.Response(200, json={"transferGroupId": "g1", "fromBalanceCents": 0, "toBalanceCents": 5}),
+        httpx.Response(402, json={"detail": "Insufficient funds"}),
+    )
+    with mock_client(handler) as client:
+        results = client.transfer_batch([{"fromAccountId": 1, "toAccountId": 2, "amountCents": 5, "currency": "USD"}] * 2)
+    assert [r["status"] for r in results] == [200, 402]
+    assert [r.url.path for r in handler.requests] == ["/config", "/transfers", "/transfers"]
+
+
+# ---- against the service ----
+
+@pytest.fixture
+def payments(api):
+    client = PaymentsClient(retry=NO_WAIT)
+    client._http.close()
+    client._http = api  # TestClient is an httpx.Client bound to the app
+    return client
+
+
+def test_sync_client_round_trip(payments, new_account):
+    source, target = new_account(balance_cents=500), new_account()
+    result = payments.transfer(source, target, 200)
+    assert (result["fromBalanceCents"], result["toBalanceCents"]) == (300, 200)
+    with pytest.raises(InsufficientFundsError):
+        payments.transfer(source, target, 1000)
+    with pytest.raises(NotFoundError):
+        payments.get_account(10**9)
+    assert payments.get_account(source)["balanceCents"] == 300
+
+
+def test_sync_client_replays_a_retried_transfer(payments, new_account):
+    source, target = new_account(balance_cents=500), new_account()
+    first = payments.transfer(source, target, 100, idempotency_key="client-replay")
+    again = payments.transfer(source, target, 100, idempotency_key="client-replay")
+    assert again["transferGroupId"] == first["transferGroupId"]
+    assert payments.get_account(source)["balanceCents"] == 400
+
+
+class CountingASGITransport(httpx.ASGITransport):
+    def __init__(self, app):
+        super().__init__(app=app)
+        self.paths = []
+
+    async def handle_async_request(self, request):
+        self.paths.append(request.url.path)
+        return await super().handle_async_request(request)
+
+
+def async_client():
+    transport = CountingASGITransport(payments_main.app)
+    client = AsyncPaymentsClient("http://payments.test", retry=NO_WAIT)
+    client._http = httpx.AsyncClient(base_url="http://payments.test", transport=transport)
+    return client, transport
+
+
+def test_async_client_retries_like_the_sync_client():
+    def refused(request):
+        raise httpx.ConnectError("refused", request=request)
+
+    handler = replies(
+        refused,
+        httpx.Response(503, headers={"Retry-After": "0"}, json={"detail": "overloaded"}),
+        httpx.Response(200, json={"transactionId": 1, "newBalanceCents": 100}),
+    )
+
+    async def run():
+        client = AsyncPaymentsClient("http://payments.test", retry=NO_WAIT)
+        client._http = httpx.AsyncClient(base_url="http://payments.test", transport=httpx.MockTransport(handler))
+        async with client:
+            return await client.deposit(1, 100)
+
+    assert asyncio.run(run())["newBalanceCents"] == 100
+    assert len({r.headers["Idempotency-Key"] for r in handler.requests}) == 1
+    assert len(handler.requests) == 3
+
+
+def test_concurrent_async_transfers_are_coalesced(api, new_account):
+    source, target = new_account(balance_cents=10_000), new_account()
+
+    async def run():
+        client, transport = async_client()
+        async with client:
+            await client.transfer(source, target, 100)  # batch support discovered
+            transport.paths.clear()
+            results = await asyncio.gather(
+                *(client.transfer(source, target, 100) for _ in range(20)),
+                client.transfer(source, target, 9000),
+                return_exceptions=True,
+            )
+        return results, transport.paths
+
+    results, paths = asyncio.run(run())
+    assert paths == ["/transfers/batch"]
+    assert len({r["transferGroupId"] for r in results[:20]}) == 20
+    assert isinstance(results[20], InsufficientFundsError)
+    assert api.get(f"/accounts/{source}").json()["balanceCents"] == 7900
+
+
+def test_aclose_waits_for_an_in_flight_batch(api, new_account):
+    source, target = new_account(balance_cents=500), new_account()
+
+    async def run():
+        client, transport = async_client()
+        await client.transfer(source, target, 100)
+        transport.paths.clear()
+        callers = [asyncio.create_task(client.transfer(source, target, 100)) for _ in range(3)]
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        for caller in callers:
+            caller.cancel()
+        await client.aclose()
+        return transport.paths
+
+    paths = asyncio.run(run())
+    # The batch was already being sent; closing waited for it instead of cutting the connection
+    assert paths == ["/transfers/batch"]
+    assert api.get(f"/accounts/{source}").json()["balanceCents"] == 100